@@ -0,0 +1,178 @@
+"""
+Compare the HTML parser backends on saved t.me/s pages.
+
+Usage:
+    python benchmarks/bench_html_parser.py [PAGES_DIR] [--archive PATH] [--rounds N] [--workers 1,2,4]
+
+PAGES_DIR holds saved channel pages (*.html) and --archive points at a page
+archive (data/archive) whose distinct pages are used. Without either a
+synthetic set of pages shaped like t.me/s previews is generated. --workers
+also measures the multi-process parse pool with each given worker count.
+"""
+import sys
+import os
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.html_parser import SoupMessageParser, LxmlMessageParser, StreamingMessageParser, HAS_LXML
+from src.page_archive import PageArchive
+from src.parse_pool import ParsePool
+
+MESSAGE_TEMPLATE = '''
+<div class="tgme_widget_message_wrap js-widget_message_wrap">
+  <div class="tgme_widget_message text_not_supported_wrap js-widget_message" data-post="bench_channel/{post_id}" data-view="eyJjIjoxfQ">
+    <div class="tgme_widget_message_user"><a href="https://t.me/bench_channel"><i class="tgme_widget_message_user_photo"></i></a></div>
+    <div class="tgme_widget_message_bubble">
+      <div class="tgme_widget_message_author"><a class="tgme_widget_message_owner_name" href="https://t.me/bench_channel"><span dir="auto">Bench Channel</span></a></div>
+      <div class="tgme_widget_message_text js-message_text" dir="auto">🔥 پروکسی جدید / new proxies #{post_id}<br/>
+        <a href="https://t.me/proxy?server=10.0.{a}.{b}&amp;port=443&amp;secret=ee{secret}" target="_blank">Proxy 1</a> |
+        <a href="https://t.me/proxy?server=10.1.{a}.{b}&amp;port=8443&amp;secret=dd{secret}" target="_blank">Proxy 2</a> |
+        <a href="https://t.me/proxy?server=10.2.{a}.{b}&amp;port=993&amp;secret=ee{secret}" target="_blank">Proxy 3</a><br/>
+        <b>Join</b> <a href="https://t.me/bench_channel">@bench_channel</a>
+      </div>
+      <div class="tgme_widget_message_footer compact js-message_footer">
+        <div class="tgme_widget_message_info short js-message_info">
+          <span class="tgme_widget_message_views">{views}</span><span class="copyonly"> views</span>
+          <span class="tgme_widget_message_meta"><a class="tgme_widget_message_date" href="https://t.me/bench_channel/{post_id}"><time datetime="2024-05-01T10:{minute:02d}:00+00:00" class="time">10:{minute:02d}</time></a></span>
+        </div>
+      </div>
+    </div>
+  </div>
+</div>'''
+
+
+def build_synthetic_pages(page_count=50, messages_per_page=20):
+    pages = []
+    for page in range(page_count):
+        containers = []
+        for index in range(messages_per_page):
+            post_id = 10000 + page * messages_per_page + index
+            containers.append(MESSAGE_TEMPLATE.format(
+                post_id=post_id, a=page % 256, b=index, secret=f"{post_id:032x}",
+                views=f"{post_id % 97}.{index}K", minute=index % 60
+            ))
+        body = (
+            '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Bench</title></head><body>'
+            '<section class="tgme_channel_history js-message_history">'
+            + ''.join(containers) +
+            '</section></body></html>'
+        )
+        pages.append(body.encode('utf-8'))
+    return pages
+
+
+def load_pages(pages_dir):
+    return [path.read_bytes() for path in sorted(Path(pages_dir).glob('*.html'))]
+
+
+def load_pages_from_archive(archive_path):
+    if not Path(archive_path, 'index.db').exists():
+        return []
+    return list(PageArchive(archive_path).iter_unique_bodies())
+
+
+def load_corpus(pages_dir=None, archive_path=None):
+    """Return (pages, source description) from a directory, an archive or the synthetic generator"""
+    if archive_path:
+        return load_pages_from_archive(archive_path), archive_path
+    if pages_dir:
+        return load_pages(pages_dir), pages_dir
+    return build_synthetic_pages(), 'synthetic'
+
+
+def bench_backend(parser, pages, rounds):
+    messages = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for body in pages:
+            messages += len(parser.parse_messages(body, 'bench_channel'))
+    elapsed = time.perf_counter() - start
+    return elapsed, messages // rounds
+
+
+def bench_streaming(pages, rounds, chunk_size=8192):
+    messages = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for body in pages:
+            parser = StreamingMessageParser('bench_channel')
+            for offset in range(0, len(body), chunk_size):
+                parser.feed(body[offset:offset + chunk_size])
+            messages += len(parser.close())
+    elapsed = time.perf_counter() - start
+    return elapsed, messages // rounds
+
+
+def bench_pool(workers, pages, rounds):
+    async def parse_all(pool):
+        results = await asyncio.gather(*(pool.parse_messages(body, 'bench_channel') for body in pages))
+        return sum(len(messages) for messages in results)
+
+    async def run():
+        pool = ParsePool(workers)
+        try:
+            # Start the worker processes outside the timed rounds
+            await parse_all(pool)
+            messages = 0
+            start = time.perf_counter()
+            for _ in range(rounds):
+                messages += await parse_all(pool)
+            return time.perf_counter() - start, messages // rounds
+        finally:
+            pool.close()
+
+    return asyncio.run(run())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare HTML parser backends")
+    arg_parser.add_argument('pages_dir', nargs='?', help="Directory of saved t.me/s pages (*.html)")
+    arg_parser.add_argument('--archive', help="Page archive directory (e.g. data/archive)")
+    arg_parser.add_argument('--rounds', type=int, default=3)
+    arg_parser.add_argument('--workers', help="Comma-separated parse pool sizes to benchmark (e.g. 1,2,4)")
+    args = arg_parser.parse_args()
+    rounds = args.rounds
+
+    pages, source = load_corpus(args.pages_dir, args.archive)
+    if not pages:
+        print(f"No pages found in {source}")
+        return
+
+    total_kb = sum(len(body) for body in pages) / 1024
+    print(f"📊 Parsing {len(pages)} pages ({total_kb:.0f} KB, source: {source}) x {rounds} rounds")
+    print("-" * 60)
+    print(f"{'Backend':<14} {'Messages':>9} {'ms/page':>9} {'pages/s':>9} {'Speedup':>9}")
+    print("-" * 60)
+
+    backends = [SoupMessageParser()]
+    if HAS_LXML:
+        backends.append(LxmlMessageParser())
+    else:
+        print("ℹ️ lxml is not installed, only html.parser is benchmarked")
+
+    baseline = None
+    for parser in backends:
+        elapsed, messages = bench_backend(parser, pages, rounds)
+        per_page = elapsed / (len(pages) * rounds)
+        baseline = baseline or per_page
+        print(f"{parser.name:<14} {messages:>9} {per_page * 1000:>9.2f} {1 / per_page:>9.0f} {baseline / per_page:>8.1f}x")
+
+    if HAS_LXML:
+        elapsed, messages = bench_streaming(pages, rounds)
+        per_page = elapsed / (len(pages) * rounds)
+        print(f"{'lxml stream':<14} {messages:>9} {per_page * 1000:>9.2f} {1 / per_page:>9.0f} {baseline / per_page:>8.1f}x")
+
+    for workers in [int(count) for count in args.workers.split(',')] if args.workers else []:
+        elapsed, messages = bench_pool(workers, pages, rounds)
+        per_page = elapsed / (len(pages) * rounds)
+        print(f"{f'pool x{workers}':<14} {messages:>9} {per_page * 1000:>9.2f} {1 / per_page:>9.0f} {baseline / per_page:>8.1f}x")
+
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the compiled keyword matcher with the per-keyword scan it replaced.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [--messages N] [--rounds N]
+
+A synthetic corpus of channel messages is generated, roughly a third of which
+mention proxies. The legacy scan lowercased text + HTML and tested every
+keyword in turn; the matcher scans the plain text once.
+"""
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.keyword_matcher import KeywordMatcher
+from src.channel_scraper import ChannelScraper
+
+FILLER_WORDS = [
+    'news', 'update', 'channel', 'today', 'weather', 'music', 'video', 'sale', 'crypto',
+    'новости', 'сегодня', 'канал', 'خبر', 'امروز', 'کانال', 'photo', 'join', 'free', 'hello'
+]
+PROXY_PHRASES = [
+    'New MTProto server available', 'Прокси для телеграм', 'fresh socks5 list',
+    'Use this proxy to bypass', 'обход блокировки', 'connect here'
+]
+
+
+def build_corpus(message_count, seed=42):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(message_count):
+        words = [rng.choice(FILLER_WORDS) for _ in range(rng.randint(20, 80))]
+        if index % 3 == 0:
+            words.insert(rng.randrange(len(words)), rng.choice(PROXY_PHRASES))
+        text = ' '.join(words)
+        html = f'<div class="tgme_widget_message_text js-message_text" dir="auto">{text}<br/><b>#{index}</b></div>'
+        corpus.append((text, html))
+    return corpus
+
+
+def legacy_match(keywords, combined_text):
+    text_lower = combined_text.lower()
+    for keyword in keywords:
+        if keyword in text_lower:
+            return True
+    return False
+
+
+def timed(func, corpus, rounds):
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        hits = sum(1 for text, html in corpus if func(text, html))
+    return time.perf_counter() - start, hits
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare keyword matching strategies")
+    arg_parser.add_argument('--messages', type=int, default=50000)
+    arg_parser.add_argument('--rounds', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    keywords = ChannelScraper(telegram_client=None).proxy_keywords
+    matcher = KeywordMatcher(keywords)
+    corpus = build_corpus(args.messages)
+
+    strategies = [
+        ('legacy loop', lambda text, html: legacy_match(keywords, f"{text} {html}")),
+        ('matcher text+html', lambda text, html: matcher.match(f"{text} {html}") is not None),
+        ('matcher text', lambda text, html: matcher.match(text) is not None),
+    ]
+
+    total = args.messages * args.rounds
+    print(f"📊 Matching {len(keywords)} keywords over {args.messages} messages x {args.rounds} rounds")
+    print("-" * 62)
+    print(f"{'Strategy':<18} {'Hits':>8} {'us/msg':>9} {'msgs/s':>10} {'Speedup':>9}")
+    print("-" * 62)
+
+    baseline = None
+    for name, func in strategies:
+        elapsed, hits = timed(func, corpus, args.rounds)
+        per_message = elapsed / total
+        baseline = baseline or per_message
+        print(f"{name:<18} {hits:>8} {per_message * 1e6:>9.2f} {1 / per_message:>10.0f} {baseline / per_message:>8.1f}x")
+
+    print("-" * 62)
+
+
+if __name__ == "__main__":
+    main()
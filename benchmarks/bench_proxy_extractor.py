@@ -0,0 +1,63 @@
+"""
+Measure ProxyExtractor throughput on parsed channel messages.
+
+Usage:
+    python benchmarks/bench_proxy_extractor.py [PAGES_DIR] [--archive PATH] [--rounds N]
+
+Pages come from a directory of saved t.me/s pages, a page archive
+(data/archive) or the synthetic generator of bench_html_parser.py. They are
+parsed once up front, so only proxy extraction is timed.
+"""
+import sys
+import os
+import io
+import time
+import argparse
+import contextlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_html_parser import load_corpus
+from src.html_parser import get_message_parser
+from src.proxy_extractor import ProxyExtractor
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark proxy extraction")
+    arg_parser.add_argument('pages_dir', nargs='?', help="Directory of saved t.me/s pages (*.html)")
+    arg_parser.add_argument('--archive', help="Page archive directory (e.g. data/archive)")
+    arg_parser.add_argument('--rounds', type=int, default=3)
+    args = arg_parser.parse_args()
+
+    pages, source = load_corpus(args.pages_dir, args.archive)
+    if not pages:
+        print(f"No pages found in {source}")
+        return
+
+    parser = get_message_parser()
+    messages = [message for body in pages for message in parser.parse_messages(body, 'bench_channel')]
+    extractor = ProxyExtractor()
+
+    print(f"📊 Extracting proxies from {len(messages)} messages ({len(pages)} pages, source: {source}) x {args.rounds} rounds")
+    print("-" * 60)
+
+    proxies = 0
+    # The extractor reports every proxy it finds; that output is not part of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            proxies = sum(
+                len(extractor.extract_all_proxies(hrefs=list(message.hrefs), text=message.message))
+                for message in messages
+            )
+        elapsed = time.perf_counter() - start
+
+    per_message = elapsed / max(len(messages) * args.rounds, 1)
+    print(f"Proxies per round: {proxies}")
+    print(f"Time per message:  {per_message * 1e6:.1f} us")
+    print(f"Messages per sec:  {1 / per_message if per_message else 0:.0f}")
+    print("-" * 60)
+
+
+if __name__ == "__main__":
+    main()
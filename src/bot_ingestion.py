@@ -0,0 +1,78 @@
+import asyncio
+from datetime import timezone
+from typing import List
+from telegram import Message, MessageEntity
+from telegram.error import TelegramError
+from src.models import ScrapedChat, ScrapedMessage
+from config.settings import BOT_POLL_TIMEOUT, BOT_POLL_RETRY_DELAY
+
+# Entities whose links may hold a proxy: bare URLs and text links
+LINK_ENTITY_TYPES = [MessageEntity.URL, MessageEntity.TEXT_LINK]
+
+
+def channel_post_to_message(post: Message) -> ScrapedMessage:
+    """
+    Convert a Bot API channel post into the ScrapedMessage a t.me/s page parse
+    would have produced, so it can go through the same filtering and extraction
+    """
+    if post.text is not None:
+        text, html, entities = post.text, post.text_html, post.parse_entities(LINK_ENTITY_TYPES)
+    else:
+        text = post.caption or ''
+        html = post.caption_html if post.caption else ''
+        entities = post.parse_caption_entities(LINK_ENTITY_TYPES)
+
+    hrefs = tuple(entity.url if entity.type == MessageEntity.TEXT_LINK else value
+                  for entity, value in entities.items())
+
+    forwarded_from = ''
+    origin_chat = getattr(post.forward_origin, 'chat', None)
+    if origin_chat is not None and origin_chat.username:
+        forwarded_from = origin_chat.username
+
+    date = post.date if post.date.tzinfo else post.date.replace(tzinfo=timezone.utc)
+    return ScrapedMessage(
+        id=str(post.message_id),
+        date=date,
+        message=text,
+        html=html,
+        hrefs=hrefs,
+        chat=ScrapedChat(username=post.chat.username or str(post.chat.id)),
+        forwarded_from=forwarded_from
+    )
+
+
+class ChannelPostPoller:
+    """
+    Long-polls getUpdates for the channel posts of channels where the bot is an admin.
+
+    Only `channel_post` updates are requested, and each poll confirms the
+    updates of the previous one through the offset. A failed poll is retried
+    after an exponentially growing delay instead of being raised.
+    """
+
+    def __init__(self, bot, timeout: int = BOT_POLL_TIMEOUT, retry_delay: float = BOT_POLL_RETRY_DELAY):
+        self.bot = bot
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.offset = None
+        self.failures = 0
+
+    async def poll(self) -> List[ScrapedMessage]:
+        """Wait for the next channel posts; returns an empty list when the poll timed out or failed"""
+        try:
+            updates = await self.bot.get_updates(
+                offset=self.offset, timeout=self.timeout, allowed_updates=['channel_post']
+            )
+        except TelegramError as e:
+            self.failures += 1
+            delay = min(self.retry_delay * 2 ** (self.failures - 1), 60)
+            print(f"⚠️ Polling channel posts failed ({e}), retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            return []
+
+        self.failures = 0
+        if updates:
+            self.offset = updates[-1].update_id + 1
+
+        return [channel_post_to_message(update.channel_post) for update in updates if update.channel_post]
@@ -0,0 +1,284 @@
+import re
+import asyncio
+import sqlite3
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse, parse_qs
+from src.exceptions import FetchBudgetExceeded, RateLimitedError, ChannelUnavailableError
+from config.settings import (
+    DATABASE_PATH, DISCOVERY_FRONTIER_MAX_SIZE, DISCOVERY_PROBES_PER_CYCLE,
+    DISCOVERY_PROBE_INTERVAL, DISCOVERY_MIN_PROXIES, DISCOVERY_MAX_PROBE_ATTEMPTS
+)
+
+# Public usernames: 5-32 characters, starting with a letter
+USERNAME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]{4,31}$')
+MENTION_PATTERN = re.compile(r'(?<![\w@/.])@([A-Za-z][A-Za-z0-9_]{4,31})\b')
+TELEGRAM_HOSTS = {'t.me', 'www.t.me', 'telegram.me', 'www.telegram.me'}
+# t.me paths that are not channel usernames
+RESERVED_PATHS = {
+    'proxy', 'socks', 'joinchat', 'addstickers', 'addemoji', 'addtheme', 'addlist', 'share',
+    'iv', 'login', 'setlanguage', 'bg', 'invoice', 'boost', 'contact', 'confirmphone', 'c', 's',
+}
+
+STATUS_PENDING = 'pending'
+STATUS_ACCEPTED = 'accepted'
+STATUS_REJECTED = 'rejected'
+
+
+def normalize_username(name: Optional[str]) -> Optional[str]:
+    """Lower-cased channel username, or None for invalid names, reserved paths and bots"""
+    if not name or not USERNAME_PATTERN.match(name):
+        return None
+    name = name.lower()
+    if name in RESERVED_PATHS or name.endswith('bot'):
+        return None
+    return name
+
+
+def channel_from_link(href: str) -> Optional[str]:
+    """Channel username referenced by a t.me / telegram.me / tg://resolve link"""
+    if not href:
+        return None
+    parsed = urlparse(href.strip())
+
+    if parsed.scheme == 'tg':
+        if parsed.netloc != 'resolve':
+            return None
+        return normalize_username(parse_qs(parsed.query).get('domain', [None])[0])
+
+    if parsed.hostname not in TELEGRAM_HOSTS:
+        return None
+    parts = [part for part in parsed.path.split('/') if part]
+    if parts and parts[0] == 's':
+        parts = parts[1:]
+    return normalize_username(parts[0]) if parts else None
+
+
+def extract_channel_references(message: Dict) -> Set[str]:
+    """Channels a scraped message refers to: its links, @mentions and the channel it was forwarded from"""
+    references = set()
+    for href in message.get('hrefs', []):
+        channel = channel_from_link(href)
+        if channel:
+            references.add(channel)
+
+    for mention in MENTION_PATTERN.findall(message.get('text', '') or ''):
+        channel = normalize_username(mention)
+        if channel:
+            references.add(channel)
+
+    forwarded_from = normalize_username(message.get('forwarded_from'))
+    if forwarded_from:
+        references.add(forwarded_from)
+
+    references.discard((message.get('channel') or '').lower())
+    return references
+
+
+class ChannelFrontier:
+    """
+    Deduplicated priority frontier of candidate channels kept in the proxies database.
+
+    A candidate's priority is the number of references to it seen so far. The
+    number of pending candidates is capped at `max_size`; the lowest-priority
+    ones are dropped first. Probed candidates stay in the table as accepted or
+    rejected so they are never queued again.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, max_size: int = DISCOVERY_FRONTIER_MAX_SIZE):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._initialize_database()
+
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS channel_frontier (
+                    channel TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    mentions INTEGER NOT NULL DEFAULT 0,
+                    first_referrer TEXT,
+                    first_seen TIMESTAMP NOT NULL,
+                    last_seen TIMESTAMP NOT NULL,
+                    probe_attempts INTEGER NOT NULL DEFAULT 0,
+                    probed_at TIMESTAMP,
+                    proxies_found INTEGER,
+                    last_error TEXT
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_channel_frontier_priority ON channel_frontier(status, mentions)')
+            conn.commit()
+
+    def add_references(self, references: Dict[str, int], referrers: Optional[Dict[str, str]] = None,
+                       known_channels: Iterable[str] = (), now: Optional[datetime] = None) -> int:
+        """Queue referenced channels (name -> reference count); returns the number of new candidates"""
+        known = {channel.lower() for channel in known_channels}
+        references = {channel: count for channel, count in references.items() if channel not in known}
+        if not references:
+            return 0
+
+        now = (now or datetime.now(timezone.utc)).isoformat()
+        referrers = referrers or {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            before = cursor.execute('SELECT COUNT(*) FROM channel_frontier').fetchone()[0]
+            cursor.executemany('''
+                INSERT INTO channel_frontier (channel, mentions, first_referrer, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET
+                    mentions = mentions + excluded.mentions,
+                    last_seen = excluded.last_seen
+            ''', [(channel, count, referrers.get(channel), now, now) for channel, count in references.items()])
+            added = cursor.execute('SELECT COUNT(*) FROM channel_frontier').fetchone()[0] - before
+
+            # Keep the frontier bounded: drop the least referenced, least recently seen candidates
+            cursor.execute('''
+                DELETE FROM channel_frontier WHERE channel IN (
+                    SELECT channel FROM channel_frontier WHERE status = ?
+                    ORDER BY mentions DESC, last_seen DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (STATUS_PENDING, self.max_size))
+            conn.commit()
+
+        return added
+
+    def next_candidates(self, limit: int) -> List[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT channel FROM channel_frontier WHERE status = ?
+                ORDER BY mentions DESC, last_seen DESC LIMIT ?
+            ''', (STATUS_PENDING, limit))
+            return [row[0] for row in cursor.fetchall()]
+
+    def record_probe(self, channel: str, proxies_found: Optional[int] = None, error: Optional[str] = None,
+                     min_proxies: int = DISCOVERY_MIN_PROXIES,
+                     max_attempts: int = DISCOVERY_MAX_PROBE_ATTEMPTS,
+                     permanent: bool = False) -> str:
+        """
+        Record a probe and return the candidate's new status.
+
+        A candidate with at least `min_proxies` proxies is accepted, one without is
+        rejected. A failed probe is retried on later cycles until `max_attempts`,
+        unless the failure is permanent (e.g. the channel does not exist).
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT probe_attempts FROM channel_frontier WHERE channel = ?', (channel,))
+            row = cursor.fetchone()
+            attempts = (row[0] if row else 0) + 1
+
+            if error is None:
+                status = STATUS_ACCEPTED if proxies_found >= min_proxies else STATUS_REJECTED
+            elif permanent or attempts >= max_attempts:
+                status = STATUS_REJECTED
+            else:
+                status = STATUS_PENDING
+
+            cursor.execute('''
+                UPDATE channel_frontier
+                SET status = ?, probe_attempts = ?, probed_at = ?, proxies_found = ?, last_error = ?
+                WHERE channel = ?
+            ''', (status, attempts, datetime.now(timezone.utc).isoformat(), proxies_found, error, channel))
+            conn.commit()
+
+        return status
+
+    def get_accepted(self) -> List[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT channel FROM channel_frontier WHERE status = ? ORDER BY probed_at',
+                           (STATUS_ACCEPTED,))
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_stats(self) -> Dict[str, int]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT status, COUNT(*) FROM channel_frontier GROUP BY status')
+            counts = dict(cursor.fetchall())
+        return {status: counts.get(status, 0) for status in (STATUS_PENDING, STATUS_ACCEPTED, STATUS_REJECTED)}
+
+
+class ChannelDiscovery:
+    """
+    Optional discovery stage: grows the scrape set from channel references.
+
+    References seen in the scraped messages of a cycle are added to the frontier
+    once the cycle is done. Then at most `probes_per_cycle` top candidates are
+    probed, one at a time and `probe_interval` seconds apart: their first page is
+    fetched and run through relevance filtering and proxy extraction. Candidates
+    that yield proxies are accepted and scraped from the next cycle on.
+    """
+
+    def __init__(self, telegram_client, channel_scraper, proxy_extractor,
+                 frontier: Optional[ChannelFrontier] = None,
+                 probes_per_cycle: int = DISCOVERY_PROBES_PER_CYCLE,
+                 probe_interval: float = DISCOVERY_PROBE_INTERVAL):
+        self.telegram_client = telegram_client
+        self.channel_scraper = channel_scraper
+        self.proxy_extractor = proxy_extractor
+        self.frontier = frontier or ChannelFrontier()
+        self.probes_per_cycle = probes_per_cycle
+        self.probe_interval = probe_interval
+        self.pending_references = Counter()
+        self.pending_referrers = {}
+
+    def discard(self):
+        self.pending_references = Counter()
+        self.pending_referrers = {}
+
+    def observe(self, message: Dict):
+        """Stage the channel references of a scraped message"""
+        for channel in extract_channel_references(message):
+            self.pending_references[channel] += 1
+            self.pending_referrers.setdefault(channel, message.get('channel'))
+
+    def get_discovered_channels(self) -> List[str]:
+        return [f"https://t.me/{channel}" for channel in self.frontier.get_accepted()]
+
+    async def run(self, known_channels: Iterable[str]) -> List[str]:
+        """Queue this cycle's references and probe the top candidates; returns the newly accepted channels"""
+        known_channels = [self.channel_scraper.get_channel_name_from_url(url) for url in known_channels]
+        added = self.frontier.add_references(self.pending_references, self.pending_referrers, known_channels)
+        self.discard()
+        if added:
+            print(f"🧭 Discovered {added} new candidate channels")
+
+        accepted = []
+        for i, channel in enumerate(self.frontier.next_candidates(self.probes_per_cycle)):
+            if i:
+                await asyncio.sleep(self.probe_interval)
+
+            try:
+                proxies_found = await self.probe(channel)
+            except (FetchBudgetExceeded, RateLimitedError) as e:
+                # Not the candidate's fault: leave it queued and stop probing for this cycle
+                print(f"🧭 Discovery paused: {e}")
+                break
+            except Exception as e:
+                status = self.frontier.record_probe(
+                    channel, error=str(e) or type(e).__name__,
+                    permanent=isinstance(e, ChannelUnavailableError)
+                )
+                print(f"🧭 Probe of {channel} failed ({status}): {e or type(e).__name__}")
+                continue
+
+            status = self.frontier.record_probe(channel, proxies_found)
+            print(f"🧭 Probed {channel}: {proxies_found} proxies ({status})")
+            if status == STATUS_ACCEPTED:
+                accepted.append(channel)
+
+        return accepted
+
+    async def probe(self, channel: str) -> int:
+        """Number of distinct proxies on the candidate's first page"""
+        messages = await self.telegram_client.get_channel_messages(channel)
+        proxies = []
+        for message in self.channel_scraper.filter_relevant_messages(messages):
+            proxies.extend(self.proxy_extractor.extract_all_proxies(hrefs=message['hrefs'], text=message['text']))
+        return len(self.proxy_extractor.remove_duplicates(proxies))
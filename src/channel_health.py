@@ -0,0 +1,158 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from config.settings import (
+    DATABASE_PATH, CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_BASE_BACKOFF_HOURS, CIRCUIT_BREAKER_MAX_BACKOFF_HOURS
+)
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half-open'
+
+
+class ChannelHealthTracker:
+    """
+    Per-channel health record and circuit breaker kept in the proxies database.
+
+    After `failure_threshold` consecutive failures (or one permanent failure such
+    as a deleted channel) the circuit opens and the channel is skipped. Once the
+    backoff has passed the circuit is half-open: a single probe is allowed, and
+    every failed probe doubles the backoff up to `max_backoff_hours`. Any
+    success closes the circuit again.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH,
+                 failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 base_backoff_hours: float = CIRCUIT_BREAKER_BASE_BACKOFF_HOURS,
+                 max_backoff_hours: float = CIRCUIT_BREAKER_MAX_BACKOFF_HOURS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.failure_threshold = max(failure_threshold, 1)
+        self.base_backoff_hours = base_backoff_hours
+        self.max_backoff_hours = max_backoff_hours
+        self._initialize_database()
+
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS channel_health (
+                    channel TEXT PRIMARY KEY,
+                    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                    last_status INTEGER,
+                    last_error TEXT,
+                    last_success_at TIMESTAMP,
+                    last_failure_at TIMESTAMP,
+                    open_until TIMESTAMP
+                )
+            ''')
+            conn.commit()
+
+    def get_health(self, channel: str) -> Optional[Dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT channel, consecutive_failures, last_status, last_error,
+                       last_success_at, last_failure_at, open_until
+                FROM channel_health WHERE channel = ?
+            ''', (channel,))
+            row = cursor.fetchone()
+            return self._row_to_dict(row) if row else None
+
+    def get_all_health(self) -> List[Dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT channel, consecutive_failures, last_status, last_error,
+                       last_success_at, last_failure_at, open_until
+                FROM channel_health ORDER BY consecutive_failures DESC, channel
+            ''')
+            return [self._row_to_dict(row) for row in cursor.fetchall()]
+
+    def get_state(self, channel: str, now: Optional[datetime] = None) -> str:
+        health = self.get_health(channel)
+        if not health or not health['open_until']:
+            return CIRCUIT_CLOSED
+
+        now = now or datetime.now(timezone.utc)
+        return CIRCUIT_OPEN if now < health['open_until'] else CIRCUIT_HALF_OPEN
+
+    def record_success(self, channel: str, status: int = 200, now: Optional[datetime] = None):
+        """Reset the failure count and close the channel's circuit"""
+        now = now or datetime.now(timezone.utc)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO channel_health (channel, consecutive_failures, last_status, last_success_at, open_until)
+                VALUES (?, 0, ?, ?, NULL)
+                ON CONFLICT(channel) DO UPDATE SET
+                    consecutive_failures = 0,
+                    last_status = excluded.last_status,
+                    last_error = NULL,
+                    last_success_at = excluded.last_success_at,
+                    open_until = NULL
+            ''', (channel, status, now.isoformat()))
+            conn.commit()
+
+    def record_failure(self, channel: str, status: Optional[int] = None, error: str = "",
+                       permanent: bool = False, now: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        Count a failed scrape and open the circuit once the threshold is reached.
+
+        Returns the time until which the channel is skipped, or None while the circuit stays closed.
+        """
+        now = now or datetime.now(timezone.utc)
+        health = self.get_health(channel)
+        failures = (health['consecutive_failures'] if health else 0) + 1
+        if permanent:
+            failures = max(failures, self.failure_threshold)
+
+        open_until = None
+        if failures >= self.failure_threshold:
+            open_until = now + self.backoff(failures)
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO channel_health (channel, consecutive_failures, last_status, last_error,
+                                            last_failure_at, open_until)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET
+                    consecutive_failures = excluded.consecutive_failures,
+                    last_status = excluded.last_status,
+                    last_error = excluded.last_error,
+                    last_failure_at = excluded.last_failure_at,
+                    open_until = excluded.open_until
+            ''', (channel, failures, status, error[:500], now.isoformat(),
+                  open_until.isoformat() if open_until else None))
+            conn.commit()
+
+        return open_until
+
+    def backoff(self, consecutive_failures: int) -> timedelta:
+        """Skip window after the given number of consecutive failures, doubling per failed probe"""
+        exponent = max(consecutive_failures - self.failure_threshold, 0)
+        hours = min(self.base_backoff_hours * (2 ** exponent), self.max_backoff_hours)
+        return timedelta(hours=hours)
+
+    @classmethod
+    def _row_to_dict(cls, row) -> Dict:
+        channel, failures, last_status, last_error, last_success_at, last_failure_at, open_until = row
+        return {
+            'channel': channel,
+            'consecutive_failures': failures,
+            'last_status': last_status,
+            'last_error': last_error,
+            'last_success_at': cls._parse_timestamp(last_success_at),
+            'last_failure_at': cls._parse_timestamp(last_failure_at),
+            'open_until': cls._parse_timestamp(open_until),
+        }
+
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[datetime]:
+        if not value:
+            return None
+        parsed = datetime.fromisoformat(value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
@@ -1,99 +1,254 @@
-import re
 import asyncio
+from collections import Counter
 import html
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from datetime import datetime, timedelta, timezone
 from src.telegram_client import TelegramClient
 from config.channels import TELEGRAM_CHANNELS
 from src.utils import async_retry_on_timeout
+from src.scrape_state import ScrapeStateStore
+from src.message_store import MessageStore
+from src.channel_health import ChannelHealthTracker, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN
+from src.exceptions import FetchBudgetExceeded, ChannelUnavailableError, RateLimitedError
+from src.html_parser import get_message_parser
+from src.keyword_matcher import KeywordMatcher
+from config.settings import MESSAGE_HISTORY_DAYS, MESSAGE_STORE_ENABLED
 
 
 class ChannelScraper:
     
-    def __init__(self, telegram_client: TelegramClient):
+    def __init__(self, telegram_client: TelegramClient, state_store: Optional[ScrapeStateStore] = None,
+                 full_rescan: bool = False, health_tracker: Optional[ChannelHealthTracker] = None,
+                 message_store: Optional[MessageStore] = None):
         self.telegram_client = telegram_client
         self.target_channels = TELEGRAM_CHANNELS
+        self.state_store = state_store or ScrapeStateStore()
+        self.health_tracker = health_tracker or ChannelHealthTracker()
+        if message_store is None and MESSAGE_STORE_ENABLED:
+            message_store = MessageStore()
+        self.message_store = message_store
+        self.html_parser = get_message_parser()
+        # Ignore the stored high-water marks and rescan the whole history window
+        self.full_rescan = full_rescan
+        # Fixed "now" for the history window (replays of archived pages); None uses the clock
+        self.reference_time = None
+        # Newest post id seen per channel this cycle, persisted by commit_watermarks()
+        self.pending_watermarks = {}
+        # Relevant messages of this cycle, stored by commit_watermarks()
+        self.pending_messages = []
+        # Channels fetched successfully this cycle (skipped and failed channels are left out)
+        self.scraped_channels = set()
         self.proxy_keywords = [
             'proxy', 'mtproto', 'socks5', 'socks', 'http', 'https',
             'tg://', 't.me/proxy', 't.me/socks', 'server', 'port', 'secret',
             'ip:', 'host:', 'address:', 'telegram proxy', 'vpn', 'connect',
             'обход блокировки', 'прокси', 'телеграм', 'подключение'  # Russian keywords
         ]
+        self.keyword_matcher = KeywordMatcher(self.proxy_keywords)
+        # How often each keyword made a message relevant in the current cycle
+        self.keyword_stats = Counter()
     
-    async def scrape_all_channels(self):
+    async def scrape_all_channels(self, channels: Optional[List[str]] = None,
+                                  on_messages: Optional[Callable[[List[Dict]], Awaitable[None]]] = None):
+        """
+        Scrape the given channel URLs (all target channels by default) and return their relevant messages.
+        
+        When `on_messages` is given it is awaited with each channel's relevant
+        messages as soon as that channel is done, so they can be processed while
+        the other channels are still being scraped.
+        """
+        channels = self.target_channels if channels is None else channels
+        self.telegram_client.reset_fetch_budget()
+        self.pending_watermarks = {}
+        self.pending_messages = []
+        self.scraped_channels = set()
+        self.keyword_stats = Counter()
+        
+        async def scrape(channel_url):
+            relevant_messages = await self._scrape_channel_relevant(channel_url)
+            if relevant_messages and on_messages:
+                await on_messages(relevant_messages)
+            return relevant_messages
+        
+        # Channels are scraped concurrently; the client's fetcher bounds per-host concurrency
+        results = await asyncio.gather(*(scrape(channel_url) for channel_url in channels))
+        
         all_messages = []
         successful_channels = 0
-        
-        for channel_url in self.target_channels:
-            print(f"Scraping channel: {self.get_channel_name_from_url(channel_url)}")
-            
-            try:
-                messages = await self.scrape_single_channel(channel_url)
-                if messages:
-                    relevant_messages = self.filter_relevant_messages(messages)
-                    all_messages.extend(relevant_messages)
-                    successful_channels += 1
-                    print(f"Found {len(relevant_messages)} relevant messages")
-                
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                print(f"Failed to scrape {channel_url}: {e}")
+        for relevant_messages in results:
+            if relevant_messages is None:
                 continue
+            all_messages.extend(relevant_messages)
+            successful_channels += 1
         
-        print(f"Successfully scraped {successful_channels}/{len(self.target_channels)} channels")
+        print(f"Successfully scraped {successful_channels}/{len(channels)} channels")
         print(f"Total relevant messages found: {len(all_messages)}")
+        if self.keyword_stats:
+            top_keywords = ', '.join(f"{keyword} ({count})" for keyword, count in self.keyword_stats.most_common(5))
+            print(f"Top matched keywords: {top_keywords}")
         return all_messages
     
-    @async_retry_on_timeout(max_retries=5, delay=2.0)
-    async def scrape_single_channel(self, channel_url: str):
+    async def _scrape_channel_relevant(self, channel_url: str):
+        """Scrape a single channel and return its relevant messages, or None if nothing was scraped"""
+        channel_name = self.get_channel_name_from_url(channel_url)
+        
+        # Broken channels are skipped until their backoff has passed, then probed once without retries
+        circuit_state = self.health_tracker.get_state(channel_name)
+        if circuit_state == CIRCUIT_OPEN:
+            print(f"⛔ Skipping {channel_name}: circuit open after repeated failures")
+            return None
+        
+        print(f"Scraping channel: {channel_name}" + (" (probe)" if circuit_state == CIRCUIT_HALF_OPEN else ""))
+        
         try:
-            channel_entity = await self.telegram_client.get_channel_entity(channel_url)
-            if not channel_entity:
-                return []
-            
-            messages = await self.telegram_client.fetch_channel_messages(
-                channel_entity, limit=200
+            if circuit_state == CIRCUIT_HALF_OPEN:
+                messages = await self._scrape_channel(channel_url)
+            else:
+                messages = await self.scrape_single_channel(channel_url)
+        
+        except (FetchBudgetExceeded, RateLimitedError) as e:
+            # Running out of budget or being rate limited says nothing about the channel's health
+            print(f"Skipped {channel_name}: {e}")
+            return None
+        
+        except Exception as e:
+            open_until = self.health_tracker.record_failure(
+                channel_name,
+                status=getattr(e, 'status', None),
+                error=str(e) or type(e).__name__,
+                permanent=isinstance(e, ChannelUnavailableError) or getattr(e, 'status', None) in (404, 410)
             )
-            
+            print(f"Failed to scrape {channel_url}: {e or type(e).__name__}")
+            if open_until:
+                print(f"⛔ Circuit opened for {channel_name} until {open_until.strftime('%Y-%m-%d %H:%M UTC')}")
+            return None
+        
+        self.health_tracker.record_success(channel_name)
+        self.scraped_channels.add(channel_name)
+        messages = self._skip_stored_messages(channel_name, messages)
+        if not messages:
+            return None
+        
+        relevant_messages = self.filter_relevant_messages(messages)
+        print(f"Found {len(relevant_messages)} relevant messages in {channel_name}")
+        self.pending_messages.extend(relevant_messages)
+        return relevant_messages
+    
+    def ingest_pushed_messages(self, messages: List[Any]) -> List[List[Dict]]:
+        """
+        Filter channel posts pushed through the Bot API like scraped ones and
+        return the relevant messages per channel
+        
+        The high-water marks are left alone: a pushed post says nothing about the
+        posts published before the bot started listening, and later scrapes skip
+        the pushed posts through the message store anyway.
+        """
+        by_channel = {}
+        for message in messages:
+            by_channel.setdefault(message.chat.username, []).append(message)
+        
+        channel_messages = []
+        for channel_name, posts in by_channel.items():
+            relevant_messages = self.filter_relevant_messages(self._skip_stored_messages(channel_name, posts))
+            if relevant_messages:
+                self.pending_messages.extend(relevant_messages)
+                channel_messages.append(relevant_messages)
+        return channel_messages
+    
+    def _skip_stored_messages(self, channel_name: str, messages: List[Any]):
+        """
+        Drop the posts already kept in the message store (a full rescan processes them again).
+        
+        Their proxies are not lost: the scheduler re-validates and republishes the
+        stored working proxies every cycle, whether or not their posts are seen again.
+        """
+        if not self.message_store or self.full_rescan or not messages:
             return messages
-            
-        except Exception as e:
-            print(f"Error scraping channel {channel_url}: {e}")
+        
+        stored = self.message_store.get_stored_ids(channel_name, [getattr(message, 'id', '') for message in messages])
+        if not stored:
+            return messages
+        
+        print(f"🗃️ {channel_name}: skipping {len(stored)} already stored messages")
+        return [message for message in messages if str(getattr(message, 'id', '')) not in stored]
+    
+    @async_retry_on_timeout(max_retries=5, delay=2.0)
+    async def scrape_single_channel(self, channel_url: str):
+        """Scrape a channel, retrying timeouts; other fetch errors are raised to the caller"""
+        return await self._scrape_channel(channel_url)
+    
+    async def _scrape_channel(self, channel_url: str):
+        channel_entity = await self.telegram_client.get_channel_entity(channel_url)
+        if not channel_entity:
             return []
+        
+        channel_name = self.get_channel_name_from_url(channel_url)
+        watermark = None if self.full_rescan else self.state_store.get_watermark(channel_name)
+        
+        messages = await self.telegram_client.fetch_channel_messages(
+            channel_entity, since=self.get_cutoff_date(), min_post_id=watermark
+        )
+        
+        self._track_watermark(channel_name, messages)
+        return messages
+    
+    def _track_watermark(self, channel_name: str, messages: List[Any]):
+        post_ids = [int(message.id) for message in messages
+                    if str(getattr(message, 'id', '')).isdigit()]
+        if post_ids:
+            newest = max(post_ids)
+            self.pending_watermarks[channel_name] = max(newest, self.pending_watermarks.get(channel_name, 0))
+    
+    def commit_watermarks(self):
+        """Persist the high-water marks and store the relevant messages once this cycle's messages have been processed"""
+        if self.message_store and self.pending_messages:
+            stored = self.message_store.save_messages(self.pending_messages)
+            print(f"🗃️ Stored {stored} relevant messages")
+        self.pending_messages = []
+        
+        if not self.pending_watermarks:
+            return
+        
+        self.state_store.save_watermarks(self.pending_watermarks)
+        print(f"🔖 Updated high-water marks for {len(self.pending_watermarks)} channels")
+        self.pending_watermarks = {}
     
     def filter_relevant_messages(self, messages: List[Any]):
         relevant_messages = []
-        cutoff_date = datetime.now() - timedelta(days=30)
+        cutoff_date = self.get_cutoff_date()
         
         for message in messages:
-            if not message or not hasattr(message, 'date'):
+            if not message or not getattr(message, 'date', None):
                 continue
             
-            if message.date < cutoff_date:
+            # Scraped dates are timezone-aware; naive dates from other sources are taken as UTC
+            message_date = message.date
+            if message_date.tzinfo is None:
+                message_date = message_date.replace(tzinfo=timezone.utc)
+            
+            if message_date < cutoff_date:
                 continue
             
             # Extract all <a> tags and their href attributes
             message_data = self.extract_full_message_data(message)
             
-            # Only include messages with href attributes or proxy keywords
-            if message_data['hrefs'] or self.is_message_containing_proxy(message_data['combined_text']):
+            # Only include messages with href attributes or proxy keywords in their plain text
+            if message_data['hrefs'] or self.is_message_containing_proxy(message_data['text']):
                 relevant_messages.append({
                     'id': message.id,
                     'date': message.date,
                     'text': message_data['text'],
                     'html': message_data['html'],
                     'hrefs': message_data['hrefs'],
-                    'combined_text': message_data['combined_text'],
-                    'channel': message.chat.username if hasattr(message.chat, 'username') else 'unknown'
+                    'channel': message.chat.username if hasattr(message.chat, 'username') else 'unknown',
+                    'forwarded_from': message.forwarded_from if isinstance(getattr(message, 'forwarded_from', None), str) else ''
                 })
         
         return relevant_messages
     
     def extract_full_message_data(self, message: Any):
         if not message:
-            return {'text': '', 'html': '', 'hrefs': [], 'combined_text': ''}
+            return {'text': '', 'html': '', 'hrefs': []}
         
         text = ""
         html_content = ""
@@ -107,44 +262,35 @@ class ChannelScraper:
         # Get HTML content if available
         if hasattr(message, 'html') and message.html:
             html_content = message.html
-            
-            # Extract all href attributes from <a> tags in HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            for a_tag in soup.find_all('a'):
-                href = a_tag.get('href')
-                if href:
-                    hrefs.append(href)
-        
-        # If no BeautifulSoup extraction, try with regex as fallback
-        if not hrefs and html_content:
-            href_pattern = r'<a [^>]*href=["\']([^"\']+)["\'][^>]*>'
-            href_matches = re.finditer(href_pattern, html_content, re.IGNORECASE)
-            for match in href_matches:
-                href = match.group(1)
-                if href:
-                    hrefs.append(href)
-        
-        # Combine all text sources for keyword matching
-        combined_text = text + " " + html_content
+        
+        # Links found while the page was parsed are carried on the message, so the
+        # HTML is only parsed again for messages that did not come from a page parse
+        carried_hrefs = getattr(message, 'hrefs', None)
+        if isinstance(carried_hrefs, (list, tuple)):
+            hrefs = list(carried_hrefs)
+        elif html_content:
+            hrefs = self.html_parser.extract_hrefs(html_content)
         
         return {
             'text': text.strip(),
             'html': html_content,
-            'hrefs': hrefs,
-            'combined_text': combined_text.strip()
+            'hrefs': hrefs
         }
     
     def is_message_containing_proxy(self, message_text: str):
-        if not message_text:
-            return False
-        
-        text_lower = message_text.lower()
-        
-        for keyword in self.proxy_keywords:
-            if keyword in text_lower:
-                return True
-        
-        return False
+        return self.match_proxy_keyword(message_text) is not None
+    
+    def match_proxy_keyword(self, message_text: str):
+        """Return the proxy keyword found in the text (single pass), recording it in keyword_stats"""
+        keyword = self.keyword_matcher.match(message_text)
+        if keyword:
+            self.keyword_stats[keyword] += 1
+        return keyword
+    
+    def get_cutoff_date(self):
+        """Oldest message date that is still crawled and considered relevant"""
+        now = self.reference_time or datetime.now(timezone.utc)
+        return now - timedelta(days=MESSAGE_HISTORY_DAYS)
     
     def get_channel_name_from_url(self, channel_url: str):
         if not channel_url:
@@ -0,0 +1,239 @@
+import math
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from config.settings import (
+    DATABASE_PATH, CHANNEL_MIN_INTERVAL_HOURS, CHANNEL_MAX_INTERVAL_HOURS,
+    CHANNEL_YIELD_SMOOTHING, CHANNEL_YIELD_TARGET, CHANNEL_FRESHNESS_HALF_LIFE_HOURS,
+    CHANNEL_SCHEDULE_SLACK_MINUTES
+)
+
+
+class ChannelYieldTracker:
+    """
+    Tracks how many working proxies each channel produces and when it is next due.
+
+    Every working proxy is credited to the channel and message it was first seen
+    in (its lineage). A channel's yield score is an EWMA of the working proxies
+    per scrape it was the source of, whether new or reposted, and its freshness
+    decays with the time since its last new proxy; together they place the poll
+    interval between the min and max interval.
+
+    Observations are staged during a cycle and persisted by commit_cycle(), so a
+    failed cycle leaves the scores and schedule untouched.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH,
+                 min_interval_hours: float = CHANNEL_MIN_INTERVAL_HOURS,
+                 max_interval_hours: float = CHANNEL_MAX_INTERVAL_HOURS,
+                 smoothing: float = CHANNEL_YIELD_SMOOTHING,
+                 yield_target: float = CHANNEL_YIELD_TARGET,
+                 freshness_half_life_hours: float = CHANNEL_FRESHNESS_HALF_LIFE_HOURS):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.min_interval_hours = min_interval_hours
+        self.max_interval_hours = max(max_interval_hours, min_interval_hours)
+        self.smoothing = smoothing
+        self.yield_target = yield_target
+        self.freshness_half_life_hours = freshness_half_life_hours
+        # proxy key -> (channel, message id, posted at) of its earliest message this cycle
+        self.pending_sources = {}
+        self.pending_working = set()
+        self._initialize_database()
+
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS proxy_lineage (
+                    proxy_key TEXT PRIMARY KEY,
+                    channel TEXT NOT NULL,
+                    message_id TEXT,
+                    first_seen TIMESTAMP NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS channel_yield (
+                    channel TEXT PRIMARY KEY,
+                    yield_score REAL NOT NULL DEFAULT 0,
+                    scrape_count INTEGER NOT NULL DEFAULT 0,
+                    total_new_proxies INTEGER NOT NULL DEFAULT 0,
+                    last_scraped_at TIMESTAMP,
+                    last_new_proxy_at TIMESTAMP,
+                    next_due_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_proxy_lineage_channel ON proxy_lineage(channel)')
+            conn.commit()
+
+    def observe(self, proxy_key: str, channel: str, message_id, posted_at: Optional[datetime] = None):
+        """Stage the message a proxy was extracted from; the earliest message wins"""
+        current = self.pending_sources.get(proxy_key)
+        if current is None or (posted_at and current[2] and posted_at < current[2]):
+            self.pending_sources[proxy_key] = (channel, str(message_id), posted_at)
+
+    def mark_working(self, proxy_keys: Iterable[str]):
+        self.pending_working.update(proxy_keys)
+
+    def discard(self):
+        self.pending_sources = {}
+        self.pending_working = set()
+
+    def _record_lineage(self, cursor, now: datetime):
+        """
+        Record lineage for the working proxies never seen before; returns the new and
+        the working proxies per source channel of this cycle
+        """
+        new_per_channel, working_per_channel = {}, {}
+        for proxy_key in self.pending_working:
+            source = self.pending_sources.get(proxy_key)
+            if not source:
+                continue
+            channel, message_id, _ = source
+            working_per_channel[channel] = working_per_channel.get(channel, 0) + 1
+            cursor.execute('''
+                INSERT OR IGNORE INTO proxy_lineage (proxy_key, channel, message_id, first_seen)
+                VALUES (?, ?, ?, ?)
+            ''', (proxy_key, channel, message_id, now.isoformat()))
+            if cursor.rowcount:
+                new_per_channel[channel] = new_per_channel.get(channel, 0) + 1
+        return new_per_channel, working_per_channel
+
+    def commit_lineage(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Record lineage for the working proxies never seen before without scoring or
+        rescheduling any channel, for posts that were not scraped (e.g. pushed to the bot).
+
+        Returns the number of new working proxies per source channel.
+        """
+        now = now or datetime.now(timezone.utc)
+        with sqlite3.connect(self.db_path) as conn:
+            new_per_channel, _ = self._record_lineage(conn.cursor(), now)
+            conn.commit()
+
+        self.discard()
+        return new_per_channel
+
+    def commit_cycle(self, channels: Iterable[str], now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Record lineage for the working proxies never seen before, update the yield
+        of every scraped channel and schedule its next scrape.
+
+        Returns the number of new working proxies per scraped channel.
+        """
+        now = now or datetime.now(timezone.utc)
+        channels = list(dict.fromkeys(channels))
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            new_counts, working_counts = self._record_lineage(cursor, now)
+            new_per_channel = {channel: new_counts.get(channel, 0) for channel in channels}
+
+            for channel, new_count in new_per_channel.items():
+                # Reposts of proxies that still work keep a channel productive, only new ones keep it fresh
+                working_count = working_counts.get(channel, 0)
+                cursor.execute(
+                    'SELECT yield_score, scrape_count, last_new_proxy_at FROM channel_yield WHERE channel = ?',
+                    (channel,)
+                )
+                row = cursor.fetchone()
+
+                if row and row[1]:
+                    yield_score = self.smoothing * working_count + (1 - self.smoothing) * row[0]
+                else:
+                    yield_score = float(working_count)
+
+                last_new_proxy_at = now if new_count else self._parse_timestamp(row[2] if row else None)
+                next_due_at = now + self.next_interval(yield_score, last_new_proxy_at, now)
+
+                cursor.execute('''
+                    INSERT INTO channel_yield (channel, yield_score, scrape_count, total_new_proxies,
+                                               last_scraped_at, last_new_proxy_at, next_due_at)
+                    VALUES (?, ?, 1, ?, ?, ?, ?)
+                    ON CONFLICT(channel) DO UPDATE SET
+                        yield_score = excluded.yield_score,
+                        scrape_count = scrape_count + 1,
+                        total_new_proxies = total_new_proxies + excluded.total_new_proxies,
+                        last_scraped_at = excluded.last_scraped_at,
+                        last_new_proxy_at = excluded.last_new_proxy_at,
+                        next_due_at = excluded.next_due_at
+                ''', (
+                    channel, yield_score, new_count, now.isoformat(),
+                    last_new_proxy_at.isoformat() if last_new_proxy_at else None,
+                    next_due_at.isoformat()
+                ))
+
+            conn.commit()
+
+        self.discard()
+        return new_per_channel
+
+    def freshness(self, last_new_proxy_at: Optional[datetime], now: Optional[datetime] = None) -> float:
+        """1.0 right after a new proxy, halving every freshness half-life; 0.0 if it never produced one"""
+        if not last_new_proxy_at:
+            return 0.0
+        now = now or datetime.now(timezone.utc)
+        hours = max((now - last_new_proxy_at).total_seconds() / 3600, 0)
+        return 0.5 ** (hours / self.freshness_half_life_hours)
+
+    def priority(self, yield_score: float, last_new_proxy_at: Optional[datetime],
+                 now: Optional[datetime] = None) -> float:
+        """Scheduling priority between 0 (dead channel) and 1 (most productive)"""
+        yield_component = 1 - math.exp(-yield_score / self.yield_target) if self.yield_target else 0.0
+        return max(yield_component, self.freshness(last_new_proxy_at, now))
+
+    def next_interval(self, yield_score: float, last_new_proxy_at: Optional[datetime],
+                      now: Optional[datetime] = None) -> timedelta:
+        priority = self.priority(yield_score, last_new_proxy_at, now)
+        hours = self.max_interval_hours - (self.max_interval_hours - self.min_interval_hours) * priority
+        return timedelta(hours=hours)
+
+    def get_due_channels(self, channels: Iterable[str], now: Optional[datetime] = None,
+                         slack_minutes: float = CHANNEL_SCHEDULE_SLACK_MINUTES) -> List[str]:
+        """Return the channels whose next scrape is due; channels never scraped are always due"""
+        horizon = (now or datetime.now(timezone.utc)) + timedelta(minutes=slack_minutes)
+        schedule = {row['channel']: row['next_due_at'] for row in self.get_channel_stats()}
+
+        return [channel for channel in channels
+                if not schedule.get(channel) or schedule[channel] <= horizon]
+
+    def get_channel_stats(self) -> List[Dict]:
+        """Yield statistics per channel, most productive first"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT channel, yield_score, scrape_count, total_new_proxies,
+                       last_scraped_at, last_new_proxy_at, next_due_at
+                FROM channel_yield
+                ORDER BY yield_score DESC, total_new_proxies DESC
+            ''')
+            return [{
+                'channel': channel,
+                'yield_score': yield_score,
+                'scrape_count': scrape_count,
+                'total_new_proxies': total_new_proxies,
+                'last_scraped_at': self._parse_timestamp(last_scraped_at),
+                'last_new_proxy_at': self._parse_timestamp(last_new_proxy_at),
+                'next_due_at': self._parse_timestamp(next_due_at),
+            } for channel, yield_score, scrape_count, total_new_proxies,
+                  last_scraped_at, last_new_proxy_at, next_due_at in cursor.fetchall()]
+
+    def get_lineage(self, proxy_key: str) -> Optional[Dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT channel, message_id, first_seen FROM proxy_lineage WHERE proxy_key = ?',
+                (proxy_key,)
+            )
+            result = cursor.fetchone()
+            if not result:
+                return None
+            return {'channel': result[0], 'message_id': result[1], 'first_seen': self._parse_timestamp(result[2])}
+
+    @staticmethod
+    def _parse_timestamp(value) -> Optional[datetime]:
+        if not value:
+            return None
+        parsed = datetime.fromisoformat(value)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
@@ -1 +1,31 @@
- 
\ No newline at end of file
+class TelProxyError(Exception):
+    """Base class for errors raised by the proxy scraper"""
+
+
+class PageFetchError(TelProxyError):
+    """Raised when a channel page could not be fetched"""
+    
+    def __init__(self, url: str, status: int = None, message: str = ""):
+        self.url = url
+        self.status = status
+        super().__init__(message or f"Failed to fetch {url} (status: {status})")
+
+
+class FetchBudgetExceeded(TelProxyError):
+    """Raised when the per-cycle page fetch budget has been used up"""
+    
+    def __init__(self, budget: int):
+        self.budget = budget
+        super().__init__(f"Fetch budget of {budget} requests exhausted for this cycle")
+
+
+class ChannelUnavailableError(PageFetchError):
+    """Raised when a channel has no public message history (renamed, private or deleted)"""
+
+
+class RateLimitedError(PageFetchError):
+    """Raised when a page request kept being rate limited (HTTP 429) after all retries"""
+    
+    def __init__(self, url: str, retry_after: float = None):
+        self.retry_after = retry_after
+        super().__init__(url, 429, f"Rate limited fetching {url} (retry after {retry_after or 0:.0f}s)")
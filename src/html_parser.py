@@ -0,0 +1,275 @@
+import re
+from datetime import datetime, timezone
+from typing import List, Optional
+from bs4 import BeautifulSoup
+from src.models import ScrapedChat, ScrapedMessage
+from config.settings import HTML_PARSER_BACKEND
+
+try:
+    import lxml.etree
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Cheap byte-level scans used to drive pagination without a full parse
+POST_ID_PATTERN = re.compile(rb'data-post="[^"/]+/(\d+)"')
+DATETIME_PATTERN = re.compile(rb'<time[^>]*\sdatetime="([^"]+)"')
+
+# XPath equivalent of the CSS class selectors div.tgme_widget_message etc.
+MESSAGE_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' tgme_widget_message ')]"
+TEXT_XPATH = ".//div[contains(concat(' ', normalize-space(@class), ' '), ' tgme_widget_message_text ')]"
+DATE_XPATH = ".//*[contains(concat(' ', normalize-space(@class), ' '), ' tgme_widget_message_date ')]//time/@datetime"
+FORWARD_XPATH = ".//a[contains(concat(' ', normalize-space(@class), ' '), ' tgme_widget_message_forwarded_from_name ')]/@href"
+
+
+def forwarded_channel(href: Optional[str]) -> str:
+    """Username of the channel in a forwarded-from link (https://t.me/<name>/<post id>)"""
+    if not href or 't.me/' not in href:
+        return ''
+    return href.split('t.me/', 1)[1].split('/')[0].split('?')[0]
+
+
+def scan_post_ids(page_body: bytes) -> List[int]:
+    return [int(post_id) for post_id in POST_ID_PATTERN.findall(page_body)]
+
+
+def scan_datetimes(page_body: bytes) -> List[datetime]:
+    dates = [parse_datetime(value.decode('ascii', errors='ignore'))
+             for value in DATETIME_PATTERN.findall(page_body)]
+    return [date for date in dates if date]
+
+
+def parse_datetime(value: str) -> Optional[datetime]:
+    """Parse an ISO timestamp into a timezone-aware datetime (UTC when no offset is given)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def slice_new_containers(page_body: bytes, min_post_id: Optional[int]) -> Optional[bytes]:
+    """
+    Cut the page down to the containers newer than `min_post_id`.
+
+    Containers are listed oldest first, so everything before the first newer
+    container can be dropped without parsing it. Returns None when the page
+    holds nothing newer.
+    """
+    if not min_post_id:
+        return page_body
+
+    for match in POST_ID_PATTERN.finditer(page_body):
+        if int(match.group(1)) > min_post_id:
+            container_start = page_body.rfind(b'<div', 0, match.start())
+            return page_body[max(container_start, 0):]
+    return None
+
+
+def build_message(fields, chat: ScrapedChat, fallback_date: datetime,
+                  min_post_id: Optional[int] = None) -> Optional[ScrapedMessage]:
+    """
+    Turn the fields of a message container into a ScrapedMessage; None when the
+    post is not newer than `min_post_id`
+    """
+    message_id, text, html_content, date_str, hrefs, forward_href = fields
+    if min_post_id and (not message_id.isdigit() or int(message_id) <= min_post_id):
+        return None
+
+    return ScrapedMessage(
+        id=message_id,
+        date=parse_datetime(date_str) or fallback_date,
+        message=text,
+        html=html_content,
+        hrefs=tuple(hrefs),
+        chat=chat,
+        forwarded_from=forwarded_channel(forward_href)
+    )
+
+
+class MessagePageParser:
+    """Base class for t.me/s message page parsers"""
+
+    name = 'base'
+
+    def parse_messages(self, page_body: bytes, channel_name: str,
+                       min_post_id: Optional[int] = None) -> List[ScrapedMessage]:
+        page_body = slice_new_containers(page_body, min_post_id)
+        if page_body is None:
+            return []
+
+        # One chat object is shared by every message of the page
+        chat = ScrapedChat(username=channel_name)
+        fallback_date = datetime.now(timezone.utc)
+
+        messages = []
+        for fields in self._iter_containers(page_body):
+            message = build_message(fields, chat, fallback_date, min_post_id)
+            if message:
+                messages.append(message)
+
+        return messages
+
+    def _iter_containers(self, page_body: bytes):
+        """Yield (message id, text, text html, datetime string, hrefs, forwarded-from href) per message container"""
+        raise NotImplementedError
+
+    def extract_hrefs(self, html_fragment: str) -> List[str]:
+        raise NotImplementedError
+
+
+class SoupMessageParser(MessagePageParser):
+    """Pure-Python parser using BeautifulSoup with the built-in html.parser"""
+
+    name = 'html.parser'
+
+    def _iter_containers(self, page_body: bytes):
+        soup = BeautifulSoup(page_body.decode('utf-8', errors='replace'), 'html.parser')
+
+        for container in soup.select('div.tgme_widget_message'):
+            message_id = container.get('data-post', '').split('/')[-1]
+
+            text_div = container.select_one('div.tgme_widget_message_text')
+            text = text_div.get_text() if text_div else ''
+            html_content = str(text_div) if text_div else ''
+
+            # The date is rendered as <a> on t.me, so it is matched by class only
+            time_tag = container.select_one('.tgme_widget_message_date time')
+            date_str = time_tag.get('datetime', '') if time_tag else ''
+
+            hrefs = [a_tag.get('href') for a_tag in text_div.find_all('a') if a_tag.get('href')] if text_div else []
+
+            forward_tag = container.select_one('a.tgme_widget_message_forwarded_from_name')
+            forward_href = forward_tag.get('href', '') if forward_tag else ''
+
+            yield message_id, text, html_content, date_str, hrefs, forward_href
+
+    def extract_hrefs(self, html_fragment: str) -> List[str]:
+        soup = BeautifulSoup(html_fragment, 'html.parser')
+        return [a_tag.get('href') for a_tag in soup.find_all('a') if a_tag.get('href')]
+
+
+def lxml_container_fields(container):
+    """(message id, text, text html, datetime string, hrefs, forwarded-from href) of an lxml message container"""
+    message_id = (container.get('data-post') or '').split('/')[-1]
+
+    text_divs = container.xpath(TEXT_XPATH)
+    text_div = text_divs[0] if text_divs else None
+    text = text_div.text_content() if text_div is not None else ''
+    html_content = lxml.html.tostring(text_div, encoding='unicode', with_tail=False) if text_div is not None else ''
+
+    dates = container.xpath(DATE_XPATH)
+    date_str = dates[0] if dates else ''
+
+    hrefs = [href for href in text_div.xpath('.//a/@href') if href] if text_div is not None else []
+
+    forwards = container.xpath(FORWARD_XPATH)
+    forward_href = forwards[0] if forwards else ''
+
+    return message_id, text, html_content, date_str, hrefs, forward_href
+
+
+class LxmlMessageParser(MessagePageParser):
+    """Compiled libxml2 parser working directly on the response bytes"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        # Sliced pages lose their <meta charset>, so the encoding is fixed explicitly
+        self._parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def _iter_containers(self, page_body: bytes):
+        if not page_body.strip():
+            return
+
+        root = lxml.html.fromstring(page_body, parser=self._parser)
+
+        for container in root.xpath(MESSAGE_XPATH):
+            yield lxml_container_fields(container)
+
+    def extract_hrefs(self, html_fragment: str) -> List[str]:
+        if not html_fragment.strip():
+            return []
+        fragment = lxml.html.fragment_fromstring(html_fragment, create_parent='div')
+        return [href for href in fragment.xpath('.//a/@href') if href]
+
+
+class StreamingMessageParser:
+    """
+    Feed-style lxml parser for a page that is still downloading.
+
+    Chunks are fed as they arrive and every message container is turned into a
+    ScrapedMessage as soon as its element closes. Finished containers are
+    dropped from the tree, so a page is never held as a full document tree.
+    The messages match those of LxmlMessageParser for the same page.
+    """
+
+    def __init__(self, channel_name: str, min_post_id: Optional[int] = None):
+        self.chat = ScrapedChat(username=channel_name)
+        self.min_post_id = min_post_id
+        self.fallback_date = datetime.now(timezone.utc)
+        self.messages = []
+        self.bytes_fed = 0
+        self._parser = lxml.etree.HTMLPullParser(events=('end',), tag='div', encoding='utf-8')
+        # Build lxml.html elements, as LxmlMessageParser does, for text_content() and friends
+        self._parser.set_element_class_lookup(lxml.html.HtmlElementClassLookup())
+
+    def feed(self, chunk: bytes) -> List[ScrapedMessage]:
+        """Parse a chunk and return the messages completed by it"""
+        self.bytes_fed += len(chunk)
+        self._parser.feed(chunk)
+        return self._read_messages()
+
+    def close(self) -> List[ScrapedMessage]:
+        """Finish the page and return all of its messages"""
+        if self.bytes_fed:
+            self._parser.close()
+            self._read_messages()
+        return self.messages
+
+    def _read_messages(self) -> List[ScrapedMessage]:
+        completed = []
+        for _, element in self._parser.read_events():
+            if 'tgme_widget_message' not in (element.get('class') or '').split():
+                continue
+
+            message = build_message(lxml_container_fields(element), self.chat, self.fallback_date, self.min_post_id)
+            if message:
+                completed.append(message)
+
+            # Drop the finished container and the containers before it
+            element.clear(keep_tail=True)
+            wrapper = element.getparent()
+            while wrapper is not None and wrapper.getprevious() is not None:
+                wrapper.getparent().remove(wrapper.getprevious())
+
+        self.messages.extend(completed)
+        return completed
+
+
+PARSER_BACKENDS = {
+    SoupMessageParser.name: SoupMessageParser,
+    LxmlMessageParser.name: LxmlMessageParser,
+}
+
+
+def get_message_parser(backend: str = HTML_PARSER_BACKEND) -> MessagePageParser:
+    """
+    Return a parser for the configured backend ('auto', 'lxml' or 'html.parser').
+
+    'auto' prefers lxml and falls back to html.parser when lxml is not installed.
+    """
+    if backend == 'auto':
+        backend = LxmlMessageParser.name if HAS_LXML else SoupMessageParser.name
+
+    if backend == LxmlMessageParser.name and not HAS_LXML:
+        print("⚠️ lxml is not installed, falling back to html.parser")
+        backend = SoupMessageParser.name
+
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {backend}")
+
+    return PARSER_BACKENDS[backend]()
@@ -0,0 +1,49 @@
+import re
+from typing import Dict, Iterable, Optional
+
+
+def build_trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Build a regex alternation with shared prefixes factored out ('socks', 'socks5'
+    becomes 'socks(?:5)?'), so the engine never re-tests a common prefix.
+    Greedy optional groups make the longest keyword win at a given position.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def to_pattern(node):
+        branches = [re.escape(char) + to_pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return to_pattern(trie)
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword matcher compiled into a single regex.
+
+    The text is lowercased once and scanned in one pass instead of once per
+    keyword, and the keyword that matched is returned so callers can keep stats.
+    """
+    
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = {keyword.lower(): keyword for keyword in keywords if keyword}
+        self.pattern = re.compile(build_trie_pattern(self.keywords)) if self.keywords else None
+    
+    def match(self, text: str) -> Optional[str]:
+        """Return the first keyword found in the text, or None"""
+        if not text or self.pattern is None:
+            return None
+        
+        match = self.pattern.search(text.lower())
+        return self.keywords[match.group(0)] if match else None
+    
+    def __contains__(self, text: str) -> bool:
+        return self.match(text) is not None
@@ -1,30 +1,136 @@
 import asyncio
 import sys
+import sqlite3
+import tempfile
+from datetime import datetime, timezone
 from src.scheduler import ProxyScheduler
+from src.replay import run_replay
+from src.message_store import MessageStore
+from src.reextract import Reextractor, print_reextraction_report
+from src.proxy_validator import ProxyValidator
+
+
+def get_option(name):
+    """Return the value of a --name=value option, or None"""
+    prefix = f'--{name}='
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return None
+
+
+async def replay(archive_path):
+    at = get_option('at')
+    reference_time = None
+    if at:
+        reference_time = datetime.fromisoformat(at)
+        if reference_time.tzinfo is None:
+            reference_time = reference_time.replace(tzinfo=timezone.utc)
+    
+    work_dir = get_option('workdir')
+    if work_dir:
+        await run_replay(archive_path, work_dir, reference_time)
+        return
+    
+    with tempfile.TemporaryDirectory(prefix='telproxy-replay-') as work_dir:
+        await run_replay(archive_path, work_dir, reference_time)
+
+
+def search_messages(query):
+    """Print the stored messages matching a full-text query"""
+    limit = get_option('limit')
+    try:
+        results = MessageStore().search(query, channel=get_option('channel'), limit=int(limit) if limit else 50,
+                                        raw='--raw' in sys.argv)
+    except sqlite3.OperationalError as e:
+        print(f"❌ Invalid search query {query!r}: {e}")
+        print("Usage: python -m src.main search <query> [--channel=NAME] [--limit=N] [--raw]")
+        return
+    for message in results:
+        date = message['date'].strftime('%Y-%m-%d %H:%M') if message['date'] else '?'
+        text = ' '.join(message['text'].split())
+        print(f"[{date}] {message['channel']}/{message['id']}: {text[:200]}")
+    print(f"🔎 {len(results)} stored messages match {query!r}")
+
+
+async def reextract():
+    """Run the current extractor over the stored messages, optionally validating the new proxies"""
+    workers = get_option('workers')
+    reextractor = Reextractor(workers=int(workers)) if workers else Reextractor()
+    result = reextractor.run(channel=get_option('channel'))
+    print_reextraction_report(result)
+    
+    if '--validate' in sys.argv and result.new_proxies:
+        working = await ProxyValidator().validate_all_proxies(result.new_proxies)
+        for proxy in working:
+            reextractor.proxy_storage.update_proxy_status(proxy, True)
+        print(f"✅ {len(working)}/{len(result.new_proxies)} new proxies are working")
 
 
 async def main():
     print("🔍 Telegram Proxy Scraper")
     print("========================")
     
-    scheduler = ProxyScheduler()
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    full_rescan = '--full-rescan' in sys.argv
+    
+    if args and args[0] == 'replay':
+        if len(args) < 2:
+            print("Usage: python -m src.main replay <archive> [--at=ISO_TIME] [--workdir=DIR]")
+            return
+        print("📼 Replaying an archived cycle offline...")
+        await replay(args[1])
+        return
+    
+    if args and args[0] == 'search':
+        if len(args) < 2:
+            print("Usage: python -m src.main search <query> [--channel=NAME] [--limit=N] [--raw]")
+            return
+        search_messages(' '.join(args[1:]))
+        return
+    
+    if args and args[0] == 'reextract':
+        print("♻️ Re-extracting proxies from the stored messages...")
+        await reextract()
+        return
+    
+    scheduler = ProxyScheduler(full_rescan=full_rescan)
+    
+    if full_rescan:
+        print("♻️ Full rescan: ignoring stored channel high-water marks")
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == 'once':
+    if args:
+        if args[0] == 'once':
             print("🎯 Running single extraction cycle...")
             await scheduler.run_single_cycle()
-        elif sys.argv[1] == 'schedule':
+        elif args[0] == 'schedule':
             print("⏰ Starting scheduled hourly runs...")
             await scheduler.start_scheduler()
+        elif args[0] == 'listen':
+            print("📨 Starting push ingestion of channel posts...")
+            await scheduler.start_bot_ingestion()
         else:
             print("Usage:")
             print("  python -m src.main once      # Run single cycle")
             print("  python -m src.main schedule  # Start hourly scheduler")
+            print("  python -m src.main listen    # Ingest posts of channels where the bot is an admin as they arrive")
             print("  python -m src.main           # Run single cycle (default)")
+            print("  python -m src.main replay <archive>  # Replay a cycle from the page archive, offline")
+            print("  python -m src.main search <query>    # Full-text search of the stored messages")
+            print("  python -m src.main reextract         # Extract proxies again from all stored messages")
+            print("")
+            print("Options:")
+            print("  --full-rescan                # Ignore stored high-water marks and rescan all history")
+            print("  --at=ISO_TIME                # Replay: use the pages archived up to this time")
+            print("  --workdir=DIR                # Replay: keep the replay database and JSON export in DIR")
+            print("  --channel=NAME               # Search: only messages of this channel")
+            print("  --limit=N                    # Search: show at most N messages (default 50)")
+            print("  --workers=N                  # Reextract: worker processes (0 = in-process)")
+            print("  --validate                   # Reextract: validate the new proxies right away")
     else:
         print("🎯 Running single extraction cycle...")
         await scheduler.run_single_cycle()
 
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,188 @@
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from config.settings import DATABASE_PATH
+
+
+def fts5_available() -> bool:
+    """Whether the linked SQLite was built with the FTS5 extension"""
+    try:
+        with sqlite3.connect(':memory:') as conn:
+            conn.execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(text)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+HAS_FTS5 = fts5_available()
+
+
+class MessageStore:
+    """
+    Relevant scraped messages kept in the proxies database.
+
+    Every relevant message (channel, post id, date, text, hrefs) is stored once,
+    so messages can be searched and re-extracted later without refetching their
+    pages, and ChannelScraper skips posts it already stored. The message text is
+    indexed with FTS5 when SQLite provides it; search() falls back to a LIKE scan
+    otherwise.
+    """
+    
+    def __init__(self, db_path: str = DATABASE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._initialize_database()
+    
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS messages (
+                    channel TEXT NOT NULL,
+                    post_id INTEGER NOT NULL,
+                    date TIMESTAMP,
+                    text TEXT NOT NULL DEFAULT '',
+                    hrefs TEXT NOT NULL DEFAULT '[]',
+                    forwarded_from TEXT NOT NULL DEFAULT '',
+                    stored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(channel, post_id)
+                )
+            ''')
+            if HAS_FTS5:
+                # External-content index over messages.text, kept in sync by triggers
+                cursor.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts
+                    USING fts5(text, content='messages', content_rowid='rowid')
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                        INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+                    END
+                ''')
+                cursor.execute('''
+                    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+                    END
+                ''')
+            conn.commit()
+    
+    def get_stored_ids(self, channel: str, post_ids: Iterable) -> Set[str]:
+        """The given post ids of a channel that are already stored"""
+        numeric = [int(post_id) for post_id in post_ids if str(post_id).isdigit()]
+        if not numeric:
+            return set()
+        
+        stored = set()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            # Chunked to stay below SQLite's host parameter limit
+            for start in range(0, len(numeric), 500):
+                chunk = numeric[start:start + 500]
+                cursor.execute(
+                    f'SELECT post_id FROM messages WHERE channel = ? AND post_id IN ({",".join("?" * len(chunk))})',
+                    [channel, *chunk]
+                )
+                stored.update(str(post_id) for post_id, in cursor.fetchall())
+        return stored
+    
+    def save_messages(self, messages: List[Dict]) -> int:
+        """Store relevant messages (filter_relevant_messages dicts); returns how many were new"""
+        rows = []
+        for message in messages:
+            if not str(message.get('id', '')).isdigit():
+                continue
+            date = message.get('date')
+            rows.append((
+                message.get('channel', 'unknown'),
+                int(message['id']),
+                date.isoformat() if isinstance(date, datetime) else date,
+                message.get('text', ''),
+                json.dumps(list(message.get('hrefs') or [])),
+                message.get('forwarded_from') or ''
+            ))
+        if not rows:
+            return 0
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR IGNORE INTO messages (channel, post_id, date, text, hrefs, forwarded_from)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+            # Rows written by the index triggers are not counted
+            return cursor.rowcount
+    
+    def search(self, query: str, channel: Optional[str] = None, limit: int = 50, raw: bool = False) -> List[Dict]:
+        """
+        Messages containing `query` as a phrase (best match first), or a substring without FTS5.
+        
+        With `raw` the query is passed to FTS5 as is, so its syntax (OR, NEAR, prefix*)
+        can be used; malformed queries then raise sqlite3.OperationalError.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            if HAS_FTS5:
+                sql = '''
+                    SELECT m.channel, m.post_id, m.date, m.text, m.hrefs, m.forwarded_from
+                    FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid
+                    WHERE messages_fts MATCH ?
+                '''
+                # Quoted as a phrase so links and punctuation (t.me/proxy, server=1) are not parsed as syntax
+                params = [query if raw else '"' + query.replace('"', '""') + '"']
+                order = 'ORDER BY bm25(messages_fts)'
+            else:
+                sql = '''
+                    SELECT m.channel, m.post_id, m.date, m.text, m.hrefs, m.forwarded_from
+                    FROM messages m WHERE m.text LIKE ?
+                '''
+                params = [f'%{query}%']
+                order = 'ORDER BY m.date DESC'
+            if channel:
+                sql += ' AND m.channel = ?'
+                params.append(channel)
+            cursor.execute(f'{sql} {order} LIMIT ?', [*params, limit])
+            return [self._row_to_message(row) for row in cursor.fetchall()]
+    
+    def iter_messages(self, channel: Optional[str] = None, batch_size: int = 1000) -> Iterator[Dict]:
+        """All stored messages (of one channel) in the order they were stored, read in batches"""
+        last_rowid = 0
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            while True:
+                sql = '''
+                    SELECT rowid, channel, post_id, date, text, hrefs, forwarded_from
+                    FROM messages WHERE rowid > ?
+                '''
+                params = [last_rowid]
+                if channel:
+                    sql += ' AND channel = ?'
+                    params.append(channel)
+                cursor.execute(f'{sql} ORDER BY rowid LIMIT ?', [*params, batch_size])
+                rows = cursor.fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield self._row_to_message(row[1:])
+                last_rowid = rows[-1][0]
+    
+    def count(self) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+    
+    @staticmethod
+    def _row_to_message(row) -> Dict:
+        channel, post_id, date, text, hrefs, forwarded_from = row
+        parsed_date = datetime.fromisoformat(date) if date else None
+        if parsed_date and parsed_date.tzinfo is None:
+            parsed_date = parsed_date.replace(tzinfo=timezone.utc)
+        return {
+            'id': str(post_id),
+            'date': parsed_date,
+            'text': text,
+            'hrefs': json.loads(hrefs),
+            'channel': channel,
+            'forwarded_from': forwarded_from
+        }
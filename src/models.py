@@ -0,0 +1,38 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Tuple
+
+
+@dataclass(frozen=True)
+class ScrapedChat:
+    __slots__ = ('username',)
+    
+    username: str
+    
+    def __reduce__(self):
+        # Frozen slotted instances cannot be unpickled attribute by attribute; rebuild them through __init__
+        return self.__class__, (self.username,)
+
+
+@dataclass(frozen=True)
+class ScrapedMessage:
+    """
+    A channel post as scraped from a t.me/s page; `date` is timezone-aware and
+    `forwarded_from` is the username of the channel it was forwarded from ('' if none)
+    """
+    __slots__ = ('id', 'date', 'message', 'html', 'hrefs', 'chat', 'forwarded_from')
+    
+    id: str
+    date: datetime
+    message: str
+    html: str
+    hrefs: Tuple[str, ...]
+    chat: ScrapedChat
+    forwarded_from: str
+    
+    def __reduce__(self):
+        return self.__class__, tuple(getattr(self, name) for name in self.__slots__)
+    
+    @property
+    def text(self):
+        return self.message
@@ -0,0 +1,282 @@
+import math
+import zlib
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+from config.settings import PAGE_ARCHIVE_PATH, PAGE_ARCHIVE_COMPRESSION
+
+# zstd compresses t.me/s pages better and faster than zlib when the package is installed
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+CODEC_EXTENSIONS = {'zstd': '.zst', 'zlib': '.zz'}
+
+
+def page_cursor(url: str) -> Optional[int]:
+    """Return the ?before=<post id> pagination cursor of a channel page URL (None for the first page)"""
+    values = parse_qs(urlparse(url).query).get('before')
+    if values and values[0].isdigit():
+        return int(values[0])
+    return None
+
+
+class PageArchive:
+    """
+    Content-addressed archive of raw t.me/s page bodies.
+
+    Bodies are compressed (zstd when available, zlib otherwise) and stored once
+    per sha256 under blobs/<hash[:2]>/<hash>. The index database maps every
+    fetch (channel, fetch time, pagination cursor) to its blob, so identical
+    pages fetched on different cycles share storage.
+    """
+
+    def __init__(self, archive_path: str = PAGE_ARCHIVE_PATH, compression: str = PAGE_ARCHIVE_COMPRESSION):
+        self.archive_path = Path(archive_path)
+        self.blob_path = self.archive_path / 'blobs'
+        self.index_path = self.archive_path / 'index.db'
+        self.blob_path.mkdir(parents=True, exist_ok=True)
+        self.codec = self._resolve_codec(compression)
+        self._initialize_database()
+
+    @staticmethod
+    def _resolve_codec(compression: str) -> str:
+        if compression == 'auto':
+            return 'zstd' if HAS_ZSTD else 'zlib'
+        if compression not in CODEC_EXTENSIONS:
+            raise ValueError(f"Unknown page archive compression: {compression}")
+        if compression == 'zstd' and not HAS_ZSTD:
+            print("⚠️ zstandard is not installed, archiving pages with zlib")
+            return 'zlib'
+        return compression
+
+    def _initialize_database(self):
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    content_hash TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    compressed_size INTEGER NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    cursor INTEGER,
+                    fetched_at TIMESTAMP NOT NULL,
+                    status INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL REFERENCES blobs(content_hash)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_pages_channel ON pages(channel, cursor, fetched_at)')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS validation_outcomes (
+                    proxy_key TEXT PRIMARY KEY,
+                    working BOOLEAN NOT NULL,
+                    ping REAL,
+                    validated_at TIMESTAMP NOT NULL
+                )
+            ''')
+            conn.commit()
+
+    def store(self, channel: str, url: str, body: bytes, status: int = 200,
+              fetched_at: Optional[datetime] = None) -> str:
+        """Archive a fetched page and return its content hash"""
+        content_hash = hashlib.sha256(body).hexdigest()
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM blobs WHERE content_hash = ?', (content_hash,))
+            if not cursor.fetchone():
+                compressed = self._compress(body)
+                blob_file = self._blob_file(content_hash, self.codec)
+                blob_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = blob_file.with_suffix(blob_file.suffix + '.tmp')
+                tmp_file.write_bytes(compressed)
+                tmp_file.replace(blob_file)
+                cursor.execute(
+                    'INSERT INTO blobs (content_hash, codec, size, compressed_size) VALUES (?, ?, ?, ?)',
+                    (content_hash, self.codec, len(body), len(compressed))
+                )
+
+            cursor.execute('''
+                INSERT INTO pages (channel, url, cursor, fetched_at, status, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (channel, url, page_cursor(url), fetched_at.isoformat(), status, content_hash))
+            conn.commit()
+
+        return content_hash
+
+    def prune(self, older_than: datetime) -> int:
+        """Drop the fetches made before `older_than` and the blobs no fetch refers to; returns the fetches dropped"""
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM pages WHERE fetched_at < ?', (older_than.isoformat(),))
+            removed = cursor.rowcount
+            cursor.execute('''
+                SELECT content_hash, codec FROM blobs
+                WHERE content_hash NOT IN (SELECT content_hash FROM pages)
+            ''')
+            orphans = cursor.fetchall()
+            for content_hash, codec in orphans:
+                self._blob_file(content_hash, codec).unlink(missing_ok=True)
+            cursor.executemany('DELETE FROM blobs WHERE content_hash = ?', [(content_hash,) for content_hash, _ in orphans])
+            conn.commit()
+
+        return removed
+
+    def load(self, content_hash: str) -> bytes:
+        """Return the decompressed body of an archived page"""
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT codec FROM blobs WHERE content_hash = ?', (content_hash,))
+            result = cursor.fetchone()
+        if not result:
+            raise KeyError(content_hash)
+
+        codec = result[0]
+        return self._decompress(self._blob_file(content_hash, codec).read_bytes(), codec)
+
+    def find_page(self, channel: str, cursor: Optional[int] = None,
+                  before: Optional[datetime] = None) -> Optional[Dict]:
+        """Return the latest fetch of a channel page (optionally fetched before a given time)"""
+        query = 'SELECT id, channel, url, cursor, fetched_at, status, content_hash FROM pages WHERE channel = ?'
+        params = [channel]
+        if cursor is None:
+            query += ' AND cursor IS NULL'
+        else:
+            query += ' AND cursor = ?'
+            params.append(cursor)
+        if before:
+            query += ' AND fetched_at <= ?'
+            params.append(before.isoformat())
+        query += ' ORDER BY fetched_at DESC, id DESC LIMIT 1'
+
+        with sqlite3.connect(self.index_path) as conn:
+            cursor_obj = conn.cursor()
+            cursor_obj.execute(query, params)
+            row = cursor_obj.fetchone()
+            return self._row_to_dict(row) if row else None
+
+    def iter_pages(self, channel: Optional[str] = None) -> Iterator[Dict]:
+        """Iterate over archived fetches in fetch order"""
+        query = 'SELECT id, channel, url, cursor, fetched_at, status, content_hash FROM pages'
+        params = []
+        if channel:
+            query += ' WHERE channel = ?'
+            params.append(channel)
+        query += ' ORDER BY fetched_at, id'
+
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+        for row in rows:
+            yield self._row_to_dict(row)
+
+    def record_validations(self, outcomes: Dict[str, Tuple[bool, float]],
+                           validated_at: Optional[datetime] = None):
+        """Store the latest validator outcome (working, ping in seconds) per server:port"""
+        if not outcomes:
+            return
+        validated_at = (validated_at or datetime.now(timezone.utc)).isoformat()
+
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO validation_outcomes (proxy_key, working, ping, validated_at)
+                VALUES (?, ?, ?, ?)
+            ''', [(proxy_key, bool(working), ping if math.isfinite(ping) else None, validated_at)
+                  for proxy_key, (working, ping) in outcomes.items()])
+            conn.commit()
+
+    def load_validations(self) -> Dict[str, Tuple[bool, float]]:
+        """Return the recorded validator outcomes; an unreachable proxy has an infinite ping"""
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT proxy_key, working, ping FROM validation_outcomes')
+            return {proxy_key: (bool(working), float('inf') if ping is None else ping)
+                    for proxy_key, working, ping in cursor.fetchall()}
+
+    def latest_fetch_time(self) -> Optional[datetime]:
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(fetched_at) FROM pages')
+            result = cursor.fetchone()[0]
+        if not result:
+            return None
+        parsed = datetime.fromisoformat(result)
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    def list_channels(self) -> List[str]:
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT DISTINCT channel FROM pages ORDER BY channel')
+            return [row[0] for row in cursor.fetchall()]
+
+    def iter_unique_bodies(self) -> Iterator[bytes]:
+        """Iterate over every distinct archived page body once"""
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT content_hash FROM blobs ORDER BY content_hash')
+            hashes = [row[0] for row in cursor.fetchall()]
+
+        for content_hash in hashes:
+            yield self.load(content_hash)
+
+    def get_stats(self) -> Dict:
+        with sqlite3.connect(self.index_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*), COUNT(DISTINCT channel) FROM pages')
+            pages, channels = cursor.fetchone()
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(compressed_size), 0) FROM blobs')
+            blobs, size, compressed_size = cursor.fetchone()
+
+        return {
+            'pages': pages,
+            'channels': channels,
+            'unique_pages': blobs,
+            'bytes': size,
+            'compressed_bytes': compressed_size,
+        }
+
+    def _blob_file(self, content_hash: str, codec: str) -> Path:
+        return self.blob_path / content_hash[:2] / (content_hash + CODEC_EXTENSIONS[codec])
+
+    def _compress(self, body: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(body)
+        return zlib.compress(body, 6)
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == 'zstd':
+            if not HAS_ZSTD:
+                raise RuntimeError("zstandard is required to read zstd-compressed archive pages")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        page_id, channel, url, cursor, fetched_at, status, content_hash = row
+        parsed = datetime.fromisoformat(fetched_at)
+        return {
+            'id': page_id,
+            'channel': channel,
+            'url': url,
+            'cursor': cursor,
+            'fetched_at': parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc),
+            'status': status,
+            'content_hash': content_hash,
+        }
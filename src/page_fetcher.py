@@ -0,0 +1,196 @@
+import aiohttp
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from src.exceptions import PageFetchError, FetchBudgetExceeded
+from config.settings import (
+    FETCH_TIMEOUT, FETCH_CONNECTION_LIMIT, FETCH_CONCURRENCY_PER_HOST,
+    FETCH_KEEPALIVE_TIMEOUT, FETCH_BUDGET_PER_CYCLE, FETCH_STREAM_CHUNK_SIZE
+)
+
+# aiohttp transparently decodes brotli bodies when one of these packages is installed
+try:
+    import brotli  # noqa: F401
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+# SOCKS5 proxies need their own connector from aiohttp-socks; HTTP proxies work with any session
+try:
+    from aiohttp_socks import ProxyConnector
+    HAS_AIOHTTP_SOCKS = True
+except ImportError:
+    HAS_AIOHTTP_SOCKS = False
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+
+@dataclass
+class PageResponse:
+    url: str
+    status: int
+    body: bytes
+    final_url: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise PageFetchError(self.url, self.status)
+
+
+class PageFetcher:
+    """
+    Asynchronous page fetcher backed by a pooled keep-alive aiohttp session.
+
+    Concurrency per host is bounded by the connector, and the number of requests
+    per cycle is capped by a fetch budget that is reset with reset_budget().
+    Requests can be sent through an HTTP or SOCKS5 proxy, or from a given local
+    source address (egress); each SOCKS5 proxy and each egress address gets a
+    pooled session of its own.
+    """
+
+    def __init__(self, concurrency_per_host: int = FETCH_CONCURRENCY_PER_HOST,
+                 connection_limit: int = FETCH_CONNECTION_LIMIT,
+                 budget: int = FETCH_BUDGET_PER_CYCLE,
+                 timeout: float = FETCH_TIMEOUT,
+                 headers: Optional[Dict[str, str]] = None):
+        self.concurrency_per_host = concurrency_per_host
+        self.connection_limit = connection_limit
+        self.budget = budget
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+        self.session = None
+        # SOCKS5 proxy URL -> session whose connector tunnels through it
+        self.proxy_sessions = {}
+        # Local source address -> session whose connections are bound to it
+        self.egress_sessions = {}
+        self.fetch_count = 0
+        self.bytes_received = 0
+
+    def _new_session(self, connector=None):
+        connector = connector or aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.concurrency_per_host,
+            keepalive_timeout=FETCH_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=self.headers
+        )
+
+    async def open(self):
+        if self.session and not self.session.closed:
+            return
+
+        self.session = self._new_session()
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        for session in [*self.proxy_sessions.values(), *self.egress_sessions.values()]:
+            if not session.closed:
+                await session.close()
+        self.proxy_sessions = {}
+        self.egress_sessions = {}
+
+    def _egress_session(self, address: str):
+        session = self.egress_sessions.get(address)
+        if session is None or session.closed:
+            session = self._new_session(aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.concurrency_per_host,
+                keepalive_timeout=FETCH_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300,
+                local_addr=(address, 0)
+            ))
+            self.egress_sessions[address] = session
+        return session
+
+    def _proxy_session(self, proxy: str):
+        session = self.proxy_sessions.get(proxy)
+        if session is None or session.closed:
+            if not HAS_AIOHTTP_SOCKS:
+                raise RuntimeError(f"aiohttp-socks is required to fetch through {proxy.split('://')[-1].split('@')[-1]}")
+            connector = ProxyConnector.from_url(
+                proxy,
+                limit=self.connection_limit,
+                limit_per_host=self.concurrency_per_host,
+                keepalive_timeout=FETCH_KEEPALIVE_TIMEOUT
+            )
+            session = self._new_session(connector)
+            self.proxy_sessions[proxy] = session
+        return session
+
+    def reset_budget(self):
+        self.fetch_count = 0
+        self.bytes_received = 0
+
+    @property
+    def remaining_budget(self):
+        if not self.budget:
+            return None
+        return max(0, self.budget - self.fetch_count)
+
+    def _consume_budget(self):
+        if self.budget and self.fetch_count >= self.budget:
+            raise FetchBudgetExceeded(self.budget)
+        self.fetch_count += 1
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    on_chunk: Optional[Callable[[bytes], object]] = None,
+                    proxy: Optional[str] = None, egress: Optional[str] = None):
+        """
+        Fetch a page and return its decoded body as a PageResponse.
+
+        `proxy` is an http:// or socks5:// proxy URL to send the request through,
+        and `egress` a local address to send it from.
+
+        With `on_chunk` the body is streamed and `on_chunk` is called with every
+        chunk as it arrives.
+        """
+        self._consume_budget()
+        await self.open()
+
+        session = self.session
+        if proxy and proxy.startswith('socks'):
+            session, proxy = self._proxy_session(proxy), None
+        elif egress:
+            session = self._egress_session(egress)
+
+        async with session.get(url, headers=headers, proxy=proxy) as response:
+            if on_chunk and response.status < 300:
+                chunks = []
+                async for chunk in response.content.iter_chunked(FETCH_STREAM_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    on_chunk(chunk)
+                body = b''.join(chunks)
+            else:
+                body = await response.read()
+
+            self.bytes_received += len(body)
+            return PageResponse(
+                url=url,
+                status=response.status,
+                body=body,
+                final_url=str(response.url),
+                headers=dict(response.headers)
+            )
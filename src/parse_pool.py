@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from src.html_parser import get_message_parser
+from src.models import ScrapedMessage
+from config.settings import PARSE_WORKERS, PARSE_BATCH_SIZE, HTML_PARSER_BACKEND
+
+# Parser of the current worker process, created once by the pool initializer
+_worker_parser = None
+
+
+def _init_worker(backend: str):
+    global _worker_parser
+    _worker_parser = get_message_parser(backend)
+
+
+def parse_page_batch(pages: List[Tuple[bytes, str, Optional[int]]]) -> List[List[ScrapedMessage]]:
+    """Parse a batch of (page body, channel name, min post id) in a worker process"""
+    return [_worker_parser.parse_messages(page_body, channel_name, min_post_id)
+            for page_body, channel_name, min_post_id in pages]
+
+
+class ParsePool:
+    """
+    Parses t.me/s pages in a pool of worker processes, off the event loop.
+
+    Pages submitted by the concurrently scraped channels are collected and sent
+    to the workers in batches: a batch goes out once it holds `batch_size` pages
+    or when the event loop comes around again, so a lone page is never held back.
+    Only the raw page bytes travel to the workers and only the parsed messages
+    (slotted records) come back.
+
+    The worker processes are started on the first page and stopped by close().
+    """
+
+    def __init__(self, workers: int = PARSE_WORKERS, batch_size: int = PARSE_BATCH_SIZE,
+                 backend: str = HTML_PARSER_BACKEND):
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.backend = backend
+        self.executor = None
+        # (page arguments, future of the page's messages) waiting to be sent
+        self.batch = []
+        self.flush_handle = None
+        self.stats = {'batches': 0, 'pages': 0}
+
+    async def parse_messages(self, page_body: bytes, channel_name: str,
+                             min_post_id: Optional[int] = None) -> List[ScrapedMessage]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.batch.append(((page_body, channel_name, min_post_id), future))
+
+        if len(self.batch) >= self.batch_size:
+            self._flush(loop)
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_soon(self._flush, loop)
+
+        return await future
+
+    def _flush(self, loop):
+        if self.flush_handle:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self.backend,)
+            )
+        self.stats['batches'] += 1
+        self.stats['pages'] += len(batch)
+
+        try:
+            parsed = loop.run_in_executor(self.executor, parse_page_batch, [pages for pages, _ in batch])
+        except RuntimeError as e:
+            # The pool was shut down or broke while the batch was collected
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        parsed.add_done_callback(lambda done: self._resolve(batch, done))
+
+    @staticmethod
+    def _resolve(batch, done):
+        if done.cancelled():
+            for _, future in batch:
+                future.cancel()
+            return
+
+        error = done.exception()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[i])
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,202 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.channel_scraper import ChannelScraper
+from src.proxy_extractor import ProxyExtractor, ProxyData
+from src.proxy_validator import ProxyValidator
+from src.proxy_storage import ProxyStorage
+from src.channel_stats import ChannelYieldTracker
+from src.channel_discovery import ChannelDiscovery
+from src.repost_filter import RepostFilter
+from config.settings import PIPELINE_QUEUE_SIZE, PIPELINE_VALIDATION_WORKERS, PIPELINE_STORE_BATCH_SIZE
+
+# Marks the end of a stage's output
+END_OF_STREAM = None
+
+
+@dataclass
+class CycleResult:
+    """Counters and output of one pipeline run"""
+    messages: int = 0
+    extracted: int = 0
+    reposts: int = 0
+    sample_messages: List[Dict] = field(default_factory=list)
+    unique_proxies: List[ProxyData] = field(default_factory=list)
+    working_proxies: List[ProxyData] = field(default_factory=list)
+
+
+class ProxyPipeline:
+    """
+    Streaming scrape -> extract -> dedupe -> validate -> store pipeline for one cycle.
+
+    The stages run concurrently and are connected by bounded asyncio queues, so
+    the proxies of the first scraped channel are validated while later channels
+    are still being fetched. A full queue blocks the stage feeding it
+    (backpressure), and a failing stage cancels the whole run.
+
+    A stage only ends its stream once it has completed normally: a cancelled
+    stage must not wait on a full queue that nothing drains any more.
+
+    Working proxies are written to the database in batches as they arrive;
+    ranking, the JSON export and posting are left to the caller once the run
+    is complete.
+    """
+
+    def __init__(self, channel_scraper: ChannelScraper, proxy_extractor: ProxyExtractor,
+                 proxy_validator: ProxyValidator, proxy_storage: ProxyStorage,
+                 yield_tracker: ChannelYieldTracker,
+                 queue_size: int = PIPELINE_QUEUE_SIZE,
+                 validation_workers: int = PIPELINE_VALIDATION_WORKERS,
+                 store_batch_size: int = PIPELINE_STORE_BATCH_SIZE,
+                 channel_discovery: Optional[ChannelDiscovery] = None,
+                 repost_filter: Optional[RepostFilter] = None):
+        self.channel_scraper = channel_scraper
+        self.proxy_extractor = proxy_extractor
+        self.proxy_validator = proxy_validator
+        self.proxy_storage = proxy_storage
+        self.yield_tracker = yield_tracker
+        self.queue_size = queue_size
+        self.validation_workers = max(validation_workers, 1)
+        self.store_batch_size = max(store_batch_size, 1)
+        self.channel_discovery = channel_discovery
+        self.repost_filter = repost_filter
+
+    async def run(self, channels: List[str], sample_size: int = 5) -> CycleResult:
+        return await self._run(lambda outbox: self._scrape_stage(channels, outbox), sample_size)
+
+    async def run_messages(self, channel_messages: List[List[Dict]], sample_size: int = 5) -> CycleResult:
+        """Run already collected relevant messages (one list per channel) through the stages after scraping"""
+        return await self._run(lambda outbox: self._feed_stage(channel_messages, outbox), sample_size)
+
+    async def _run(self, source, sample_size: int) -> CycleResult:
+        result = CycleResult()
+        messages = asyncio.Queue(self.queue_size)
+        proxies = asyncio.Queue(self.queue_size)
+        unique = asyncio.Queue(self.queue_size)
+        working = asyncio.Queue(self.queue_size)
+
+        stages = [asyncio.ensure_future(stage) for stage in (
+            source(messages),
+            self._extract_stage(messages, proxies, result, sample_size),
+            self._dedupe_stage(proxies, unique, result),
+            self._validate_stage(unique, working),
+            self._store_stage(working, result),
+        )]
+
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+
+        return result
+
+    async def _scrape_stage(self, channels, outbox):
+        async def on_messages(channel_messages):
+            await outbox.put(channel_messages)
+
+        await self.channel_scraper.scrape_all_channels(channels, on_messages=on_messages)
+        await outbox.put(END_OF_STREAM)
+
+    async def _feed_stage(self, channel_messages, outbox):
+        for messages in channel_messages:
+            if messages:
+                await outbox.put(messages)
+        await outbox.put(END_OF_STREAM)
+
+    async def _extract_stage(self, inbox, outbox, result, sample_size):
+        while (channel_messages := await inbox.get()) is not END_OF_STREAM:
+            result.messages += len(channel_messages)
+            if len(result.sample_messages) < sample_size:
+                result.sample_messages.extend(channel_messages[:sample_size - len(result.sample_messages)])
+
+            for message in channel_messages:
+                if self.channel_discovery:
+                    self.channel_discovery.observe(message)
+
+                channel = message.get('channel', 'unknown')
+                posted_at = message.get('date') if isinstance(message.get('date'), datetime) else None
+
+                if self.repost_filter:
+                    fingerprint, repost_keys = self.repost_filter.check(message)
+                    if repost_keys is not None:
+                        # Verbatim repost: skip extraction, but let the earliest post still win the lineage
+                        result.reposts += 1
+                        for proxy_key in repost_keys:
+                            self.yield_tracker.observe(proxy_key, channel, message.get('id'), posted_at)
+                        continue
+
+                # Extract proxies from the hrefs and plain text collected when the page was parsed;
+                # the message HTML only repeats those links
+                message_proxies = self.proxy_extractor.extract_all_proxies(
+                    hrefs=message.get('hrefs', []),
+                    text=message.get('text', '')
+                )
+                result.extracted += len(message_proxies)
+                proxy_keys = [self.proxy_extractor.proxy_key(proxy) for proxy in message_proxies]
+                if self.repost_filter:
+                    self.repost_filter.add(fingerprint, channel, proxy_keys)
+
+                for proxy, proxy_key in zip(message_proxies, proxy_keys):
+                    # Remember where each proxy came from so new working ones can be credited to their channel
+                    self.yield_tracker.observe(proxy_key, channel, message.get('id'), posted_at)
+                    await outbox.put(proxy)
+
+            # Let the downstream stages run between channels
+            await asyncio.sleep(0)
+
+        await outbox.put(END_OF_STREAM)
+
+    async def _dedupe_stage(self, inbox, outbox, result):
+        seen = set()
+        while (proxy := await inbox.get()) is not END_OF_STREAM:
+            proxy_key = self.proxy_extractor.proxy_key(proxy)
+            if proxy_key in seen:
+                continue
+            seen.add(proxy_key)
+            result.unique_proxies.append(proxy)
+            await outbox.put(proxy)
+
+        await outbox.put(END_OF_STREAM)
+
+    async def _validate_stage(self, inbox, outbox):
+        # The stage stops taking proxies while every worker slot is busy
+        slots = asyncio.Semaphore(self.validation_workers)
+        tasks = set()
+
+        async def validate(proxy):
+            try:
+                if await self.proxy_validator.validate_proxy(proxy):
+                    await outbox.put(proxy)
+            finally:
+                slots.release()
+
+        try:
+            while (proxy := await inbox.get()) is not END_OF_STREAM:
+                await slots.acquire()
+                task = asyncio.ensure_future(validate(proxy))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        await outbox.put(END_OF_STREAM)
+
+    async def _store_stage(self, inbox, result):
+        batch = []
+        while (proxy := await inbox.get()) is not END_OF_STREAM:
+            result.working_proxies.append(proxy)
+            self.yield_tracker.mark_working([self.proxy_extractor.proxy_key(proxy)])
+            batch.append(proxy)
+            if len(batch) >= self.store_batch_size:
+                self.proxy_storage.save_proxies_to_database(batch)
+                batch = []
+
+        if batch:
+            self.proxy_storage.save_proxies_to_database(batch)
@@ -0,0 +1,100 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from src.page_fetcher import HAS_AIOHTTP_SOCKS
+from config.settings import (
+    SCRAPE_PROXIES, SCRAPE_PROXY_INCLUDE_DIRECT, SCRAPE_PROXY_ROTATION,
+    SCRAPE_PROXY_COOLDOWN, SCRAPE_PROXY_MAX_COOLDOWN
+)
+
+
+@dataclass
+class ProxyRoute:
+    """A way out to t.me: direct (proxy None) or through one proxy, with its track record"""
+    proxy: Optional[str] = None
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency: Optional[float] = None
+    cooldown_until: float = 0.0
+
+    @property
+    def name(self) -> str:
+        # Host and port only, credentials stay out of the logs
+        return self.proxy.split('://')[-1].split('@')[-1] if self.proxy else 'direct'
+
+    @property
+    def success_rate(self) -> float:
+        # Smoothed so untried routes start at an even chance
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+
+class ProxyRouter:
+    """
+    Picks the route of every t.me page request: direct or through a configured proxy.
+
+    The routes are the direct path plus the SCRAPE_PROXIES URLs. The proxies in
+    ProxyStorage are not used: the extractor only yields MTProto proxies, which
+    cannot carry web requests. Routes are ranked by success rate, then latency,
+    and requests rotate over the top `rotation` healthy routes. A failing route
+    cools down for an exponentially growing time and the request fails over to
+    the next one, so a blocked direct path only costs one failed attempt per
+    cooldown.
+    """
+
+    def __init__(self, proxies: Optional[List[str]] = None,
+                 include_direct: bool = SCRAPE_PROXY_INCLUDE_DIRECT,
+                 rotation: int = SCRAPE_PROXY_ROTATION,
+                 cooldown: float = SCRAPE_PROXY_COOLDOWN,
+                 max_cooldown: float = SCRAPE_PROXY_MAX_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.include_direct = include_direct
+        self.rotation = max(rotation, 1)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.turn = 0
+
+        proxies = list(SCRAPE_PROXIES if proxies is None else proxies)
+        if not HAS_AIOHTTP_SOCKS:
+            skipped = [proxy for proxy in proxies if proxy.startswith('socks')]
+            if skipped:
+                print(f"ℹ️ aiohttp-socks is not installed, skipping {len(skipped)} SOCKS5 scrape proxies")
+            proxies = [proxy for proxy in proxies if not proxy.startswith('socks')]
+
+        pool = list(dict.fromkeys(proxies))
+        if self.include_direct or not pool:
+            pool.insert(0, None)
+        self.routes = {proxy: ProxyRoute(proxy) for proxy in pool}
+
+    def ranked_routes(self) -> List[ProxyRoute]:
+        """Routes to try for the next request, best first; cooling down routes come last"""
+        now = self.clock()
+        ranked = sorted(self.routes.values(), key=lambda route: (
+            route.cooldown_until > now,
+            -route.success_rate,
+            route.latency if route.latency is not None else float('inf')
+        ))
+
+        # Spread requests over the top healthy routes
+        healthy = sum(1 for route in ranked[:self.rotation] if route.cooldown_until <= now)
+        if healthy > 1:
+            start = self.turn % healthy
+            self.turn += 1
+            ranked = ranked[start:healthy] + ranked[:start] + ranked[healthy:]
+        return ranked
+
+    def record_success(self, route: ProxyRoute, latency: float):
+        route.successes += 1
+        route.consecutive_failures = 0
+        route.cooldown_until = 0.0
+        route.latency = latency if route.latency is None else 0.7 * route.latency + 0.3 * latency
+
+    def record_failure(self, route: ProxyRoute):
+        route.failures += 1
+        route.consecutive_failures += 1
+        backoff = min(self.cooldown * 2 ** (route.consecutive_failures - 1), self.max_cooldown)
+        route.cooldown_until = self.clock() + backoff
+
+    def get_stats(self):
+        return {route.name: (route.successes, route.failures) for route in self.routes.values()}
@@ -6,14 +6,14 @@ from typing import List, Dict, Optional
 from pathlib import Path
 from telegram import Bot
 from src.proxy_extractor import ProxyData
-from config.settings import STORAGE_FILE_PATH, API_ID, API_HASH, SESSION_NAME, BOT_TOKEN, TOP_N_PROXIES
+from config.settings import STORAGE_FILE_PATH, DATABASE_PATH, API_ID, API_HASH, SESSION_NAME, BOT_TOKEN, TOP_N_PROXIES
 
 
 class ProxyStorage:
     
-    def __init__(self, telegram_client=None, output_channel=None):
-        self.storage_path = Path(STORAGE_FILE_PATH)
-        self.db_path = Path('data/proxies.db')
+    def __init__(self, telegram_client=None, output_channel=None, db_path=None, storage_path=None):
+        self.storage_path = Path(storage_path or STORAGE_FILE_PATH)
+        self.db_path = Path(db_path or DATABASE_PATH)
         self.telegram_client = telegram_client
         self.output_channel = output_channel
         self.last_posted_message_id = None
@@ -165,6 +165,36 @@ class ProxyStorage:
             
             conn.commit()
     
+    def add_unvalidated_proxies(self, proxies: List[ProxyData]) -> List[ProxyData]:
+        """
+        Insert proxies that are not in the database yet, marked as not working
+        until they are validated; returns the ones that were new
+        """
+        added = []
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            for proxy in proxies:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO proxies
+                    (proxy_type, server, port, secret, username, password, original_url, is_working)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    proxy.proxy_type,
+                    proxy.server,
+                    proxy.port,
+                    proxy.secret,
+                    proxy.username,
+                    proxy.password,
+                    proxy.original_url,
+                    False
+                ))
+                if cursor.rowcount:
+                    added.append(proxy)
+            
+            conn.commit()
+        return added
+    
     def load_proxies_from_database(self, proxy_type: Optional[str] = None, working_only: bool = True):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -21,30 +21,31 @@ class ProxyValidator:
     async def validate_all_proxies(self, proxies: List[ProxyData]):
         print(f"Starting validation of {len(proxies)} proxies with timeout {self.timeout}s...")
         
-        tasks = []
-        for proxy in proxies:
-            task = asyncio.create_task(self.validate_single_proxy(proxy))
-            tasks.append(task)
+        results = await asyncio.gather(*(self.validate_proxy(proxy) for proxy in proxies))
+        working_proxies = [proxy for proxy, working in zip(proxies, results) if working]
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        print(f"Validation complete: {len(working_proxies)}/{len(proxies)} proxies are working")
+        return self.rank_by_ping(working_proxies)
+    
+    async def validate_proxy(self, proxy: ProxyData):
+        """Validate a single proxy and record its outcome; errors count as not working"""
+        proxy_key = f"{proxy.server}:{proxy.port}"
         
-        working_proxies = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                print(f"Error validating proxy {proxies[i].server}:{proxies[i].port} - {type(result).__name__}: {result}")
-                self.validation_results[f"{proxies[i].server}:{proxies[i].port}"] = False
-                self.ping_results[f"{proxies[i].server}:{proxies[i].port}"] = float('inf')
-            elif result:
-                working_proxies.append(proxies[i])
-                self.validation_results[f"{proxies[i].server}:{proxies[i].port}"] = True
-            else:
-                self.validation_results[f"{proxies[i].server}:{proxies[i].port}"] = False
-                self.ping_results[f"{proxies[i].server}:{proxies[i].port}"] = float('inf')
+        try:
+            working = bool(await self.validate_single_proxy(proxy))
+        except Exception as e:
+            print(f"Error validating proxy {proxy_key} - {type(e).__name__}: {e}")
+            working = False
         
-        # Sort working proxies by ping (lowest ping first)
-        working_proxies.sort(key=lambda proxy: self.get_proxy_ping(proxy))
+        self.validation_results[proxy_key] = working
+        if not working:
+            self.ping_results[proxy_key] = float('inf')
+        return working
+    
+    def rank_by_ping(self, working_proxies: List[ProxyData]):
+        """Sort working proxies by ping (lowest first) and print the top 10"""
+        working_proxies = sorted(working_proxies, key=lambda proxy: self.get_proxy_ping(proxy))
         
-        print(f"Validation complete: {len(working_proxies)}/{len(proxies)} proxies are working")
         print("🏆 Top 10 proxies by ping:")
         for i, proxy in enumerate(working_proxies[:10]):
             ping = self.get_proxy_ping(proxy)
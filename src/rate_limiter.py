@@ -0,0 +1,149 @@
+import time
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+from config.settings import (
+    RATE_LIMIT_INITIAL_RATE, RATE_LIMIT_MAX_RATE, RATE_LIMIT_DELAY, RATE_LIMIT_BURST,
+    RATE_LIMIT_INCREASE_STEP, RATE_LIMIT_DEFAULT_RETRY_AFTER, RATE_LIMIT_MAX_RETRY_AFTER
+)
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Return the delay in seconds of a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """
+    Token bucket pacing the requests to a single host.
+
+    Tokens refill at `rate` per second up to `capacity`; every request takes one.
+    While the bucket is paused (after a 429) no tokens are handed out at all.
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated_at = clock()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 when one can be taken now)"""
+        now = self.clock()
+        self._refill(now)
+        pause = self.paused_until - now
+        if pause > 0:
+            return pause
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                wait = self.delay()
+                if wait <= 0:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for `seconds`; the bucket restarts empty afterwards"""
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+        self.tokens = 0.0
+
+
+class HostRateLimiter:
+    """
+    Adaptive per-host rate limiter shared by every request of a TelegramClient.
+
+    Each host gets a token bucket. Successful responses raise its rate additively
+    up to `max_rate`; a 429 halves it (down to `min_rate`) and pauses the host for
+    the server's Retry-After, or an exponentially growing default when the header
+    is missing.
+    """
+
+    def __init__(self, initial_rate: float = RATE_LIMIT_INITIAL_RATE,
+                 max_rate: float = RATE_LIMIT_MAX_RATE,
+                 min_rate: float = 1 / RATE_LIMIT_DELAY if RATE_LIMIT_DELAY else RATE_LIMIT_INITIAL_RATE,
+                 burst: float = RATE_LIMIT_BURST,
+                 increase_step: float = RATE_LIMIT_INCREASE_STEP,
+                 default_retry_after: float = RATE_LIMIT_DEFAULT_RETRY_AFTER,
+                 max_retry_after: float = RATE_LIMIT_MAX_RETRY_AFTER,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_rate = min(min_rate, initial_rate)
+        self.max_rate = max(max_rate, initial_rate)
+        self.initial_rate = initial_rate
+        self.burst = max(burst, 1)
+        self.increase_step = increase_step
+        self.default_retry_after = default_retry_after
+        self.max_retry_after = max_retry_after
+        self.clock = clock
+        self.buckets: Dict[str, TokenBucket] = {}
+        # Consecutive 429s per host without Retry-After, for the default backoff
+        self.strikes: Dict[str, int] = {}
+
+    @staticmethod
+    def host(url: str) -> str:
+        return urlparse(url).hostname or url
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = self.host(url)
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.initial_rate, self.burst, self.clock)
+        return self.buckets[host]
+
+    def get_rate(self, url: str) -> float:
+        return self.bucket(url).rate
+
+    async def acquire(self, url: str):
+        await self.bucket(url).acquire()
+
+    def record_response(self, url: str, status: int, headers: Optional[Dict[str, str]] = None) -> Optional[float]:
+        """
+        Adapt the host's rate to a response.
+
+        Returns the backoff in seconds when the response was a 429, None otherwise.
+        """
+        bucket = self.bucket(url)
+        host = self.host(url)
+
+        if status != 429:
+            if status < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+                self.strikes.pop(host, None)
+            return None
+
+        bucket.rate = max(self.min_rate, bucket.rate / 2)
+        retry_after = parse_retry_after((headers or {}).get('Retry-After'))
+        if retry_after is None:
+            strikes = self.strikes.get(host, 0)
+            self.strikes[host] = strikes + 1
+            retry_after = self.default_retry_after * 2 ** strikes
+        retry_after = min(retry_after, self.max_retry_after)
+
+        bucket.pause(retry_after)
+        return retry_after
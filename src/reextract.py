@@ -0,0 +1,99 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+from src.message_store import MessageStore
+from src.proxy_extractor import ProxyExtractor, ProxyData
+from src.proxy_storage import ProxyStorage
+from config.settings import REEXTRACT_WORKERS, REEXTRACT_CHUNK_SIZE
+
+# Extractor of the current worker process, created once by the pool initializer
+_worker_extractor = None
+
+
+def _init_worker():
+    global _worker_extractor
+    _worker_extractor = ProxyExtractor()
+
+
+def extract_chunk(messages: List[Dict]) -> List[ProxyData]:
+    """Extract the distinct proxies of a chunk of stored messages"""
+    proxies = []
+    for message in messages:
+        proxies.extend(_worker_extractor.extract_all_proxies(hrefs=message['hrefs'], text=message['text']))
+    return ProxyExtractor.remove_duplicates(proxies)
+
+
+@dataclass
+class ReextractionResult:
+    messages: int = 0
+    extracted: int = 0
+    new_proxies: List[ProxyData] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+
+class Reextractor:
+    """
+    Runs the current ProxyExtractor over the message store, e.g. after it learned a new link format.
+
+    Stored messages are read from SQLite in chunks of `chunk_size` and extracted
+    in a pool of worker processes, with at most two chunks per worker in flight,
+    so the history is never loaded at once. Proxies that are not in the proxies
+    table yet are inserted as not working until they are validated.
+    """
+
+    def __init__(self, message_store: Optional[MessageStore] = None, proxy_storage: Optional[ProxyStorage] = None,
+                 workers: int = REEXTRACT_WORKERS, chunk_size: int = REEXTRACT_CHUNK_SIZE):
+        self.message_store = message_store or MessageStore()
+        self.proxy_storage = proxy_storage or ProxyStorage()
+        self.workers = workers
+        self.chunk_size = max(chunk_size, 1)
+
+    def iter_chunks(self, channel: Optional[str] = None) -> Iterator[List[Dict]]:
+        chunk = []
+        for message in self.message_store.iter_messages(channel, batch_size=self.chunk_size):
+            chunk.append(message)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def run(self, channel: Optional[str] = None) -> ReextractionResult:
+        result = ReextractionResult()
+        started = time.perf_counter()
+
+        if self.workers:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+                in_flight = deque()
+                for chunk in self.iter_chunks(channel):
+                    result.messages += len(chunk)
+                    in_flight.append(executor.submit(extract_chunk, chunk))
+                    if len(in_flight) >= self.workers * 2:
+                        self._store(in_flight.popleft().result(), result)
+                while in_flight:
+                    self._store(in_flight.popleft().result(), result)
+        else:
+            _init_worker()
+            for chunk in self.iter_chunks(channel):
+                result.messages += len(chunk)
+                self._store(extract_chunk(chunk), result)
+
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _store(self, proxies: List[ProxyData], result: ReextractionResult):
+        result.extracted += len(proxies)
+        result.new_proxies.extend(self.proxy_storage.add_unvalidated_proxies(proxies))
+
+
+def print_reextraction_report(result: ReextractionResult):
+    print(f"♻️ Re-extracted {result.messages} stored messages in {result.elapsed:.2f}s "
+          f"({result.messages_per_second:.0f} messages/s)")
+    print(f"   • Proxies extracted: {result.extracted}")
+    print(f"   • New proxies: {len(result.new_proxies)}")
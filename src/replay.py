@@ -0,0 +1,147 @@
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+from src.telegram_client import TelegramClient
+from src.scheduler import ProxyScheduler
+from src.channel_scraper import ChannelScraper
+from src.proxy_validator import ProxyValidator
+from src.proxy_storage import ProxyStorage
+from src.proxy_extractor import ProxyData
+from src.scrape_state import ScrapeStateStore
+from src.message_store import MessageStore
+from src.channel_health import ChannelHealthTracker
+from src.channel_stats import ChannelYieldTracker
+from src.page_archive import PageArchive, page_cursor
+from src.page_fetcher import PageResponse
+
+
+class ArchiveFetcher:
+    """
+    Drop-in replacement for PageFetcher that serves channel pages from a PageArchive.
+
+    Every URL is answered with the latest archived fetch of that page at or
+    before `reference_time`. A missing first page is a 404; a missing ?before=
+    page ends the crawl with an empty page, like the end of a channel's history.
+    """
+
+    def __init__(self, archive: PageArchive, reference_time: Optional[datetime] = None):
+        self.archive = archive
+        self.reference_time = reference_time
+        self.budget = 0
+        self.fetch_count = 0
+        self.bytes_received = 0
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def reset_budget(self):
+        self.fetch_count = 0
+        self.bytes_received = 0
+
+    @property
+    def remaining_budget(self):
+        return None
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, on_chunk=None,
+                    proxy=None, egress=None):
+        # Archived pages are local, so they are always served whole
+        self.fetch_count += 1
+        parsed = urlparse(url)
+        channel = parsed.path.rstrip('/').split('/')[-1]
+        cursor = page_cursor(url)
+
+        page = self.archive.find_page(channel, cursor, before=self.reference_time)
+        if not page:
+            return PageResponse(url=url, status=404 if cursor is None else 200, body=b'', final_url=url)
+
+        body = self.archive.load(page['content_hash'])
+        self.bytes_received += len(body)
+        return PageResponse(url=url, status=page['status'], body=body, final_url=url)
+
+
+class RecordedValidator(ProxyValidator):
+    """
+    ProxyValidator answering from recorded outcomes instead of connecting.
+
+    Proxies without a recorded outcome are reported as not working.
+    """
+
+    def __init__(self, outcomes: Dict[str, Tuple[bool, float]]):
+        super().__init__()
+        self.outcomes = outcomes
+        self.unknown_count = 0
+
+    async def validate_single_proxy(self, proxy: ProxyData):
+        proxy_key = f"{proxy.server}:{proxy.port}"
+        outcome = self.outcomes.get(proxy_key)
+        if outcome is None:
+            self.unknown_count += 1
+            working, ping = False, float('inf')
+        else:
+            working, ping = outcome
+
+        self.ping_results[proxy_key] = ping if working else float('inf')
+        return working
+
+
+def build_replay_scheduler(archive_path: str, work_dir: str, reference_time: Optional[datetime] = None):
+    """
+    Build a ProxyScheduler that runs its cycle from a page archive.
+
+    All state (watermarks, channel health and yield, stored messages and proxies) is kept in
+    `work_dir`, so the live database is never touched and every replay of the
+    same archive starts from the same empty state. Nothing is posted to Telegram.
+    """
+    archive = PageArchive(archive_path)
+    reference_time = reference_time or archive.latest_fetch_time() or datetime.now(timezone.utc)
+
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    db_path = str(work_dir / 'replay.db')
+
+    telegram_client = TelegramClient(fetcher=ArchiveFetcher(archive, reference_time), offline=True)
+    channel_scraper = ChannelScraper(
+        telegram_client,
+        state_store=ScrapeStateStore(db_path),
+        health_tracker=ChannelHealthTracker(db_path),
+        message_store=MessageStore(db_path)
+    )
+    channel_scraper.target_channels = archive.list_channels()
+    channel_scraper.reference_time = reference_time
+
+    scheduler = ProxyScheduler(
+        telegram_client=telegram_client,
+        channel_scraper=channel_scraper,
+        proxy_validator=RecordedValidator(archive.load_validations()),
+        proxy_storage=ProxyStorage(db_path=db_path, storage_path=str(work_dir / 'proxies.json')),
+        yield_tracker=ChannelYieldTracker(db_path),
+        discovery_enabled=False
+    )
+    scheduler.output_channel = None
+    return scheduler
+
+
+async def run_replay(archive_path: str, work_dir: str, reference_time: Optional[datetime] = None):
+    """Replay one cycle from the archive and report its wall-clock and CPU time"""
+    scheduler = build_replay_scheduler(archive_path, work_dir, reference_time)
+    fetcher = scheduler.telegram_client.fetcher
+    print(f"📼 Replaying {len(scheduler.channel_scraper.target_channels)} archived channels "
+          f"as of {fetcher.reference_time.strftime('%Y-%m-%d %H:%M UTC')}")
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    await scheduler.run_hourly_cycle()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    validator = scheduler.proxy_validator
+    print(f"📼 Replay finished in {wall:.3f}s wall / {cpu:.3f}s CPU")
+    print(f"   • Pages served: {fetcher.fetch_count} ({fetcher.bytes_received / 1024:.1f} KB)")
+    if validator.unknown_count:
+        print(f"   • Proxies without a recorded outcome (counted as not working): {validator.unknown_count}")
+    return scheduler
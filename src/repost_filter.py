@@ -0,0 +1,118 @@
+import re
+import hashlib
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+from config.settings import REPOST_DEDUP_TTL_HOURS
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def message_fingerprint(message: Dict) -> str:
+    """Content hash of a message: its distinct links (sorted) and its case- and whitespace-normalized text"""
+    hrefs = '\n'.join(sorted(set(message.get('hrefs', []))))
+    text = WHITESPACE_PATTERN.sub(' ', (message.get('text') or '').casefold()).strip()
+    return hashlib.blake2b(f"{hrefs}\0{text}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+class RepostFilter:
+    """
+    Recognizes messages reposted verbatim across channels so they skip proxy extraction.
+
+    The first message with a given fingerprint in a cycle is extracted and the
+    keys of its proxies are remembered; later reposts only return those keys, so
+    lineage can still credit the earliest post. With a `db_path`, fingerprints
+    are also kept for `ttl_hours` across cycles, and reposts of content seen in
+    an earlier cycle are skipped entirely.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_hours: float = REPOST_DEDUP_TTL_HOURS):
+        self.db_path = Path(db_path) if db_path else None
+        self.ttl_hours = ttl_hours
+        # fingerprint -> proxy keys of the first message seen with it this cycle
+        self.seen: Dict[str, Tuple[str, ...]] = {}
+        self.persisted = set()
+        self.new_fingerprints = {}
+        self.totals = Counter()
+        self.duplicates = Counter()
+
+        if self.db_path:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._initialize_database()
+
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS message_fingerprints (
+                    fingerprint TEXT PRIMARY KEY,
+                    channel TEXT NOT NULL,
+                    first_seen TIMESTAMP NOT NULL
+                )
+            ''')
+            conn.commit()
+
+    def begin_cycle(self, now: Optional[datetime] = None):
+        """Start with an empty seen-set, loading the persisted fingerprints that are still fresh"""
+        self.seen = {}
+        self.new_fingerprints = {}
+        self.totals = Counter()
+        self.duplicates = Counter()
+        self.persisted = set()
+        if not self.db_path:
+            return
+
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(hours=self.ttl_hours)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM message_fingerprints WHERE first_seen < ?', (cutoff.isoformat(),))
+            cursor.execute('SELECT fingerprint FROM message_fingerprints')
+            self.persisted = {row[0] for row in cursor.fetchall()}
+            conn.commit()
+
+    def check(self, message: Dict) -> Tuple[str, Optional[Tuple[str, ...]]]:
+        """
+        Count the message for its channel and look its content up.
+
+        Returns its fingerprint and, for a repost, the proxy keys of the original
+        (empty when the original was seen in an earlier cycle); None for new content.
+        """
+        fingerprint = message_fingerprint(message)
+        channel = message.get('channel', 'unknown')
+        self.totals[channel] += 1
+
+        if fingerprint in self.seen:
+            self.duplicates[channel] += 1
+            return fingerprint, self.seen[fingerprint]
+        if fingerprint in self.persisted:
+            self.duplicates[channel] += 1
+            return fingerprint, ()
+
+        return fingerprint, None
+
+    def add(self, fingerprint: str, channel: str, proxy_keys: Iterable[str]):
+        self.seen[fingerprint] = tuple(proxy_keys)
+        self.new_fingerprints.setdefault(fingerprint, channel)
+
+    def commit(self, now: Optional[datetime] = None):
+        """Persist this cycle's new fingerprints (no-op without a database)"""
+        if not self.db_path or not self.new_fingerprints:
+            return
+
+        now = (now or datetime.now(timezone.utc)).isoformat()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR IGNORE INTO message_fingerprints (fingerprint, channel, first_seen)
+                VALUES (?, ?, ?)
+            ''', [(fingerprint, channel, now) for fingerprint, channel in self.new_fingerprints.items()])
+            conn.commit()
+
+        self.persisted.update(self.new_fingerprints)
+        self.new_fingerprints = {}
+
+    def get_duplicate_ratios(self) -> Dict[str, float]:
+        """Share of each channel's relevant messages this cycle that were reposts"""
+        return {channel: self.duplicates[channel] / total for channel, total in self.totals.items() if total}
@@ -0,0 +1,142 @@
+import time
+import asyncio
+import math
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+from config.settings import (
+    HEDGE_MIRROR_DOMAINS, HEDGE_LATENCY_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_INITIAL_DELAY, HEDGE_MIN_DELAY,
+    FETCH_TIMEOUT
+)
+
+# Recent fetch latencies the percentile is computed over
+LATENCY_WINDOW = 200
+
+
+class RequestHedger:
+    """
+    Races slow page requests against a second request to another front domain.
+
+    Channel previews are served by several fronts (t.me/s, telegram.me/s). A
+    request that is still running after the `percentile` of the recent fetch
+    latencies is hedged: the same page is requested from the next front, the
+    first answer is kept and the other request is cancelled. Only a 2xx or 304
+    response is an answer: errors and 429/5xx responses are waited out, so a
+    hedge only fails when both requests do. A streamed request claims the page
+    with its first body chunk, which cancels the other one; a request that
+    claimed the page before the hedge delay is never hedged, and once a page is
+    claimed only its owner's response is returned.
+
+    The latency of every request sent is recorded, including the losers: a
+    cancelled request counts with the time it ran, a lower bound of its latency,
+    so the percentile is not skewed towards the winners.
+    """
+
+    def __init__(self, mirrors: Optional[List[str]] = None, percentile: float = HEDGE_LATENCY_PERCENTILE,
+                 min_samples: int = HEDGE_MIN_SAMPLES, initial_delay: float = HEDGE_INITIAL_DELAY,
+                 min_delay: float = HEDGE_MIN_DELAY, max_delay: float = FETCH_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.mirrors = list(HEDGE_MIRROR_DOMAINS if mirrors is None else mirrors)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {'hedged': 0, 'mirror_wins': 0}
+
+    def mirror_url(self, url: str) -> Optional[str]:
+        """The same page on the next front domain, or None for hosts without a mirror"""
+        parts = urlsplit(url)
+        if parts.hostname not in self.mirrors or len(self.mirrors) < 2:
+            return None
+        mirror = self.mirrors[(self.mirrors.index(parts.hostname) + 1) % len(self.mirrors)]
+        return urlunsplit(parts._replace(netloc=mirror))
+
+    def record_latency(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """Seconds a request may run before it is hedged"""
+        if len(self.latencies) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self.latencies)
+        index = max(math.ceil(self.percentile / 100 * len(ordered)) - 1, 0)
+        return min(max(ordered[index], self.min_delay), self.max_delay)
+
+    @staticmethod
+    def is_answer(response) -> bool:
+        """A page or Not Modified; a fast 429/5xx from one front must not cancel the other request"""
+        return 200 <= response.status < 300 or response.status == 304
+
+    def _finish(self, url, response, target):
+        if target != url:
+            self.stats['mirror_wins'] += 1
+        return response
+
+    async def fetch(self, url: str, fetch_from: Callable[[str, Callable[[], bool]], Awaitable]):
+        """
+        Fetch `url` with `fetch_from(target url, claim)`, hedged to the mirror when slow.
+
+        `claim()` must be called by a streamed request before it uses a body chunk;
+        the first request to claim keeps the page and any later claim returns False.
+        """
+        mirror = self.mirror_url(url)
+        if not mirror:
+            return await fetch_from(url, lambda: True)
+
+        tasks = {}
+        owner = []
+
+        def claimer(target):
+            def claim():
+                if not owner:
+                    owner.append(target)
+                    for other, task in tasks.items():
+                        if other != target:
+                            task.cancel()
+                return owner[0] == target
+            return claim
+
+        started = {}
+        finished = {}
+
+        def send(target):
+            started[target] = self.clock()
+            tasks[target] = asyncio.ensure_future(fetch_from(target, claimer(target)))
+            tasks[target].add_done_callback(lambda _: finished.setdefault(target, self.clock()))
+
+        send(url)
+        try:
+            done, _ = await asyncio.wait([tasks[url]], timeout=self.hedge_delay())
+            # A request that already streams into the caller's parser is never hedged
+            if done or owner:
+                return self._finish(url, await tasks[url], url)
+
+            self.stats['hedged'] += 1
+            send(mirror)
+
+            pending = set(tasks.values())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if owner:
+                    # Only the request that claimed the page holds all of its streamed chunks
+                    if tasks[owner[0]].done():
+                        return self._finish(url, tasks[owner[0]].result(), owner[0])
+                    continue
+                for target, task in tasks.items():
+                    if (task in done and not task.cancelled() and task.exception() is None
+                            and self.is_answer(task.result())):
+                        return self._finish(url, task.result(), target)
+
+            # Neither request answered: report the outcome of the original one
+            if tasks[url].cancelled():
+                return tasks[mirror].result()
+            return tasks[url].result()
+        finally:
+            now = self.clock()
+            for target, task in tasks.items():
+                if not task.done():
+                    task.cancel()
+                self.record_latency(finished.get(target, now) - started[target])
@@ -0,0 +1,89 @@
+import json
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+from config.settings import RESPONSE_CACHE_PATH
+
+
+class ResponseCache:
+    """
+    On-disk validator cache for t.me/s pages.
+
+    For every page URL it keeps the ETag / Last-Modified headers and a hash of
+    the page's message list, so the next fetch can be sent as a conditional
+    request and an unchanged page can be recognised without parsing it.
+
+    New entries are staged and only written by commit(), after the cycle that
+    fetched them has processed the messages.
+    """
+    
+    def __init__(self, cache_path: str = RESPONSE_CACHE_PATH):
+        self.cache_path = Path(cache_path)
+        self.entries: Dict[str, Dict] = {}
+        self.pending: Dict[str, Dict] = {}
+        self._load()
+    
+    def _load(self):
+        if not self.cache_path.exists():
+            return
+        
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable response cache {self.cache_path}: {e}")
+            self.entries = {}
+    
+    @staticmethod
+    def hash_message_list(post_ids: Iterable[int]) -> str:
+        """
+        Hash of the page's message list.
+
+        Only the ordered post ids are hashed; view counters and reactions change
+        on every fetch and would make every page look modified.
+        """
+        return hashlib.sha256(','.join(str(post_id) for post_id in post_ids).encode('ascii')).hexdigest()
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+        
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def is_unchanged(self, url: str, content_hash: str) -> bool:
+        entry = self.entries.get(url)
+        return bool(entry) and entry.get('content_hash') == content_hash
+    
+    def stage(self, url: str, headers: Dict[str, str], content_hash: str):
+        self.pending[url] = {
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+    
+    def commit(self):
+        if not self.pending:
+            return
+        
+        self.entries.update(self.pending)
+        self.pending = {}
+        
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+        temp_path.replace(self.cache_path)
+    
+    def discard(self):
+        self.pending = {}
+    
+    def get(self, url: str) -> Optional[Dict]:
+        return self.entries.get(url)
@@ -1,4 +1,5 @@
 import asyncio
+import sqlite3
 import schedule
 import time
 from datetime import datetime, timezone
@@ -7,142 +8,168 @@ from src.channel_scraper import ChannelScraper
 from src.proxy_extractor import ProxyExtractor
 from src.proxy_validator import ProxyValidator
 from src.proxy_storage import ProxyStorage
-from config.settings import OUTPUT_CHANNEL, SCHEDULER_INTERVAL_HOURS
+from src.channel_stats import ChannelYieldTracker
+from src.channel_discovery import ChannelDiscovery
+from src.repost_filter import RepostFilter
+from src.proxy_router import ProxyRouter
+from src.bot_ingestion import ChannelPostPoller
+from src.pipeline import ProxyPipeline, CycleResult
+from config.settings import (
+    OUTPUT_CHANNEL, SCHEDULER_INTERVAL_HOURS, ADAPTIVE_SCHEDULING_ENABLED, DISCOVERY_ENABLED,
+    REPOST_DEDUP_ENABLED, REPOST_DEDUP_PERSIST, SCRAPE_PROXY_ENABLED
+)
 
 
 class ProxyScheduler:
     
-    def __init__(self):
-        self.telegram_client = TelegramClient()
-        self.channel_scraper = ChannelScraper(self.telegram_client)
+    def __init__(self, full_rescan=False, telegram_client=None, channel_scraper=None, proxy_validator=None,
+                 proxy_storage=None, yield_tracker=None, discovery_enabled=None):
+        # Components can be injected, e.g. to replay archived pages (see src/replay.py)
+        self.telegram_client = telegram_client or TelegramClient()
+        self.channel_scraper = channel_scraper or ChannelScraper(self.telegram_client, full_rescan=full_rescan)
         self.proxy_extractor = ProxyExtractor()
-        self.proxy_validator = ProxyValidator()
-        self.proxy_storage = ProxyStorage(
+        self.proxy_validator = proxy_validator or ProxyValidator()
+        self.output_channel = OUTPUT_CHANNEL
+        self.proxy_storage = proxy_storage or ProxyStorage(
             telegram_client=self.telegram_client,
-            output_channel=OUTPUT_CHANNEL
+            output_channel=self.output_channel
+        )
+        self.yield_tracker = yield_tracker or ChannelYieldTracker()
+        if DISCOVERY_ENABLED if discovery_enabled is None else discovery_enabled:
+            self.channel_discovery = ChannelDiscovery(self.telegram_client, self.channel_scraper, self.proxy_extractor)
+        else:
+            self.channel_discovery = None
+        if REPOST_DEDUP_ENABLED:
+            # Persisted fingerprints live next to the proxies they were extracted into
+            self.repost_filter = RepostFilter(self.proxy_storage.db_path if REPOST_DEDUP_PERSIST else None)
+        else:
+            self.repost_filter = None
+        if SCRAPE_PROXY_ENABLED and not self.telegram_client.offline:
+            self.telegram_client.proxy_router = ProxyRouter()
+        # Configured channels; discovered ones are added on top every cycle
+        self.configured_channels = list(self.channel_scraper.target_channels)
+        self.pipeline = ProxyPipeline(
+            self.channel_scraper, self.proxy_extractor, self.proxy_validator,
+            self.proxy_storage, self.yield_tracker,
+            channel_discovery=self.channel_discovery, repost_filter=self.repost_filter
         )
         self.is_running = False
     
+    def refresh_target_channels(self):
+        """Scrape the configured channels plus every channel accepted by discovery"""
+        if not self.channel_discovery:
+            return
+        
+        known = {self.channel_scraper.get_channel_name_from_url(url).lower() for url in self.configured_channels}
+        discovered = [url for url in self.channel_discovery.get_discovered_channels()
+                      if self.channel_scraper.get_channel_name_from_url(url) not in known]
+        self.channel_scraper.target_channels = self.configured_channels + discovered
+    
+    async def run_channel_discovery(self):
+        """Probe the top frontier candidates; a discovery failure never fails the cycle"""
+        try:
+            accepted = await self.channel_discovery.run(self.channel_scraper.target_channels)
+        except Exception as e:
+            print(f"⚠️ Channel discovery failed: {e}")
+            return
+        
+        if accepted:
+            print(f"🧭 Added {len(accepted)} discovered channels from the next cycle on: {', '.join(accepted)}")
+    
+    def select_due_channels(self):
+        """Return the channel URLs to scrape this cycle, skipping low-yield channels that are not due yet"""
+        channels = self.channel_scraper.target_channels
+        if not ADAPTIVE_SCHEDULING_ENABLED or self.channel_scraper.full_rescan:
+            return list(channels)
+        
+        names = {self.channel_scraper.get_channel_name_from_url(url): url for url in channels}
+        due_names = set(self.yield_tracker.get_due_channels(names))
+        return [url for name, url in names.items() if name in due_names]
+    
+    def record_channel_yield(self, channel_urls):
+        """
+        Persist this cycle's proxy lineage and reschedule the given channels; only
+        channels that were actually scraped should be passed, so channels skipped
+        by the fetch budget, rate limiting or an open circuit stay due
+        """
+        names = [self.channel_scraper.get_channel_name_from_url(url) for url in channel_urls]
+        self.print_new_proxy_sources(self.yield_tracker.commit_cycle(names))
+    
+    @staticmethod
+    def print_new_proxy_sources(new_per_channel):
+        productive = {channel: count for channel, count in new_per_channel.items() if count}
+        if productive:
+            summary = ', '.join(f"{channel} ({count})" for channel, count in
+                                sorted(productive.items(), key=lambda item: item[1], reverse=True)[:5])
+            print(f"🌱 New working proxies by channel: {summary}")
+    
+    def print_repost_report(self, max_channels=5):
+        """Print the channels whose relevant messages were most often verbatim reposts"""
+        if not self.repost_filter:
+            return
+        
+        ratios = {channel: ratio for channel, ratio in self.repost_filter.get_duplicate_ratios().items() if ratio}
+        if ratios:
+            summary = ', '.join(
+                f"{channel} {ratio:.0%} ({self.repost_filter.duplicates[channel]}/{self.repost_filter.totals[channel]})"
+                for channel, ratio in sorted(ratios.items(), key=lambda item: item[1], reverse=True)[:max_channels]
+            )
+            print(f"♻️ Repost ratio by channel: {summary}")
+    
+    def record_validation_outcomes(self, proxies):
+        """Keep the validator outcomes next to the archived pages so the cycle can be replayed offline"""
+        page_archive = self.telegram_client.page_archive
+        if not page_archive:
+            return
+        
+        outcomes = {}
+        for proxy in proxies:
+            working = self.proxy_validator.get_validation_status(proxy)
+            if working is not None:
+                outcomes[f"{proxy.server}:{proxy.port}"] = (working, self.proxy_validator.get_proxy_ping(proxy))
+        
+        try:
+            page_archive.record_validations(outcomes)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Could not archive validation outcomes: {e}")
+    
     async def run_hourly_cycle(self):
         print(f"\n🚀 Starting hourly proxy cycle at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}")
         
         try:
-            await self.telegram_client.start_session()
-            
-            print("📡 Scraping channels for proxy messages...")
-            messages = await self.channel_scraper.scrape_all_channels()
-            
-            if not messages:
-                print("ℹ️ No relevant messages found this cycle")
-                return
-            
-            # Debug: Print the content of relevant messages
-            self.debug_print_relevant_messages(messages)
-            
-            print("🔍 Extracting proxies from messages...")
-            all_proxies = []
-            for message in messages:
-                # Extract proxies from href attributes and text content
-                proxies = self.proxy_extractor.extract_all_proxies(
-                    hrefs=message.get('hrefs', []),
-                    text=message.get('combined_text', '')
-                )
-                all_proxies.extend(proxies)
-            
-            if not all_proxies:
-                print("ℹ️ No valid proxies found this cycle")
-                return
-            
-            print(f"✅ Extracted {len(all_proxies)} total proxies")
-            
-            # Remove duplicates across all extracted proxies
-            print("🔄 Removing duplicate proxies...")
-            unique_proxies = self.proxy_extractor.remove_duplicates(all_proxies)
-            duplicates_removed = len(all_proxies) - len(unique_proxies)
-            
-            if duplicates_removed > 0:
-                print(f"🗑️ Removed {duplicates_removed} duplicate proxies")
-                all_proxies = unique_proxies
-            else:
-                print("✅ No duplicates found")
-            
-            print(f"📊 Final count: {len(all_proxies)} unique proxies")
-            
-            # Print detailed information about each found proxy
-            print("\n📋 Found Proxies (Before Validation):")
-            print("-" * 60)
-            print(f"{'Type':<10} {'Server':<30} {'Port':<8} {'Secret/Auth':<20}")
-            print("-" * 60)
-            
-            for i, proxy in enumerate(all_proxies, 1):
-                auth_info = ""
-                if proxy.proxy_type == 'mtproto' and proxy.secret:
-                    auth_info = f"Secret: {proxy.secret[:8]}..." if len(proxy.secret) > 8 else f"Secret: {proxy.secret}"
-                elif proxy.proxy_type == 'socks5' and proxy.username:
-                    auth_info = f"User: {proxy.username}"
-                
-                print(f"{proxy.proxy_type:<10} {proxy.server:<30} {proxy.port:<8} {auth_info:<20}")
-                
-                # Print only first 20 proxies if there are too many
-                if i >= 20 and len(all_proxies) > 20:
-                    print(f"... and {len(all_proxies) - 20} more proxies")
-                    break
-            
-            print("-" * 60)
-            print("\n🔧 Validating proxy connectivity...")
-            working_proxies = await self.proxy_validator.validate_all_proxies(all_proxies)
-            
-            if not working_proxies:
-                print("⚠️ No working proxies found this cycle")
-                return
-            
-            # Print detailed information about working proxies after validation
-            print("\n📋 Working Proxies (After Validation):")
-            print("-" * 60)
-            print(f"{'Type':<10} {'Server':<30} {'Port':<8} {'Secret/Auth':<20}")
-            print("-" * 60)
-            
-            for i, proxy in enumerate(working_proxies, 1):
-                auth_info = ""
-                if proxy.proxy_type == 'mtproto' and proxy.secret:
-                    auth_info = f"Secret: {proxy.secret[:8]}..." if len(proxy.secret) > 8 else f"Secret: {proxy.secret}"
-                elif proxy.proxy_type == 'socks5' and proxy.username:
-                    auth_info = f"User: {proxy.username}"
-                
-                print(f"{proxy.proxy_type:<10} {proxy.server:<30} {proxy.port:<8} {auth_info:<20}")
-                
-                # Print only first 20 proxies if there are too many
-                if i >= 20 and len(working_proxies) > 20:
-                    print(f"... and {len(working_proxies) - 20} more proxies")
-                    break
+            self.yield_tracker.discard()
+            if self.channel_discovery:
+                self.channel_discovery.discard()
+            if self.repost_filter:
+                self.repost_filter.begin_cycle()
+            self.refresh_target_channels()
+            channels = self.select_due_channels()
             
-            print("-" * 60)
-            
-            print("💾 Saving proxies to local storage...")
-            self.proxy_storage.save_proxies_to_database(working_proxies)
-            self.proxy_storage.save_proxies_to_json(working_proxies)
+            await self.telegram_client.start_session()
             
-            if OUTPUT_CHANNEL:
-                print("📤 Posting proxies to Telegram channel...")
-                message_id = await self.proxy_storage.post_proxies_to_telegram(working_proxies, validator=self.proxy_validator)
-                if message_id:
-                    print(f"✅ Successfully posted to channel with message ID: {message_id}")
+            if channels:
+                print(f"📡 Scraping {len(channels)}/{len(self.channel_scraper.target_channels)} due channels "
+                      f"and validating their proxies as they arrive...")
+                result = await self.pipeline.run(channels)
             else:
-                print("ℹ️ No output channel configured, skipping Telegram posting")
+                # The stored proxies are still re-validated and republished
+                print("💤 No channels are due for scraping this cycle")
+                result = CycleResult()
             
-            print("🧹 Cleaning up outdated proxies...")
-            removed_count = self.proxy_storage.remove_outdated_proxies(days_old=7)
+            await self.publish_results(result)
             
-            stats = self.proxy_validator.get_validation_summary()
-            posting_stats = self.proxy_storage.get_posting_stats()
+            # Only advance the high-water marks once the new messages went through the pipeline
+            self.channel_scraper.commit_watermarks()
+            self.telegram_client.commit_response_cache()
+            self.telegram_client.prune_page_archive()
+            if self.repost_filter:
+                self.repost_filter.commit()
+            scraped = self.channel_scraper.scraped_channels
+            self.record_channel_yield([url for url in channels
+                                       if self.channel_scraper.get_channel_name_from_url(url) in scraped])
             
-            print(f"\n📊 Cycle Summary:")
-            print(f"   • Messages processed: {len(messages)}")
-            print(f"   • Proxies extracted: {len(all_proxies)} (after deduplication)")
-            print(f"   • Working proxies: {len(working_proxies)}")
-            print(f"   • Success rate: {stats['success_rate']:.1f}%")
-            print(f"   • Posted to Telegram: {'Yes' if OUTPUT_CHANNEL and message_id else 'No'}")
-            print(f"   • Outdated removed: {removed_count}")
+            if self.channel_discovery:
+                await self.run_channel_discovery()
             
         except Exception as e:
             print(f"❌ Error in hourly cycle: {e}")
@@ -151,6 +178,161 @@ class ProxyScheduler:
             await self.telegram_client.close_session()
             print(f"🏁 Hourly cycle completed at {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}\n")
     
+    async def ingest_channel_posts(self, posts):
+        """Run channel posts pushed through the Bot API straight through extraction, validation and storage"""
+        self.yield_tracker.discard()
+        if self.repost_filter:
+            self.repost_filter.begin_cycle()
+        self.channel_scraper.pending_messages = []
+        
+        channel_messages = self.channel_scraper.ingest_pushed_messages(posts)
+        if not channel_messages:
+            return None
+        
+        result = await self.pipeline.run_messages(channel_messages)
+        
+        self.channel_scraper.commit_watermarks()
+        if self.repost_filter:
+            self.repost_filter.commit()
+        # Pushed posts credit their proxies' lineage but are no scrape: the channels' schedule is left alone
+        self.print_new_proxy_sources(self.yield_tracker.commit_lineage())
+        channels = [messages[0]['channel'] for messages in channel_messages]
+        
+        print(f"📨 {result.messages} relevant channel posts from {', '.join(channels)}: "
+              f"{len(result.unique_proxies)} proxies, {len(result.working_proxies)} working")
+        return result
+    
+    async def start_bot_ingestion(self):
+        """Ingest channel posts as they are published, for channels where the bot is an admin"""
+        bot = self.telegram_client.bot
+        if not bot:
+            print("❌ Push ingestion needs a bot token (TELEGRAM_BOT_TOKEN)")
+            return
+        
+        await self.telegram_client.start_session()
+        poller = ChannelPostPoller(bot)
+        print("📨 Listening for channel posts (Ctrl+C to stop)...")
+        
+        try:
+            while True:
+                posts = await poller.poll()
+                if not posts:
+                    continue
+                try:
+                    await self.ingest_channel_posts(posts)
+                except Exception as e:
+                    print(f"❌ Error ingesting channel posts: {e}")
+        finally:
+            await self.telegram_client.close_session()
+    
+    async def revalidate_stored_proxies(self, validated):
+        """
+        Re-validate the stored working proxies that this cycle's posts did not bring up,
+        and mark the ones validated this cycle that stopped working; returns the number re-validated
+        """
+        validated_keys = set()
+        for proxy in validated:
+            validated_keys.add(self.proxy_extractor.proxy_key(proxy))
+            if self.proxy_validator.get_validation_status(proxy) is False:
+                self.proxy_storage.update_proxy_status(proxy, False)
+        
+        stored = [proxy for proxy in self.proxy_storage.get_working_proxies()
+                  if self.proxy_extractor.proxy_key(proxy) not in validated_keys]
+        if not stored:
+            return 0
+        
+        print(f"🔁 Re-validating {len(stored)} stored working proxies...")
+        results = await asyncio.gather(*(self.proxy_validator.validate_proxy(proxy) for proxy in stored))
+        for proxy, working in zip(stored, results):
+            self.proxy_storage.update_proxy_status(proxy, working)
+        print(f"🔁 {sum(results)}/{len(stored)} stored proxies are still working")
+        return len(stored)
+    
+    async def publish_results(self, result):
+        """
+        Print the summary of a pipeline run, re-validate the stored proxies and
+        rank, export and post every working proxy in the database
+        """
+        if result.messages:
+            # Debug: Print the content of relevant messages
+            self.debug_print_relevant_messages(result.sample_messages)
+            
+            duplicates_removed = result.extracted - len(result.unique_proxies)
+            print(f"✅ Extracted {result.extracted} total proxies from {result.messages} messages")
+            if result.reposts:
+                print(f"♻️ Skipped extraction for {result.reposts} reposted messages")
+                self.print_repost_report()
+            if duplicates_removed > 0:
+                print(f"🗑️ Removed {duplicates_removed} duplicate proxies")
+            print(f"📊 Final count: {len(result.unique_proxies)} unique proxies")
+        else:
+            print("ℹ️ No relevant messages found this cycle")
+        
+        if result.unique_proxies:
+            self.record_validation_outcomes(result.unique_proxies)
+            print(f"🔧 Validation complete: {len(result.working_proxies)}/{len(result.unique_proxies)} "
+                  f"proxies are working")
+        
+        # Incremental cycles only see new posts, so the published list is the database's working set
+        revalidated = await self.revalidate_stored_proxies(result.unique_proxies)
+        working_proxies = self.proxy_storage.get_working_proxies()
+        if not working_proxies:
+            print("⚠️ No working proxies found")
+            return
+        
+        working_proxies = self.proxy_validator.rank_by_ping(working_proxies)
+        self.print_proxy_table("Working Proxies (After Validation)", working_proxies)
+        
+        print("💾 Saving proxies to local storage...")
+        self.proxy_storage.save_proxies_to_json(working_proxies)
+        
+        message_id = None
+        if self.output_channel:
+            print("📤 Posting proxies to Telegram channel...")
+            message_id = await self.proxy_storage.post_proxies_to_telegram(working_proxies, validator=self.proxy_validator)
+            if message_id:
+                print(f"✅ Successfully posted to channel with message ID: {message_id}")
+        else:
+            print("ℹ️ No output channel configured, skipping Telegram posting")
+        
+        print("🧹 Cleaning up outdated proxies...")
+        removed_count = self.proxy_storage.remove_outdated_proxies(days_old=7)
+        
+        stats = self.proxy_validator.get_validation_summary()
+        
+        print(f"\n📊 Cycle Summary:")
+        print(f"   • Messages processed: {result.messages}")
+        print(f"   • Proxies extracted: {len(result.unique_proxies)} (after deduplication)")
+        print(f"   • New working proxies: {len(result.working_proxies)}")
+        print(f"   • Stored proxies re-validated: {revalidated}")
+        print(f"   • Working proxies: {len(working_proxies)}")
+        print(f"   • Success rate: {stats['success_rate']:.1f}%")
+        print(f"   • Posted to Telegram: {'Yes' if message_id else 'No'}")
+        print(f"   • Outdated removed: {removed_count}")
+    
+    @staticmethod
+    def print_proxy_table(title, proxies, max_rows=20):
+        print(f"\n📋 {title}:")
+        print("-" * 60)
+        print(f"{'Type':<10} {'Server':<30} {'Port':<8} {'Secret/Auth':<20}")
+        print("-" * 60)
+        
+        for i, proxy in enumerate(proxies, 1):
+            auth_info = ""
+            if proxy.proxy_type == 'mtproto' and proxy.secret:
+                auth_info = f"Secret: {proxy.secret[:8]}..." if len(proxy.secret) > 8 else f"Secret: {proxy.secret}"
+            elif proxy.proxy_type == 'socks5' and proxy.username:
+                auth_info = f"User: {proxy.username}"
+            
+            print(f"{proxy.proxy_type:<10} {proxy.server:<30} {proxy.port:<8} {auth_info:<20}")
+            
+            # Print only the first rows if there are too many
+            if i >= max_rows and len(proxies) > max_rows:
+                print(f"... and {len(proxies) - max_rows} more proxies")
+                break
+        
+        print("-" * 60)
+    
     def debug_print_relevant_messages(self, messages, max_messages=5):
         """Print the content of relevant messages for debugging purposes"""
         print("\n🔍 DEBUG: Sample of Relevant Messages:")
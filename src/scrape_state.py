@@ -0,0 +1,70 @@
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from config.settings import DATABASE_PATH
+
+
+class ScrapeStateStore:
+    """
+    Per-channel scraping state kept in the proxies database.
+
+    The high-water mark of a channel is the newest `data-post` id that has
+    already been passed downstream; older posts are skipped on later cycles.
+    """
+    
+    def __init__(self, db_path: str = DATABASE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._initialize_database()
+    
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS channel_watermarks (
+                    channel TEXT PRIMARY KEY,
+                    last_post_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+    
+    def get_watermark(self, channel: str) -> Optional[int]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT last_post_id FROM channel_watermarks WHERE channel = ?',
+                (channel,)
+            )
+            result = cursor.fetchone()
+            return result[0] if result else None
+    
+    def get_all_watermarks(self) -> Dict[str, int]:
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT channel, last_post_id FROM channel_watermarks')
+            return {channel: post_id for channel, post_id in cursor.fetchall()}
+    
+    def save_watermarks(self, watermarks: Dict[str, int]):
+        """Advance the high-water marks; a mark is never moved backwards"""
+        if not watermarks:
+            return
+        
+        now = datetime.now(timezone.utc)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO channel_watermarks (channel, last_post_id, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(channel) DO UPDATE SET
+                    last_post_id = MAX(last_post_id, excluded.last_post_id),
+                    updated_at = excluded.updated_at
+            ''', [(channel, post_id, now) for channel, post_id in watermarks.items()])
+            conn.commit()
+    
+    def clear_watermarks(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM channel_watermarks')
+            conn.commit()
@@ -1,35 +1,62 @@
-import requests
-from bs4 import BeautifulSoup
 import re
 import asyncio
 import logging
-from datetime import datetime
+import sqlite3
+import time
+import zlib
+import aiohttp
+from concurrent.futures import BrokenExecutor
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 from telegram import Bot
-from config.settings import API_ID, API_HASH, PHONE_NUMBER, SESSION_NAME, RATE_LIMIT_DELAY, BOT_TOKEN
+from config.settings import API_ID, API_HASH, PHONE_NUMBER, SESSION_NAME, RATE_LIMIT_DELAY, BOT_TOKEN, MAX_PAGES_PER_CHANNEL, RESPONSE_CACHE_ENABLED, PAGE_ARCHIVE_ENABLED, PAGE_ARCHIVE_RETENTION_DAYS, RATE_LIMIT_MAX_RETRIES, PARSE_WORKERS, HTML_PARSER_STREAMING, SCRAPE_PROXY_FAILOVER_ATTEMPTS, HEDGE_REQUESTS_ENABLED, EGRESS_ADDRESSES
 from src.utils import infinite_retry
+from src.page_fetcher import PageFetcher
+from src.response_cache import ResponseCache
+from src.page_archive import PageArchive
+from src.rate_limiter import HostRateLimiter
+from src.request_hedger import RequestHedger
+from src.html_parser import (
+    get_message_parser, scan_post_ids, scan_datetimes, StreamingMessageParser, HAS_LXML
+)
+from src.parse_pool import ParsePool
+from src.models import ScrapedMessage
+from src.exceptions import PageFetchError, ChannelUnavailableError, RateLimitedError
 
 
 class TelegramClient:
     
-    def __init__(self):
-        self.bot = None if not BOT_TOKEN else Bot(token=BOT_TOKEN)
-        self.session = requests.Session()
+    def __init__(self, fetcher=None, offline=False):
+        # Offline clients (archive replays) have no bot, response cache or page archive
+        self.bot = None if not BOT_TOKEN or offline else Bot(token=BOT_TOKEN)
+        # Pooled, non-blocking fetcher for t.me/s pages (browser-like headers)
+        self.fetcher = fetcher or PageFetcher()
+        self.crawl_stats = {}
+        self.page_parser = get_message_parser()
+        # CPU-bound page parsing runs in worker processes when PARSE_WORKERS is set
+        self.parse_pool = ParsePool(PARSE_WORKERS) if PARSE_WORKERS else None
+        self.response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED and not offline else None
+        self.page_archive = PageArchive() if PAGE_ARCHIVE_ENABLED and not offline else None
+        # Shared by every page request, so concurrent channel scrapes respect one per-host pace
+        self.rate_limiter = None if offline else HostRateLimiter()
+        # Channels are sharded across the egress addresses, each paced by its own limiter
+        self.egress_addresses = [] if offline else list(EGRESS_ADDRESSES)
+        self.egress_rate_limiters = {address: HostRateLimiter() for address in self.egress_addresses}
+        # Slow page requests are raced against the same page on another front domain
+        self.request_hedger = RequestHedger() if HEDGE_REQUESTS_ENABLED and not offline else None
+        # Set by the scheduler when SCRAPE_PROXY_ENABLED to rotate page requests over proxies
+        self.proxy_router = None
+        self.offline = offline
         self.is_connected = False
-        self.use_bot_token = bool(BOT_TOKEN)
-        
-        # Configure headers to mimic a browser
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        })
+        self.use_bot_token = self.bot is not None
     
     async def start_session(self):
         if self.is_connected:
             return
         
         try:
+            await self.fetcher.open()
+            
             if self.use_bot_token and self.bot:
                 # Test the bot connection by getting bot info
                 bot_info = await self.bot.get_me()
@@ -48,80 +75,324 @@ class TelegramClient:
         if self.bot:
             # Nothing to close for the bot
             pass
+        await self.fetcher.close()
+        if self.request_hedger and self.request_hedger.stats['hedged']:
+            stats = self.request_hedger.stats
+            print(f"🪃 Hedged {stats['hedged']} slow page requests, the mirror answered first {stats['mirror_wins']} times")
+            self.request_hedger.stats = {'hedged': 0, 'mirror_wins': 0}
+        if self.parse_pool:
+            self.parse_pool.close()
         self.is_connected = False
     
-    async def get_channel_messages(self, channel_url, limit=100):
+    def reset_fetch_budget(self):
+        """
+        Start a new fetch budget for the current scraping cycle and drop
+        cache entries staged by a cycle that did not finish
+        """
+        self.fetcher.reset_budget()
+        if self.response_cache:
+            self.response_cache.discard()
+    
+    async def get_channel_messages(self, channel_url, limit=None, since=None, max_pages=MAX_PAGES_PER_CHANNEL,
+                                   min_post_id=None) -> List[ScrapedMessage]:
         """
         Get messages from a Telegram channel using web scraping
+        
+        A t.me/s page only holds the latest ~20 posts, so when `since` is given the
+        crawler follows the ?before=<post id> cursor until it crosses that date.
+        Without `since` only the first page is fetched.
+        
+        Posts with an id at or below `min_post_id` (the channel's high-water mark)
+        are neither crawled nor parsed. In that incremental mode pages are also
+        revalidated against the response cache and skipped when unchanged.
+        
+        Fetch failures are raised (PageFetchError, ChannelUnavailableError or a
+        timeout) so callers can track the channel's health and retry timeouts.
         """
         if not self.is_connected:
             await self.start_session()
         
+        channel_name = self._get_channel_name(channel_url)
+        
         try:
-            # Clean up the channel URL
-            if '@' in channel_url:
-                channel_name = channel_url.replace('@', '')
-                url = f"https://t.me/s/{channel_name}"
-            elif 't.me/' in channel_url:
-                channel_name = channel_url.split('t.me/')[1]
-                url = f"https://t.me/s/{channel_name}"
-            else:
-                channel_name = channel_url
-                url = f"https://t.me/s/{channel_name}"
+            if since is None:
+                max_pages = 1
+            elif since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
             
-            # Make the request
-            response = self.session.get(url)
-            response.raise_for_status()
+            messages = []
+            stats = {'pages': 0, 'bytes': 0, 'unchanged': 0}
             
-            # Parse the HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
+            pages = self._iter_channel_pages(channel_name, since, max_pages, min_post_id, stats)
+            try:
+                async for response, stream_parser in pages:
+                    stats['pages'] += 1
+                    stats['bytes'] += len(response.body)
+                    
+                    if stream_parser:
+                        # Parsed while it downloaded; a fetcher that does not stream hands over the whole page
+                        if not stream_parser.bytes_fed:
+                            stream_parser.feed(response.body)
+                        messages.extend(stream_parser.close())
+                    else:
+                        # The next page is already in flight while this one is parsed
+                        messages.extend(await self._parse_page(response.body, channel_name, min_post_id))
+                    
+                    if limit and len(messages) >= limit:
+                        messages = messages[:limit]
+                        break
+            finally:
+                await pages.aclose()
             
-            # Find all message containers
-            message_containers = soup.find_all('div', class_='tgme_widget_message')
+            self.crawl_stats[channel_name] = stats
+            if stats['unchanged'] and not messages:
+                print(f"💤 {channel_name}: unchanged since last cycle")
+            elif stats['pages'] > 1:
+                print(f"📄 {channel_name}: crawled {stats['pages']} pages ({stats['bytes'] / 1024:.1f} KB)")
             
-            messages = []
-            for container in message_containers[:limit]:
-                message_id = container.get('data-post', '').split('/')[-1]
+            return messages
+            
+        except aiohttp.ClientError as e:
+            # Timeouts are left to propagate so they can be retried
+            if isinstance(e, asyncio.TimeoutError):
+                raise
+            raise PageFetchError(f"https://t.me/s/{channel_name}", message=f"Error fetching messages from {channel_url}: {e}") from e
+    
+    async def _iter_channel_pages(self, channel_name, since=None, max_pages=1, min_post_id=None, stats=None):
+        """
+        Yield channel pages newest first, following the ?before=<post id> cursor.
+        
+        Each page is scanned cheaply for post ids and dates to decide whether to
+        continue, and the next request is started before the page is yielded.
+        Pages are yielded with the streaming parser that parsed them during the
+        download, or None when they are left to be parsed whole.
+        """
+        base_url = f"https://t.me/s/{channel_name}"
+        use_cache = self.response_cache is not None and bool(min_post_id)
+        
+        egress = self.egress_for(channel_name)
+        
+        def request(url):
+            stream_parser = self._new_stream_parser(channel_name, min_post_id)
+            return asyncio.ensure_future(self._fetch_page(url, use_cache, min_post_id, stream_parser, egress)), stream_parser
+        
+        pending, pending_parser = request(base_url)
+        pages_fetched = 0
+        
+        try:
+            while pending:
+                response = await pending
+                stream_parser = pending_parser
+                pending = None
+                
+                # 304 Not Modified: the cached copy is still current
+                if response.status == 304:
+                    if stats is not None:
+                        stats['unchanged'] += 1
+                    return
+                
+                response.raise_for_status()
+                pages_fetched += 1
                 
-                # Get message text
-                text_div = container.find('div', class_='tgme_widget_message_text')
-                text = text_div.get_text() if text_div else ''
+                # t.me redirects /s/<name> to the plain channel card when there is no public history
+                if pages_fetched == 1 and response.final_url and '/s/' not in response.final_url:
+                    raise ChannelUnavailableError(
+                        response.url, response.status,
+                        f"Channel {channel_name} has no public message history (renamed, private or deleted)"
+                    )
                 
-                # Get the full HTML content of the message
-                html_content = str(text_div) if text_div else ''
+                post_ids = scan_post_ids(response.body)
+                if post_ids and use_cache:
+                    content_hash = self.response_cache.hash_message_list(post_ids)
+                    if self.response_cache.is_unchanged(response.url, content_hash):
+                        if stats is not None:
+                            stats['unchanged'] += 1
+                        return
+                    self.response_cache.stage(response.url, response.headers, content_hash)
                 
-                # Get message date
-                date_span = container.find('span', class_='tgme_widget_message_date')
-                date_str = date_span.find('time').get('datetime') if date_span and date_span.find('time') else ''
-                date_obj = datetime.fromisoformat(date_str.replace('Z', '+00:00')) if date_str else datetime.now()
+                # Unchanged pages are already archived from the fetch that changed them
+                self._archive_page(channel_name, response)
+                if not post_ids:
+                    return
                 
-                # Extract all href attributes from a tags
-                hrefs = []
-                if text_div:
-                    for a_tag in text_div.find_all('a'):
-                        href = a_tag.get('href')
-                        if href:
-                            hrefs.append(href)
+                # Nothing newer than the high-water mark: skip parsing entirely
+                if min_post_id and max(post_ids) <= min_post_id:
+                    return
                 
-                # Create message data structure
-                message_data = {
-                    'id': message_id,
-                    'channel_id': channel_name,
-                    'channel_name': channel_name,
-                    'date': date_obj.strftime('%Y-%m-%d %H:%M:%S'),
-                    'text': text,
-                    'html': html_content,
-                    'hrefs': hrefs,
-                    'combined_text': text + ' ' + html_content
-                }
+                oldest_id = min(post_ids)
+                reached_watermark = bool(min_post_id) and oldest_id <= min_post_id
+                dates = scan_datetimes(response.body)
+                crossed_cutoff = since is not None and dates and min(dates) < since
                 
-                messages.append(message_data)
+                if pages_fetched < max_pages and not crossed_cutoff and not reached_watermark and oldest_id > 1:
+                    pending, pending_parser = request(f"{base_url}?before={oldest_id}")
+                
+                yield response, stream_parser
+        finally:
+            if pending:
+                pending.cancel()
+    
+    def _new_stream_parser(self, channel_name, min_post_id=None):
+        """
+        Streaming parser for a page of a full scan. Incremental pages are sliced past
+        the high-water mark before parsing instead, and the worker pool parses whole pages.
+        """
+        if not HTML_PARSER_STREAMING or not HAS_LXML or self.parse_pool or min_post_id:
+            return None
+        return StreamingMessageParser(channel_name)
+    
+    def egress_for(self, channel_name):
+        """Local source address the channel's pages are fetched from (stable across cycles), or None"""
+        if not self.egress_addresses:
+            return None
+        return self.egress_addresses[zlib.crc32(channel_name.lower().encode()) % len(self.egress_addresses)]
+    
+    async def _fetch_page(self, url, use_cache=False, min_post_id=None, stream_parser=None, egress=None):
+        """
+        Fetch a page through the per-host rate limiter of its egress address.
+        
+        A 429 slows the host down and pauses it for the server's Retry-After before
+        the request is retried; RateLimitedError is raised once the retries are used up.
+        
+        With a high-water mark the page is streamed and the transfer is stopped as
+        soon as the page provably holds no post newer than `min_post_id`. With a
+        `stream_parser` the page is fed to it chunk by chunk as it downloads.
+        
+        A request running past the recent latency percentile is hedged to another
+        front domain (see RequestHedger) and the first answer is kept.
+        """
+        headers = self.response_cache.conditional_headers(url) if use_cache else None
+        rate_limiter = self.egress_rate_limiters.get(egress) or self.rate_limiter
+        
+        async def fetch_from(target_url, claim):
+            # The hedge to a mirror front waits for that host's own pace
+            if rate_limiter and target_url != url:
+                await rate_limiter.acquire(target_url)
             
-            return messages
+            options = {}
+            if egress:
+                options['egress'] = egress
+            if headers:
+                options['headers'] = headers
+            if stream_parser:
+                options['on_chunk'] = lambda chunk: claim() and stream_parser.feed(chunk)
+            return await self._fetch_routed(target_url, options, stream_parser)
+        
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            if rate_limiter:
+                await rate_limiter.acquire(url)
             
-        except Exception as e:
-            print(f"❌ Error fetching messages from {channel_url}: {e}")
-            return []
+            if self.request_hedger:
+                response = await self.request_hedger.fetch(url, fetch_from)
+            else:
+                response = await fetch_from(url, lambda: True)
+            # A page served by a mirror front is cached and archived under the requested URL
+            answered_url, response.url = response.url, url
+            
+            if not rate_limiter:
+                return response
+            backoff = rate_limiter.record_response(answered_url, response.status, response.headers)
+            if backoff is None:
+                return response
+            
+            print(f"🐢 Rate limited on {url}{f' from {egress}' if egress else ''}: backing off {backoff:.0f}s, "
+                  f"{rate_limiter.get_rate(url):.1f} requests/s from now on")
+        
+        raise RateLimitedError(url, retry_after=backoff)
+    
+    async def _fetch_routed(self, url, options, stream_parser=None):
+        """
+        Fetch a page through the proxy router's best routes.
+        
+        Connection errors, timeouts and 5xx answers count against the route and the
+        request fails over to the next one; the last error is raised once
+        SCRAPE_PROXY_FAILOVER_ATTEMPTS routes failed. A page that was already
+        partly fed to a streaming parser is not retried elsewhere.
+        """
+        if not self.proxy_router:
+            return await self.fetcher.fetch(url, **options)
+        
+        error = None
+        for route in self.proxy_router.ranked_routes()[:max(SCRAPE_PROXY_FAILOVER_ATTEMPTS, 1)]:
+            started = time.monotonic()
+            try:
+                if route.proxy:
+                    response = await self.fetcher.fetch(url, proxy=route.proxy, **options)
+                else:
+                    response = await self.fetcher.fetch(url, **options)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.proxy_router.record_failure(route)
+                if stream_parser and stream_parser.bytes_fed:
+                    raise
+                print(f"🔀 {url} failed through {route.name}, failing over: {e or type(e).__name__}")
+                error = e
+                continue
+            
+            if response.status >= 500:
+                self.proxy_router.record_failure(route)
+                error = None
+                continue
+            
+            self.proxy_router.record_success(route, time.monotonic() - started)
+            return response
+        
+        if error:
+            raise error
+        return response
+    
+    def _archive_page(self, channel_name, response):
+        """Keep the raw page body for offline re-extraction; archive errors never fail the scrape"""
+        if not self.page_archive:
+            return
+        try:
+            self.page_archive.store(channel_name, response.url, response.body, response.status)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Could not archive {response.url}: {e}")
+    
+    def prune_page_archive(self):
+        """Drop the archived fetches older than the retention period; archive errors never fail the cycle"""
+        if not self.page_archive or not PAGE_ARCHIVE_RETENTION_DAYS:
+            return
+        try:
+            removed = self.page_archive.prune(datetime.now(timezone.utc) - timedelta(days=PAGE_ARCHIVE_RETENTION_DAYS))
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠️ Could not prune the page archive: {e}")
+            return
+        if removed:
+            print(f"🗄️ Pruned {removed} archived pages older than {PAGE_ARCHIVE_RETENTION_DAYS} days")
+    
+    def commit_response_cache(self):
+        """
+        Persist the validators of pages fetched this cycle once their messages were processed
+        """
+        if self.response_cache:
+            self.response_cache.commit()
+    
+    async def _parse_page(self, page_body, channel_name, min_post_id=None):
+        """Parse a page in the worker pool, or in the event loop without one"""
+        if self.parse_pool:
+            try:
+                return await self.parse_pool.parse_messages(page_body, channel_name, min_post_id)
+            except BrokenExecutor as e:
+                print(f"⚠️ Parse worker pool failed, parsing in-process from now on: {e}")
+                self.parse_pool.close()
+                self.parse_pool = None
+        return self._parse_message_page(page_body, channel_name, min_post_id)
+    
+    def _parse_message_page(self, page_body, channel_name, min_post_id=None):
+        """
+        Parse the message containers of a t.me/s page newer than `min_post_id`
+        """
+        return self.page_parser.parse_messages(page_body, channel_name, min_post_id)
+    
+    @staticmethod
+    def _get_channel_name(channel_url):
+        # Clean up the channel URL
+        if '@' in channel_url:
+            return channel_url.replace('@', '')
+        elif 't.me/' in channel_url:
+            return channel_url.split('t.me/')[1]
+        return channel_url
     
     async def send_message(self, channel, message_text):
         """
@@ -244,40 +515,17 @@ class TelegramClient:
             print(f"Failed to get entity for {channel_url}: {e}")
             return None
     
-    async def fetch_channel_messages(self, channel_entity, limit=100):
+    async def fetch_channel_messages(self, channel_entity, limit=None, since=None, min_post_id=None):
         """
-        Fetch messages from a channel using web scraping
+        Fetch messages from a channel using web scraping, crawling back to `since` if given
+        and skipping posts at or below `min_post_id`
         """
         if not self.is_connected:
             await self.start_session()
         
-        try:
-            channel_name = channel_entity.get('username', channel_entity.get('id'))
-            
-            # Get messages using the get_channel_messages method
-            message_data = await self.get_channel_messages(channel_name, limit=limit)
-            
-            # Convert to a format similar to what the old method returned
-            messages = []
-            for msg in message_data:
-                message = type('Message', (), {})
-                message.id = msg['id']
-                message.date = datetime.strptime(msg['date'], '%Y-%m-%d %H:%M:%S')
-                message.message = msg['text']
-                message.html = msg['html']
-                message.hrefs = msg['hrefs']
-                
-                # Add chat attribute
-                message.chat = type('Chat', (), {})
-                message.chat.username = msg['channel_name']
-                
-                # Add entities attribute (empty list for now)
-                message.entities = []
-                
-                messages.append(message)
-            
-            return messages
-            
-        except Exception as e:
-            print(f"Error fetching messages: {e}")
-            return [] 
\ No newline at end of file
+        channel_name = channel_entity.get('username', channel_entity.get('id'))
+        
+        # Pages are parsed straight into ScrapedMessage objects
+        return await self.get_channel_messages(
+            channel_name, limit=limit, since=since, min_post_id=min_post_id
+        ) 
\ No newline at end of file
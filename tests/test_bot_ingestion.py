@@ -0,0 +1,118 @@
+import unittest
+import json
+import tempfile
+import sys
+import os
+from unittest.mock import Mock
+from aiohttp import web
+from telegram import Bot
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.bot_ingestion import ChannelPostPoller
+from src.channel_scraper import ChannelScraper
+from src.scrape_state import ScrapeStateStore
+from src.channel_health import ChannelHealthTracker
+from src.message_store import MessageStore
+
+TOKEN = '123456:TEST'
+PROXY_LINK = 'https://t.me/proxy?server=1.1.1.1&port=443&secret=ee00'
+
+
+def channel_post(update_id, message_id, username, **fields):
+    return {
+        'update_id': update_id,
+        'channel_post': {
+            'message_id': message_id,
+            'date': 1714564800,
+            'chat': {'id': -1001000000000 - update_id, 'type': 'channel', 'username': username},
+            **fields
+        }
+    }
+
+
+class TestChannelPostPoller(unittest.IsolatedAsyncioTestCase):
+    """Polls a local fake Bot API server"""
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.pending = [
+            channel_post(10, 5, 'channel1', text='New proxy: connect',
+                         entities=[{'type': 'text_link', 'offset': 11, 'length': 7, 'url': PROXY_LINK}]),
+            {'update_id': 11, 'message': {'message_id': 1, 'date': 1714564800,
+                                          'chat': {'id': 42, 'type': 'private'}, 'text': 'hi'}},
+            channel_post(12, 6, 'channel2', caption=f'mirror {PROXY_LINK}',
+                         caption_entities=[{'type': 'url', 'offset': 7, 'length': len(PROXY_LINK)}],
+                         forward_origin={'type': 'channel', 'date': 1714564700, 'message_id': 3,
+                                         'chat': {'id': -1002, 'type': 'channel', 'username': 'origin'}}),
+        ]
+
+        async def get_updates(request):
+            # python-telegram-bot sends form fields with JSON-encoded values
+            data = {key: json.loads(value) for key, value in (await request.post()).items()}
+            self.requests.append(data)
+            offset = data.get('offset') or 0
+            updates = [update for update in self.pending if update['update_id'] >= offset]
+            return web.json_response({'ok': True, 'result': updates})
+
+        app = web.Application()
+        app.router.add_post(f'/bot{TOKEN}/getUpdates', get_updates)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.bot = Bot(token=TOKEN, base_url=f'http://127.0.0.1:{port}/bot')
+
+    async def asyncTearDown(self):
+        await self.bot.shutdown()
+        await self.runner.cleanup()
+
+    async def test_poll_converts_channel_posts(self):
+        poller = ChannelPostPoller(self.bot, timeout=0)
+
+        posts = await poller.poll()
+
+        self.assertEqual([(post.chat.username, post.id) for post in posts], [('channel1', '5'), ('channel2', '6')])
+        self.assertEqual(posts[0].message, 'New proxy: connect')
+        self.assertEqual(posts[0].hrefs, (PROXY_LINK,))
+        self.assertEqual(posts[1].hrefs, (PROXY_LINK,))
+        self.assertEqual(posts[1].forwarded_from, 'origin')
+        self.assertEqual(posts[1].date.isoformat(), '2024-05-01T12:00:00+00:00')
+        self.assertEqual(self.requests[0]['allowed_updates'], ['channel_post'])
+
+    async def test_poll_confirms_received_updates(self):
+        poller = ChannelPostPoller(self.bot, timeout=0)
+        await poller.poll()
+
+        self.assertEqual(await poller.poll(), [])
+        self.assertEqual(self.requests[1]['offset'], 13)
+
+    async def test_failed_poll_backs_off(self):
+        await self.runner.cleanup()
+        poller = ChannelPostPoller(self.bot, timeout=0, retry_delay=0.01)
+
+        self.assertEqual(await poller.poll(), [])
+        self.assertEqual(poller.failures, 1)
+
+    async def test_pushed_posts_are_filtered_like_scraped_ones(self):
+        posts = await ChannelPostPoller(self.bot, timeout=0).poll()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, 'test.db')
+            scraper = ChannelScraper(Mock(), state_store=ScrapeStateStore(db_path),
+                                     health_tracker=ChannelHealthTracker(db_path), message_store=MessageStore(db_path))
+            scraper.reference_time = posts[0].date
+
+            channel_messages = scraper.ingest_pushed_messages(posts)
+            scraper.commit_watermarks()
+
+            self.assertEqual([[message['id'] for message in messages] for messages in channel_messages], [['5'], ['6']])
+            self.assertEqual(scraper.message_store.count(), 2)
+            # Pushed posts do not move the high-water marks
+            self.assertEqual(scraper.state_store.get_all_watermarks(), {})
+            # A second delivery of the same posts is skipped
+            self.assertEqual(scraper.ingest_pushed_messages(posts), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import asyncio
+import tempfile
+import sys
+import os
+from unittest.mock import AsyncMock, patch
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.channel_discovery import (
+    ChannelFrontier, ChannelDiscovery, extract_channel_references, channel_from_link
+)
+from src.channel_scraper import ChannelScraper
+from src.scrape_state import ScrapeStateStore
+from src.channel_health import ChannelHealthTracker
+from src.message_store import MessageStore
+from src.proxy_extractor import ProxyExtractor
+from src.models import ScrapedChat, ScrapedMessage
+from src.exceptions import ChannelUnavailableError, FetchBudgetExceeded, PageFetchError
+
+
+def proxy_message(channel, servers):
+    hrefs = tuple(f'https://t.me/proxy?server={server}&port=443&secret=ee00' for server in servers)
+    return ScrapedMessage(id='1', date=datetime.now(timezone.utc), message='Fresh proxy list', html='',
+                          hrefs=hrefs, chat=ScrapedChat(username=channel), forwarded_from='')
+
+
+class TestChannelReferences(unittest.TestCase):
+
+    def test_channel_from_link(self):
+        self.assertEqual(channel_from_link('https://t.me/ProxyChannel'), 'proxychannel')
+        self.assertEqual(channel_from_link('https://t.me/s/proxy_channel/123'), 'proxy_channel')
+        self.assertEqual(channel_from_link('tg://resolve?domain=other_channel'), 'other_channel')
+        self.assertIsNone(channel_from_link('https://t.me/proxy?server=1.1.1.1&port=443&secret=ee00'))
+        self.assertIsNone(channel_from_link('https://t.me/joinchat/AAAA'))
+        self.assertIsNone(channel_from_link('https://t.me/helper_bot'))
+        self.assertIsNone(channel_from_link('https://example.com/proxychannel'))
+
+    def test_extract_channel_references(self):
+        message = {
+            'channel': 'source',
+            'text': 'Join @more_proxies and @tiny, mail me at user@example_domain',
+            'hrefs': ['https://t.me/proxy_hub/15', 'https://t.me/source'],
+            'forwarded_from': 'Original_Channel',
+        }
+
+        self.assertEqual(extract_channel_references(message),
+                         {'more_proxies', 'proxy_hub', 'original_channel'})
+
+
+class TestChannelFrontier(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.frontier = ChannelFrontier(os.path.join(self.temp_dir.name, 'proxies.db'), max_size=2)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_frontier_is_deduplicated_and_bounded(self):
+        self.assertEqual(self.frontier.add_references({'alpha_channel': 1, 'beta_channel': 3},
+                                                      known_channels=['Known_Channel']), 2)
+        self.assertEqual(self.frontier.add_references({'alpha_channel': 4, 'gamma_channel': 1,
+                                                       'known_channel': 9},
+                                                      known_channels=['Known_Channel']), 1)
+
+        # alpha (5) and beta (3) outrank gamma (1), which is dropped
+        self.assertEqual(self.frontier.next_candidates(10), ['alpha_channel', 'beta_channel'])
+
+    def test_record_probe(self):
+        self.frontier.max_size = 10
+        self.frontier.add_references({'alpha_channel': 1, 'beta_channel': 1, 'gamma_channel': 1})
+
+        self.assertEqual(self.frontier.record_probe('alpha_channel', 2), 'accepted')
+        self.assertEqual(self.frontier.record_probe('beta_channel', 0), 'rejected')
+        self.assertEqual(self.frontier.record_probe('gamma_channel', error='timeout', max_attempts=2), 'pending')
+        self.assertEqual(self.frontier.record_probe('gamma_channel', error='timeout', max_attempts=2), 'rejected')
+
+        self.assertEqual(self.frontier.get_accepted(), ['alpha_channel'])
+        self.assertEqual(self.frontier.get_stats(), {'pending': 0, 'accepted': 1, 'rejected': 2})
+        # Probed candidates are not queued again
+        self.assertEqual(self.frontier.add_references({'beta_channel': 5}), 0)
+        self.assertEqual(self.frontier.next_candidates(10), [])
+
+
+class TestChannelDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.telegram_client = AsyncMock()
+        db_path = os.path.join(self.temp_dir.name, 'proxies.db')
+        scraper = ChannelScraper(self.telegram_client, state_store=ScrapeStateStore(db_path),
+                                 health_tracker=ChannelHealthTracker(db_path), message_store=MessageStore(db_path))
+        self.discovery = ChannelDiscovery(
+            self.telegram_client,
+            scraper,
+            ProxyExtractor(),
+            frontier=ChannelFrontier(db_path),
+            probes_per_cycle=3,
+            probe_interval=0
+        )
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _scrape(self, references):
+        for channel in references:
+            self.discovery.observe({'channel': 'source', 'text': f'More at @{channel}', 'hrefs': []})
+
+    @patch('src.channel_discovery.asyncio.sleep', new_callable=AsyncMock)
+    def test_probes_accept_productive_candidates(self, _):
+        self._scrape(['proxy_hub', 'proxy_hub', 'empty_channel', 'gone_channel'])
+        pages = {
+            'proxy_hub': [proxy_message('proxy_hub', ['1.1.1.1', '2.2.2.2'])],
+            'empty_channel': [],
+        }
+
+        async def get_channel_messages(channel):
+            if channel not in pages:
+                raise ChannelUnavailableError(f"{channel} does not exist")
+            return pages[channel]
+        self.telegram_client.get_channel_messages.side_effect = get_channel_messages
+
+        accepted = asyncio.run(self.discovery.run(['https://t.me/source']))
+
+        self.assertEqual(accepted, ['proxy_hub'])
+        self.assertEqual(self.discovery.get_discovered_channels(), ['https://t.me/proxy_hub'])
+        self.assertEqual(self.discovery.frontier.get_stats(), {'pending': 0, 'accepted': 1, 'rejected': 2})
+        self.assertEqual(self.discovery.pending_references, {})
+
+    @patch('src.channel_discovery.asyncio.sleep', new_callable=AsyncMock)
+    def test_budget_exhaustion_leaves_candidates_queued(self, _):
+        self._scrape(['proxy_hub', 'proxy_hub', 'flaky_channel'])
+        self.telegram_client.get_channel_messages.side_effect = [
+            PageFetchError("timeout"), FetchBudgetExceeded("budget spent")
+        ]
+
+        accepted = asyncio.run(self.discovery.run([]))
+
+        self.assertEqual(accepted, [])
+        self.assertEqual(self.discovery.frontier.next_candidates(10), ['proxy_hub', 'flaky_channel'])
+
+    def test_known_channels_are_not_queued(self):
+        self._scrape(['source_two'])
+
+        asyncio.run(self.discovery.run(['https://t.me/Source_Two']))
+
+        self.telegram_client.get_channel_messages.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
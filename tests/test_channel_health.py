@@ -0,0 +1,69 @@
+import unittest
+import tempfile
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.channel_health import ChannelHealthTracker, CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN
+
+
+class TestChannelHealthTracker(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tracker = ChannelHealthTracker(
+            os.path.join(self.temp_dir.name, 'test.db'),
+            failure_threshold=3, base_backoff_hours=1, max_backoff_hours=8
+        )
+        self.now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_unknown_channel_is_closed(self):
+        self.assertIsNone(self.tracker.get_health('channel1'))
+        self.assertEqual(self.tracker.get_state('channel1'), CIRCUIT_CLOSED)
+    
+    def test_circuit_opens_after_threshold(self):
+        self.assertIsNone(self.tracker.record_failure('channel1', status=500, now=self.now))
+        self.assertIsNone(self.tracker.record_failure('channel1', status=500, now=self.now))
+        open_until = self.tracker.record_failure('channel1', status=429, error='Too Many Requests', now=self.now)
+        
+        self.assertEqual(open_until, self.now + timedelta(hours=1))
+        self.assertEqual(self.tracker.get_state('channel1', now=self.now), CIRCUIT_OPEN)
+        self.assertEqual(self.tracker.get_state('channel1', now=open_until), CIRCUIT_HALF_OPEN)
+        
+        health = self.tracker.get_health('channel1')
+        self.assertEqual(health['consecutive_failures'], 3)
+        self.assertEqual(health['last_status'], 429)
+        self.assertEqual(health['last_error'], 'Too Many Requests')
+    
+    def test_failed_probes_back_off_exponentially(self):
+        self.assertEqual(self.tracker.backoff(3), timedelta(hours=1))
+        self.assertEqual(self.tracker.backoff(4), timedelta(hours=2))
+        self.assertEqual(self.tracker.backoff(5), timedelta(hours=4))
+        self.assertEqual(self.tracker.backoff(10), timedelta(hours=8))
+    
+    def test_permanent_failure_opens_at_once(self):
+        open_until = self.tracker.record_failure('gone', status=404, permanent=True, now=self.now)
+        
+        self.assertEqual(open_until, self.now + timedelta(hours=1))
+        self.assertEqual(self.tracker.get_state('gone', now=self.now), CIRCUIT_OPEN)
+    
+    def test_success_closes_circuit(self):
+        for _ in range(3):
+            self.tracker.record_failure('channel1', status=500, now=self.now)
+        self.tracker.record_success('channel1', now=self.now + timedelta(hours=2))
+        
+        health = self.tracker.get_health('channel1')
+        self.assertEqual(health['consecutive_failures'], 0)
+        self.assertIsNone(health['open_until'])
+        self.assertIsNone(health['last_error'])
+        self.assertEqual(health['last_success_at'], self.now + timedelta(hours=2))
+        self.assertEqual(self.tracker.get_state('channel1', now=self.now), CIRCUIT_CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,22 +4,34 @@ from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from datetime import datetime, timedelta, timezone
 import sys
 import os
+import tempfile
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.channel_scraper import ChannelScraper
 from src.telegram_client import TelegramClient
+from src.scrape_state import ScrapeStateStore
+from src.channel_health import ChannelHealthTracker
+from src.message_store import MessageStore
+from src.exceptions import PageFetchError, ChannelUnavailableError, FetchBudgetExceeded, RateLimitedError
+from src.models import ScrapedChat, ScrapedMessage
 
 
 class TestChannelScraper(unittest.TestCase):
     
     def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_store = ScrapeStateStore(os.path.join(self.temp_dir.name, 'test.db'))
         self.mock_telegram_client = Mock(spec=TelegramClient)
-        self.scraper = ChannelScraper(self.mock_telegram_client)
+        self.health_tracker = ChannelHealthTracker(os.path.join(self.temp_dir.name, 'test.db'), failure_threshold=2)
+        self.message_store = MessageStore(os.path.join(self.temp_dir.name, 'test.db'))
+        self.scraper = ChannelScraper(self.mock_telegram_client, state_store=self.state_store,
+                                      health_tracker=self.health_tracker, message_store=self.message_store)
     
     def tearDown(self):
         self.scraper = None
         self.mock_telegram_client = None
+        self.temp_dir.cleanup()
     
     def test_init(self):
         self.assertEqual(self.scraper.telegram_client, self.mock_telegram_client)
@@ -33,8 +45,8 @@ class TestChannelScraper(unittest.TestCase):
         self.scraper.target_channels = test_channels
         
         mock_messages = [
-            {'id': 1, 'text': 'proxy message', 'combined_text': 'proxy tg://proxy?server=1.1.1.1&port=443'},
-            {'id': 2, 'text': 'socks message', 'combined_text': 'socks5 tg://socks?server=2.2.2.2&port=1080'}
+            {'id': 1, 'text': 'proxy tg://proxy?server=1.1.1.1&port=443'},
+            {'id': 2, 'text': 'socks5 tg://socks?server=2.2.2.2&port=1080'}
         ]
         
         async def run_test():
@@ -54,6 +66,24 @@ class TestChannelScraper(unittest.TestCase):
         
         asyncio.run(run_test())
     
+    def test_scrape_all_channels_streams_each_channel(self):
+        test_channels = ['https://t.me/channel1', 'https://t.me/channel2']
+        delivered = []
+        
+        async def on_messages(messages):
+            delivered.append(messages)
+        
+        async def run_test():
+            with patch.object(self.scraper, '_scrape_channel_relevant', new_callable=AsyncMock) as mock_scrape:
+                mock_scrape.side_effect = [[{'id': 1}], None]
+                result = await self.scraper.scrape_all_channels(test_channels, on_messages=on_messages)
+            
+            self.assertEqual(result, [{'id': 1}])
+            # Channels without relevant messages are not delivered
+            self.assertEqual(delivered, [[{'id': 1}]])
+        
+        asyncio.run(run_test())
+    
     def test_scrape_all_channels_with_failures(self):
         test_channels = ['https://t.me/channel1', 'https://t.me/channel2']
         self.scraper.target_channels = test_channels
@@ -83,7 +113,47 @@ class TestChannelScraper(unittest.TestCase):
             
             self.assertEqual(result, mock_messages)
             self.mock_telegram_client.get_channel_entity.assert_called_once_with('https://t.me/test_channel')
-            self.mock_telegram_client.fetch_channel_messages.assert_called_once_with(mock_entity, limit=200)
+            self.mock_telegram_client.fetch_channel_messages.assert_called_once()
+            args, kwargs = self.mock_telegram_client.fetch_channel_messages.call_args
+            self.assertEqual(args, (mock_entity,))
+            self.assertLess(kwargs['since'], datetime.now(timezone.utc) - timedelta(days=29))
+        
+        asyncio.run(run_test())
+    
+    def test_scrape_single_channel_uses_watermark(self):
+        self.state_store.save_watermarks({'test_channel': 120})
+        mock_messages = [Mock(id='121'), Mock(id='125')]
+        
+        self.mock_telegram_client.get_channel_entity = AsyncMock(return_value={'username': 'test_channel'})
+        self.mock_telegram_client.fetch_channel_messages = AsyncMock(return_value=mock_messages)
+        
+        async def run_test():
+            await self.scraper.scrape_single_channel('https://t.me/test_channel')
+            
+            _, kwargs = self.mock_telegram_client.fetch_channel_messages.call_args
+            self.assertEqual(kwargs['min_post_id'], 120)
+            self.assertEqual(self.scraper.pending_watermarks, {'test_channel': 125})
+            
+            # Marks are only persisted once the cycle commits them
+            self.assertEqual(self.state_store.get_watermark('test_channel'), 120)
+            self.scraper.commit_watermarks()
+            self.assertEqual(self.state_store.get_watermark('test_channel'), 125)
+            self.assertEqual(self.scraper.pending_watermarks, {})
+        
+        asyncio.run(run_test())
+    
+    def test_scrape_single_channel_full_rescan_ignores_watermark(self):
+        self.state_store.save_watermarks({'test_channel': 120})
+        self.scraper.full_rescan = True
+        
+        self.mock_telegram_client.get_channel_entity = AsyncMock(return_value={'username': 'test_channel'})
+        self.mock_telegram_client.fetch_channel_messages = AsyncMock(return_value=[])
+        
+        async def run_test():
+            await self.scraper.scrape_single_channel('https://t.me/test_channel')
+            
+            _, kwargs = self.mock_telegram_client.fetch_channel_messages.call_args
+            self.assertIsNone(kwargs['min_post_id'])
         
         asyncio.run(run_test())
     
@@ -102,9 +172,127 @@ class TestChannelScraper(unittest.TestCase):
         self.mock_telegram_client.get_channel_entity = AsyncMock(side_effect=Exception("API Error"))
         
         async def run_test():
-            result = await self.scraper.scrape_single_channel('https://t.me/test_channel')
+            # Errors reach the caller so the channel's health can be tracked
+            with self.assertRaises(Exception):
+                await self.scraper.scrape_single_channel('https://t.me/test_channel')
+        
+        asyncio.run(run_test())
+    
+    def test_scrape_single_channel_retries_timeouts(self):
+        self.mock_telegram_client.get_channel_entity = AsyncMock(return_value={'username': 'test_channel'})
+        self.mock_telegram_client.fetch_channel_messages = AsyncMock(
+            side_effect=[asyncio.TimeoutError(), [Mock(id='5')]]
+        )
+        
+        async def run_test():
+            with patch('asyncio.sleep', new_callable=AsyncMock):
+                result = await self.scraper.scrape_single_channel('https://t.me/test_channel')
             
-            self.assertEqual(result, [])
+            self.assertEqual(len(result), 1)
+            self.assertEqual(self.mock_telegram_client.fetch_channel_messages.call_count, 2)
+        
+        asyncio.run(run_test())
+    
+    def test_failures_open_the_circuit(self):
+        self.scraper.target_channels = ['https://t.me/broken_channel']
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', new_callable=AsyncMock) as mock_scrape:
+                mock_scrape.side_effect = PageFetchError('https://t.me/s/broken_channel', 500)
+                
+                await self.scraper.scrape_all_channels()
+                health = self.health_tracker.get_health('broken_channel')
+                self.assertEqual(health['consecutive_failures'], 1)
+                self.assertEqual(health['last_status'], 500)
+                self.assertIsNone(health['open_until'])
+                
+                await self.scraper.scrape_all_channels()
+                self.assertIsNotNone(self.health_tracker.get_health('broken_channel')['open_until'])
+                
+                # An open circuit does not spend fetches on the channel
+                await self.scraper.scrape_all_channels()
+                self.assertEqual(mock_scrape.call_count, 2)
+        
+        asyncio.run(run_test())
+    
+    def test_unavailable_channel_opens_circuit_at_once(self):
+        self.scraper.target_channels = ['https://t.me/gone_channel']
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', new_callable=AsyncMock) as mock_scrape:
+                mock_scrape.side_effect = ChannelUnavailableError('https://t.me/s/gone_channel', 200)
+                await self.scraper.scrape_all_channels()
+            
+            self.assertEqual(self.health_tracker.get_state('gone_channel'), 'open')
+        
+        asyncio.run(run_test())
+    
+    def test_half_open_probe_skips_retries_and_closes_circuit(self):
+        self.scraper.target_channels = ['https://t.me/flaky_channel']
+        past = datetime.now(timezone.utc) - timedelta(days=1)
+        self.health_tracker.record_failure('flaky_channel', status=429, now=past)
+        self.health_tracker.record_failure('flaky_channel', status=429, now=past)
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', new_callable=AsyncMock) as mock_scrape:
+                with patch.object(self.scraper, '_scrape_channel', new_callable=AsyncMock) as mock_probe:
+                    mock_probe.return_value = []
+                    await self.scraper.scrape_all_channels()
+                    
+                    mock_probe.assert_called_once_with('https://t.me/flaky_channel')
+                    mock_scrape.assert_not_called()
+            
+            health = self.health_tracker.get_health('flaky_channel')
+            self.assertEqual(health['consecutive_failures'], 0)
+            self.assertEqual(self.health_tracker.get_state('flaky_channel'), 'closed')
+        
+        asyncio.run(run_test())
+    
+    def test_budget_exhaustion_is_not_a_channel_failure(self):
+        self.scraper.target_channels = ['https://t.me/channel1']
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', new_callable=AsyncMock) as mock_scrape:
+                mock_scrape.side_effect = FetchBudgetExceeded(10)
+                await self.scraper.scrape_all_channels()
+            
+            self.assertIsNone(self.health_tracker.get_health('channel1'))
+        
+        asyncio.run(run_test())
+    
+    def test_rate_limiting_is_not_a_channel_failure(self):
+        self.scraper.target_channels = ['https://t.me/channel1']
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', new_callable=AsyncMock) as mock_scrape:
+                mock_scrape.side_effect = RateLimitedError('https://t.me/s/channel1', retry_after=30)
+                await self.scraper.scrape_all_channels()
+            
+            self.assertIsNone(self.health_tracker.get_health('channel1'))
+        
+        asyncio.run(run_test())
+    
+    def test_only_fetched_channels_are_reported_as_scraped(self):
+        self.scraper.target_channels = ['https://t.me/channel1', 'https://t.me/channel2',
+                                        'https://t.me/channel3', 'https://t.me/channel4']
+        outcomes = {
+            'https://t.me/channel1': [],
+            'https://t.me/channel2': FetchBudgetExceeded(10),
+            'https://t.me/channel3': RateLimitedError('https://t.me/s/channel3', retry_after=30),
+            'https://t.me/channel4': PageFetchError('https://t.me/s/channel4', 500),
+        }
+        
+        async def scrape(channel_url):
+            outcome = outcomes[channel_url]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', side_effect=scrape):
+                await self.scraper.scrape_all_channels()
+            
+            self.assertEqual(self.scraper.scraped_channels, {'channel1'})
         
         asyncio.run(run_test())
     
@@ -132,9 +320,9 @@ class TestChannelScraper(unittest.TestCase):
                 with patch.object(self.scraper, 'is_message_containing_proxy') as mock_contains:
                     
                     mock_extract.side_effect = [
-                        {'combined_text': 'proxy server message', 'text': 'proxy server message', 'urls': []},
-                        {'combined_text': 'normal message', 'text': 'normal message', 'urls': []},
-                        {'combined_text': '', 'text': '', 'urls': []}
+                        {'text': 'proxy server message', 'urls': []},
+                        {'text': 'normal message', 'urls': []},
+                        {'text': '', 'urls': []}
                     ]
                     
                     mock_contains.side_effect = [True, False, False]
@@ -145,6 +333,53 @@ class TestChannelScraper(unittest.TestCase):
                     self.assertEqual(result[0]['id'], 1)
                     self.assertEqual(result[0]['channel'], 'test_channel')
     
+    def test_filter_relevant_messages_with_aware_dates(self):
+        chat = ScrapedChat(username='test_channel')
+        now = datetime.now(timezone.utc)
+        
+        def make_message(post_id, date, hrefs=()):
+            return ScrapedMessage(id=post_id, date=date, message='text', html='', hrefs=hrefs, chat=chat,
+                                  forwarded_from='')
+        
+        messages = [
+            make_message('1', now - timedelta(days=1), ('https://t.me/proxy?server=1.1.1.1&port=443&secret=ee',)),
+            make_message('2', now - timedelta(days=40), ('https://t.me/proxy?server=2.2.2.2&port=443&secret=ee',)),
+            # Naive dates are compared as UTC instead of raising TypeError
+            make_message('3', (now - timedelta(days=2)).replace(tzinfo=None), ('https://t.me/x',)),
+        ]
+        
+        result = self.scraper.filter_relevant_messages(messages)
+        
+        self.assertEqual([message['id'] for message in result], ['1', '3'])
+        self.assertEqual(result[0]['channel'], 'test_channel')
+        self.assertEqual(result[0]['hrefs'], ['https://t.me/proxy?server=1.1.1.1&port=443&secret=ee'])
+    
+    def test_stored_messages_are_skipped_on_later_cycles(self):
+        chat = ScrapedChat(username='channel1')
+        now = datetime.now(timezone.utc)
+        messages = [
+            ScrapedMessage(id=str(post_id), date=now, message='proxy list', html='',
+                           hrefs=(f'https://t.me/proxy?server=1.1.1.{post_id}&port=443&secret=ee',),
+                           chat=chat, forwarded_from='')
+            for post_id in (1, 2)
+        ]
+        
+        async def run_test():
+            with patch.object(self.scraper, 'scrape_single_channel', new_callable=AsyncMock) as mock_scrape:
+                mock_scrape.return_value = messages[:1]
+                first = await self.scraper.scrape_all_channels(['https://t.me/channel1'])
+                self.scraper.commit_watermarks()
+                
+                mock_scrape.return_value = messages
+                second = await self.scraper.scrape_all_channels(['https://t.me/channel1'])
+            return first, second
+        
+        first, second = asyncio.run(run_test())
+        
+        self.assertEqual([message['id'] for message in first], ['1'])
+        self.assertEqual([message['id'] for message in second], ['2'])
+        self.assertEqual(self.message_store.count(), 1)
+    
     def test_extract_full_message_data_basic_text(self):
         mock_message = Mock()
         mock_message.message = "Basic text message"
@@ -157,7 +392,6 @@ class TestChannelScraper(unittest.TestCase):
         
         self.assertEqual(result['text'], "Basic text message")
         self.assertEqual(result['urls'], [])
-        self.assertEqual(result['combined_text'], "Basic text message")
     
     def test_extract_full_message_data_with_urls(self):
         mock_message = Mock()
@@ -171,7 +405,6 @@ class TestChannelScraper(unittest.TestCase):
         self.assertEqual(result['text'], "Check this link https://example.com/proxy and https://another.com")
         self.assertIn("https://example.com/proxy", result['urls'])
         self.assertIn("https://another.com", result['urls'])
-        self.assertIn("https://example.com/proxy", result['combined_text'])
     
     def test_extract_full_message_data_with_buttons(self):
         mock_message = Mock()
@@ -206,14 +439,34 @@ class TestChannelScraper(unittest.TestCase):
         self.assertIn("Info", result['text'])
         # URL is captured
         self.assertIn("tg://proxy?server=1.1.1.1&port=443", result['urls'])
-        self.assertIn("tg://proxy?server=1.1.1.1&port=443", result['combined_text'])
+    
+    def test_extract_full_message_data_uses_carried_hrefs(self):
+        message = type('Message', (), {})()
+        message.message = "Fresh proxy"
+        message.html = '<div><a href="https://t.me/proxy?server=1.1.1.1&amp;port=443&amp;secret=ee">x</a></div>'
+        message.hrefs = ['https://t.me/proxy?server=1.1.1.1&port=443&secret=ee']
+        
+        with patch.object(self.scraper.html_parser, 'extract_hrefs') as mock_extract_hrefs:
+            result = self.scraper.extract_full_message_data(message)
+            mock_extract_hrefs.assert_not_called()
+        
+        self.assertEqual(result['hrefs'], message.hrefs)
+        self.assertEqual(result['text'], "Fresh proxy")
+    
+    def test_extract_full_message_data_parses_html_without_carried_hrefs(self):
+        message = type('Message', (), {})()
+        message.message = "Fresh proxy"
+        message.html = '<div><a href="https://t.me/proxy?server=1.1.1.1&amp;port=443&amp;secret=ee">x</a></div>'
+        
+        result = self.scraper.extract_full_message_data(message)
+        
+        self.assertEqual(result['hrefs'], ['https://t.me/proxy?server=1.1.1.1&port=443&secret=ee'])
     
     def test_extract_full_message_data_empty_message(self):
         result = self.scraper.extract_full_message_data(None)
         
         self.assertEqual(result['text'], '')
         self.assertEqual(result['urls'], [])
-        self.assertEqual(result['combined_text'], '')
     
     def test_extract_message_text_delegates_to_full_data(self):
         mock_message = Mock()
@@ -259,6 +512,15 @@ class TestChannelScraper(unittest.TestCase):
                 result = self.scraper.is_message_containing_proxy(message)
                 self.assertEqual(result, expected)
     
+    def test_match_proxy_keyword_records_stats(self):
+        self.assertEqual(self.scraper.match_proxy_keyword("Fresh SOCKS5 list"), 'socks5')
+        self.assertEqual(self.scraper.match_proxy_keyword("Новый ПРОКСИ"), 'прокси')
+        self.assertIsNone(self.scraper.match_proxy_keyword("Nothing relevant"))
+        
+        self.assertEqual(self.scraper.keyword_stats['socks5'], 1)
+        self.assertEqual(self.scraper.keyword_stats['прокси'], 1)
+        self.assertEqual(sum(self.scraper.keyword_stats.values()), 2)
+    
     def test_get_channel_name_from_url(self):
         test_cases = [
             ("https://t.me/test_channel", "test_channel"),
@@ -289,7 +551,6 @@ class TestChannelScraper(unittest.TestCase):
         
         self.assertEqual(result['text'], "Check this out")
         self.assertIn("https://proxy-site.com/list", result['urls'])
-        self.assertIn("https://proxy-site.com/list", result['combined_text'])
     
     def test_extract_full_message_data_text_attribute_fallback(self):
         mock_message = Mock()
@@ -303,7 +564,6 @@ class TestChannelScraper(unittest.TestCase):
         result = self.scraper.extract_full_message_data(mock_message)
         
         self.assertEqual(result['text'], "Fallback text content")
-        self.assertEqual(result['combined_text'], "Fallback text content")
 
 
 if __name__ == '__main__':
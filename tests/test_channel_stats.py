@@ -0,0 +1,133 @@
+import unittest
+import tempfile
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.channel_stats import ChannelYieldTracker
+
+
+class TestChannelYieldTracker(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tracker = ChannelYieldTracker(
+            os.path.join(self.temp_dir.name, 'test.db'),
+            min_interval_hours=1, max_interval_hours=24,
+            smoothing=0.5, yield_target=3, freshness_half_life_hours=24
+        )
+        self.now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_lineage_credits_first_channel_only(self):
+        self.tracker.observe('mtproto:a:443', 'channel1', 10)
+        self.tracker.observe('mtproto:b:443', 'channel1', 11)
+        self.tracker.mark_working(['mtproto:a:443', 'mtproto:b:443'])
+        new = self.tracker.commit_cycle(['channel1', 'channel2'], now=self.now)
+        
+        self.assertEqual(new, {'channel1': 2, 'channel2': 0})
+        lineage = self.tracker.get_lineage('mtproto:a:443')
+        self.assertEqual(lineage['channel'], 'channel1')
+        self.assertEqual(lineage['message_id'], '10')
+        
+        # The same proxy reposted by another channel is not new
+        self.tracker.observe('mtproto:a:443', 'channel2', 99)
+        self.tracker.mark_working(['mtproto:a:443'])
+        new = self.tracker.commit_cycle(['channel2'], now=self.now + timedelta(hours=1))
+        
+        self.assertEqual(new, {'channel2': 0})
+        self.assertEqual(self.tracker.get_lineage('mtproto:a:443')['channel'], 'channel1')
+    
+    def test_earliest_message_is_the_source(self):
+        self.tracker.observe('http:a:80', 'late', 2, self.now)
+        self.tracker.observe('http:a:80', 'early', 1, self.now - timedelta(hours=2))
+        self.tracker.mark_working(['http:a:80'])
+        self.tracker.commit_cycle(['late', 'early'], now=self.now)
+        
+        self.assertEqual(self.tracker.get_lineage('http:a:80')['channel'], 'early')
+    
+    def test_non_working_proxies_are_not_credited(self):
+        self.tracker.observe('http:dead:80', 'channel1', 1)
+        new = self.tracker.commit_cycle(['channel1'], now=self.now)
+        
+        self.assertEqual(new, {'channel1': 0})
+        self.assertIsNone(self.tracker.get_lineage('http:dead:80'))
+    
+    def test_yield_score_is_smoothed(self):
+        self.tracker.observe('p1', 'channel1', 1)
+        self.tracker.observe('p2', 'channel1', 1)
+        self.tracker.mark_working(['p1', 'p2'])
+        self.tracker.commit_cycle(['channel1'], now=self.now)
+        self.tracker.commit_cycle(['channel1'], now=self.now + timedelta(hours=1))
+        
+        stats = self.tracker.get_channel_stats()[0]
+        self.assertAlmostEqual(stats['yield_score'], 1.0)
+        self.assertEqual(stats['scrape_count'], 2)
+        self.assertEqual(stats['total_new_proxies'], 2)
+        self.assertEqual(stats['last_new_proxy_at'], self.now)
+    
+    def test_reposted_working_proxies_keep_a_channel_productive(self):
+        self.tracker.observe('p1', 'elsewhere', 1)
+        self.tracker.mark_working(['p1'])
+        self.tracker.commit_cycle(['elsewhere'], now=self.now)
+        
+        # 'reposter' keeps posting a proxy first seen elsewhere that still works
+        for hour in range(1, 4):
+            self.tracker.observe('p1', 'reposter', hour)
+            self.tracker.mark_working(['p1'])
+            new = self.tracker.commit_cycle(['reposter'], now=self.now + timedelta(hours=hour))
+            self.assertEqual(new, {'reposter': 0})
+        
+        stats = {row['channel']: row for row in self.tracker.get_channel_stats()}['reposter']
+        self.assertAlmostEqual(stats['yield_score'], 1.0)
+        self.assertEqual(stats['total_new_proxies'], 0)
+        self.assertIsNone(stats['last_new_proxy_at'])
+        # Not backed off to the max interval
+        self.assertLess(stats['next_due_at'] - stats['last_scraped_at'], timedelta(hours=24))
+    
+    def test_commit_lineage_leaves_the_schedule_alone(self):
+        self.tracker.observe('p1', 'pushed', 1)
+        self.tracker.mark_working(['p1'])
+        
+        self.assertEqual(self.tracker.commit_lineage(now=self.now), {'pushed': 1})
+        self.assertEqual(self.tracker.get_lineage('p1')['channel'], 'pushed')
+        self.assertEqual(self.tracker.get_channel_stats(), [])
+        self.assertEqual(self.tracker.pending_working, set())
+    
+    def test_productive_channels_are_polled_more_often(self):
+        self.tracker.observe('p1', 'busy', 1)
+        self.tracker.mark_working(['p1'])
+        self.tracker.commit_cycle(['busy', 'dead'], now=self.now)
+        
+        schedule = {row['channel']: row['next_due_at'] for row in self.tracker.get_channel_stats()}
+        self.assertEqual(schedule['busy'], self.now + timedelta(hours=1))
+        self.assertEqual(schedule['dead'], self.now + timedelta(hours=24))
+    
+    def test_freshness_decays(self):
+        self.assertEqual(self.tracker.freshness(None, self.now), 0.0)
+        self.assertAlmostEqual(self.tracker.freshness(self.now, self.now), 1.0)
+        self.assertAlmostEqual(self.tracker.freshness(self.now - timedelta(hours=24), self.now), 0.5)
+    
+    def test_get_due_channels(self):
+        self.tracker.commit_cycle(['dead'], now=self.now)
+        
+        self.assertEqual(self.tracker.get_due_channels(['dead', 'new'], now=self.now), ['new'])
+        self.assertEqual(
+            self.tracker.get_due_channels(['dead', 'new'], now=self.now + timedelta(hours=24)),
+            ['dead', 'new']
+        )
+    
+    def test_discard_drops_staged_observations(self):
+        self.tracker.observe('p1', 'channel1', 1)
+        self.tracker.mark_working(['p1'])
+        self.tracker.discard()
+        
+        self.assertEqual(self.tracker.commit_cycle(['channel1'], now=self.now), {'channel1': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src import html_parser
+from src.html_parser import (
+    SoupMessageParser, LxmlMessageParser, get_message_parser,
+    scan_post_ids, scan_datetimes, slice_new_containers, StreamingMessageParser
+)
+
+SAMPLE_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Telegram: Contact @test_channel</title></head>
+<body><section class="tgme_channel_history js-message_history">
+<div class="tgme_widget_message_wrap js-widget_message_wrap">
+  <div class="tgme_widget_message text_not_supported_wrap js-widget_message" data-post="test_channel/101">
+    <div class="tgme_widget_message_text js-message_text" dir="auto">پروکسی جدید
+      <a href="https://t.me/proxy?server=1.2.3.4&amp;port=443&amp;secret=ee00">Connect</a>
+    </div>
+    <div class="tgme_widget_message_footer">
+      <span class="tgme_widget_message_views">1.2K</span>
+      <a class="tgme_widget_message_date" href="https://t.me/test_channel/101"><time datetime="2024-05-01T10:00:00+00:00" class="time">10:00</time></a>
+    </div>
+  </div>
+</div>
+<div class="tgme_widget_message_wrap js-widget_message_wrap">
+  <div class="tgme_widget_message text_not_supported_wrap js-widget_message" data-post="test_channel/102">
+    <div class="tgme_widget_message_forwarded_from accent_color">Forwarded from <a class="tgme_widget_message_forwarded_from_name" href="https://t.me/source_channel/77"><span dir="auto">Source</span></a></div>
+    <div class="tgme_widget_message_text js-message_text" dir="auto">Two links
+      <a href="tg://proxy?server=5.6.7.8&amp;port=80&amp;secret=dd11">One</a>
+      <a href="https://t.me/other_channel">Two</a>
+    </div>
+    <div class="tgme_widget_message_footer">
+      <a class="tgme_widget_message_date" href="https://t.me/test_channel/102"><time datetime="2024-05-02T11:30:00+00:00" class="time">11:30</time></a>
+    </div>
+  </div>
+</div>
+</section></body></html>'''.encode('utf-8')
+
+
+class TestHtmlParser(unittest.TestCase):
+    
+    def test_scan_helpers(self):
+        self.assertEqual(scan_post_ids(SAMPLE_PAGE), [101, 102])
+        self.assertEqual([d.day for d in scan_datetimes(SAMPLE_PAGE)], [1, 2])
+    
+    def test_slice_new_containers(self):
+        self.assertEqual(slice_new_containers(SAMPLE_PAGE, None), SAMPLE_PAGE)
+        self.assertIsNone(slice_new_containers(SAMPLE_PAGE, 102))
+        
+        sliced = slice_new_containers(SAMPLE_PAGE, 101)
+        self.assertEqual(scan_post_ids(sliced), [102])
+        self.assertTrue(sliced.startswith(b'<div class="tgme_widget_message '))
+    
+    def test_soup_parser(self):
+        messages = SoupMessageParser().parse_messages(SAMPLE_PAGE, 'test_channel')
+        
+        self.assertEqual([m.id for m in messages], ['101', '102'])
+        self.assertIn('پروکسی جدید', messages[0].message)
+        self.assertEqual(messages[0].hrefs, ('https://t.me/proxy?server=1.2.3.4&port=443&secret=ee00',))
+        self.assertEqual(messages[1].date, datetime(2024, 5, 2, 11, 30, tzinfo=timezone.utc))
+        self.assertIs(messages[0].chat, messages[1].chat)
+        self.assertEqual(len(messages[1].hrefs), 2)
+        self.assertEqual([m.forwarded_from for m in messages], ['', 'source_channel'])
+    
+    @unittest.skipUnless(html_parser.HAS_LXML, "lxml is not installed")
+    def test_lxml_parser_matches_soup_parser(self):
+        soup_messages = SoupMessageParser().parse_messages(SAMPLE_PAGE, 'test_channel')
+        lxml_messages = LxmlMessageParser().parse_messages(SAMPLE_PAGE, 'test_channel')
+        
+        for soup_message, lxml_message in zip(soup_messages, lxml_messages):
+            for attribute in ('id', 'date', 'hrefs', 'chat', 'forwarded_from'):
+                self.assertEqual(getattr(soup_message, attribute), getattr(lxml_message, attribute))
+            self.assertEqual(soup_message.message.split(), lxml_message.message.split())
+        self.assertEqual(len(soup_messages), len(lxml_messages))
+    
+    @unittest.skipUnless(html_parser.HAS_LXML, "lxml is not installed")
+    def test_streaming_parser_matches_lxml_parser(self):
+        expected = LxmlMessageParser().parse_messages(SAMPLE_PAGE, 'test_channel')
+        parser = StreamingMessageParser('test_channel')
+        
+        emitted = [len(parser.feed(SAMPLE_PAGE[offset:offset + 50])) for offset in range(0, len(SAMPLE_PAGE), 50)]
+        messages = parser.close()
+        
+        fields = lambda m: (m.id, m.date, m.message, m.html, m.hrefs, m.chat.username, m.forwarded_from)
+        self.assertEqual([fields(m) for m in messages], [fields(m) for m in expected])
+        # Each message was emitted by the chunk that closed its container, before the page ended
+        self.assertEqual(sum(emitted), 2)
+        self.assertEqual(emitted[-1], 0)
+    
+    @unittest.skipUnless(html_parser.HAS_LXML, "lxml is not installed")
+    def test_lxml_parser_on_sliced_page(self):
+        messages = LxmlMessageParser().parse_messages(SAMPLE_PAGE, 'test_channel', min_post_id=101)
+        self.assertEqual([m.id for m in messages], ['102'])
+        self.assertEqual(LxmlMessageParser().parse_messages(SAMPLE_PAGE, 'test_channel', min_post_id=102), [])
+    
+    def test_extract_hrefs(self):
+        fragment = '<div><a href="https://t.me/proxy?server=a&amp;port=1">x</a><a>no href</a></div>'
+        expected = ['https://t.me/proxy?server=a&port=1']
+        
+        self.assertEqual(SoupMessageParser().extract_hrefs(fragment), expected)
+        if html_parser.HAS_LXML:
+            self.assertEqual(LxmlMessageParser().extract_hrefs(fragment), expected)
+    
+    def test_get_message_parser_auto(self):
+        parser = get_message_parser('auto')
+        expected = LxmlMessageParser if html_parser.HAS_LXML else SoupMessageParser
+        self.assertIsInstance(parser, expected)
+    
+    def test_get_message_parser_falls_back_without_lxml(self):
+        with patch('src.html_parser.HAS_LXML', False):
+            self.assertIsInstance(get_message_parser('auto'), SoupMessageParser)
+            self.assertIsInstance(get_message_parser('lxml'), SoupMessageParser)
+    
+    def test_get_message_parser_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_message_parser('regex')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ import tempfile
 import sys
 from unittest.mock import patch, MagicMock, AsyncMock
 from pathlib import Path
+from datetime import datetime, timezone
 
 # Mock the Telethon import before importing our modules
 mock_telethon = MagicMock()
@@ -39,6 +40,12 @@ from src.proxy_extractor import ProxyExtractor
 from src.proxy_validator import ProxyValidator
 from src.proxy_storage import ProxyStorage
 from src.proxy_extractor import ProxyData
+from src.channel_stats import ChannelYieldTracker
+from src.pipeline import CycleResult
+from src.models import ScrapedChat, ScrapedMessage
+from src.scrape_state import ScrapeStateStore
+from src.channel_health import ChannelHealthTracker
+from src.message_store import MessageStore
 
 # Create a test version of ProxyStorage that uses our temp files
 class TestProxyStorage(ProxyStorage):
@@ -84,6 +91,29 @@ class TestIntegration(unittest.IsolatedAsyncioTestCase):
         
         mock_proxy_storage_class.side_effect = create_test_storage
         
+        # Keep channel yield and schedule state out of the real database
+        self.temp_state_dir = tempfile.TemporaryDirectory()
+        self.yield_tracker_patcher = patch(
+            'src.scheduler.ChannelYieldTracker',
+            side_effect=lambda: ChannelYieldTracker(os.path.join(self.temp_state_dir.name, 'state.db'))
+        )
+        self.yield_tracker_patcher.start()
+        
+        # Scrape state, channel health and stored messages stay out of the real database too
+        state_db = os.path.join(self.temp_state_dir.name, 'state.db')
+        self.channel_scraper_patcher = patch(
+            'src.scheduler.ChannelScraper',
+            side_effect=lambda telegram_client, **kwargs: ChannelScraper(
+                telegram_client, state_store=ScrapeStateStore(state_db),
+                health_tracker=ChannelHealthTracker(state_db), message_store=MessageStore(state_db), **kwargs
+            )
+        )
+        self.channel_scraper_patcher.start()
+        
+        # Pages fetched by the scheduler's client are not archived under data/
+        self.archive_patcher = patch('src.telegram_client.PAGE_ARCHIVE_ENABLED', False)
+        self.archive_patcher.start()
+        
         # Sample data
         self.sample_messages = [
             {
@@ -157,6 +187,10 @@ class TestIntegration(unittest.IsolatedAsyncioTestCase):
         
         # Stop patchers
         self.proxy_storage_patcher.stop()
+        self.yield_tracker_patcher.stop()
+        self.channel_scraper_patcher.stop()
+        self.archive_patcher.stop()
+        self.temp_state_dir.cleanup()
 
     @patch('src.telegram_client.TelegramClient.start_session')
     @patch('src.telegram_client.TelegramClient.close_session')
@@ -319,5 +353,70 @@ class TestIntegration(unittest.IsolatedAsyncioTestCase):
         mock_close.assert_called_once()
 
 
+    @patch('src.telegram_client.TelegramClient.start_session')
+    @patch('src.telegram_client.TelegramClient.close_session')
+    async def test_cycle_without_new_posts_republishes_stored_proxies(self, mock_close, mock_start):
+        """A cycle whose channels have no new posts still re-validates and publishes the stored proxies"""
+        with patch('src.scheduler.OUTPUT_CHANNEL', 'test_channel'):
+            scheduler = ProxyScheduler()
+        scheduler.proxy_storage.save_proxies_to_database(self.extracted_proxies)
+        scheduler.proxy_storage.post_proxies_to_telegram = mock_post = AsyncMock(return_value=12345)
+        scheduler.pipeline.run = AsyncMock(return_value=CycleResult())
+        
+        async def validate_single_proxy(proxy):
+            return proxy.proxy_type != 'socks5'
+        
+        with patch.object(scheduler.proxy_validator, 'validate_single_proxy', side_effect=validate_single_proxy):
+            with patch.object(scheduler.proxy_validator, 'measure_proxy_ping', new_callable=AsyncMock):
+                await scheduler.run_single_cycle()
+        
+        published = {proxy.server for proxy in mock_post.call_args[0][0]}
+        self.assertEqual(published, {'proxy.example.com', 'proxy.example.org'})
+        with open(self.temp_json_file.name, 'r') as f:
+            self.assertEqual(json.load(f)['total_proxies'], 2)
+        # The proxy that stopped working leaves the working set
+        self.assertEqual({proxy.server for proxy in scheduler.proxy_storage.get_working_proxies()}, published)
+
+    @patch('src.telegram_client.TelegramClient.start_session')
+    @patch('src.telegram_client.TelegramClient.close_session')
+    async def test_stored_posts_keep_their_proxies_published(self, mock_close, mock_start):
+        """Posts skipped because they are already stored do not drop their proxies from the published list"""
+        proxy = self.extracted_proxies[0]
+        message = ScrapedMessage(id='5', date=datetime.now(timezone.utc), message='Fresh proxy', html='',
+                                 hrefs=(proxy.original_url,), chat=ScrapedChat(username='proxy_channel'),
+                                 forwarded_from='')
+        
+        scheduler = ProxyScheduler()
+        scheduler.channel_scraper.target_channels = ['https://t.me/proxy_channel']
+        scheduler.channel_scraper.message_store.save_messages([{
+            'id': '5', 'date': message.date, 'text': message.message, 'hrefs': list(message.hrefs),
+            'channel': 'proxy_channel', 'forwarded_from': ''
+        }])
+        scheduler.proxy_storage.save_proxies_to_database([proxy])
+        
+        with patch.object(scheduler.channel_scraper, 'scrape_single_channel', new=AsyncMock(return_value=[message])):
+            with patch.object(scheduler.proxy_validator, 'validate_single_proxy', new=AsyncMock(return_value=True)):
+                await scheduler.run_single_cycle()
+        
+        with open(self.temp_json_file.name, 'r') as f:
+            self.assertEqual([entry['server'] for entry in json.load(f)['proxies']], [proxy.server])
+
+    async def test_pushed_posts_credit_lineage_without_rescheduling(self):
+        """Posts pushed to the bot record where their proxies came from but do not count as a scrape"""
+        post = ScrapedMessage(id='8', date=datetime.now(timezone.utc), message='Fresh proxy', html='',
+                              hrefs=('https://t.me/proxy?server=1.1.1.1&port=443&secret=ee00',),
+                              chat=ScrapedChat(username='proxy_channel'),
+                              forwarded_from='')
+        scheduler = ProxyScheduler()
+        
+        with patch.object(scheduler.proxy_validator, 'validate_single_proxy', new=AsyncMock(return_value=True)):
+            result = await scheduler.ingest_channel_posts([post])
+        
+        self.assertEqual(len(result.working_proxies), 1)
+        proxy_key = scheduler.proxy_extractor.proxy_key(result.working_proxies[0])
+        self.assertEqual(scheduler.yield_tracker.get_lineage(proxy_key)['channel'], 'proxy_channel')
+        self.assertEqual(scheduler.yield_tracker.get_channel_stats(), [])
+        self.assertEqual(scheduler.yield_tracker.get_due_channels(['proxy_channel']), ['proxy_channel'])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
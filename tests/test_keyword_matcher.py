@@ -0,0 +1,48 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.keyword_matcher import KeywordMatcher, build_trie_pattern
+
+
+class TestKeywordMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = KeywordMatcher(['proxy', 'socks', 'socks5', 't.me/proxy', 'http', 'https', 'прокси'])
+
+    def test_match_is_case_insensitive(self):
+        self.assertEqual(self.matcher.match("New PROXY list"), 'proxy')
+        self.assertEqual(self.matcher.match("Рабочие Прокси"), 'прокси')
+
+    def test_longest_keyword_wins(self):
+        self.assertEqual(self.matcher.match("fresh socks5 servers"), 'socks5')
+        self.assertEqual(self.matcher.match("see https://example.com"), 'https')
+        self.assertEqual(self.matcher.match("visit t.me/proxy?server=1.1.1.1"), 't.me/proxy')
+
+    def test_leftmost_keyword_is_reported(self):
+        self.assertEqual(self.matcher.match("socks first, then proxy"), 'socks')
+
+    def test_no_match(self):
+        self.assertIsNone(self.matcher.match("nothing to see here"))
+        self.assertIsNone(self.matcher.match(""))
+        self.assertIsNone(self.matcher.match(None))
+        self.assertNotIn("nothing to see here", self.matcher)
+        self.assertIn("a proxy", self.matcher)
+
+    def test_special_characters_are_escaped(self):
+        matcher = KeywordMatcher(['ip:', 'tg://', 't.me/socks'])
+        self.assertEqual(matcher.match("tg://proxy?server=x"), 'tg://')
+        self.assertIsNone(matcher.match("tXme/socks"))
+
+    def test_empty_keyword_list(self):
+        matcher = KeywordMatcher([])
+        self.assertIsNone(matcher.match("proxy"))
+
+    def test_trie_pattern_shares_prefixes(self):
+        self.assertEqual(build_trie_pattern(['socks', 'socks5']), 'socks(?:5)?')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import tempfile
+import sqlite3
+import sys
+import os
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import src.message_store
+from src.message_store import MessageStore, HAS_FTS5
+
+
+def make_message(post_id, text, channel='channel1', hrefs=()):
+    return {
+        'id': str(post_id),
+        'date': datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc),
+        'text': text,
+        'hrefs': list(hrefs),
+        'channel': channel,
+        'forwarded_from': ''
+    }
+
+
+class TestMessageStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'proxies.db')
+        self.store = MessageStore(self.db_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_messages_are_stored_once(self):
+        messages = [make_message(1, 'fresh mtproto proxy', hrefs=['https://t.me/proxy?server=1.1.1.1']),
+                    make_message(2, 'socks5 list')]
+
+        self.assertEqual(self.store.save_messages(messages), 2)
+        self.assertEqual(self.store.save_messages(messages + [make_message(3, 'more')]), 1)
+
+        self.assertEqual(self.store.count(), 3)
+        self.assertEqual(self.store.get_stored_ids('channel1', ['1', '3', '4', 'abc']), {'1', '3'})
+        self.assertEqual(self.store.get_stored_ids('channel2', ['1']), set())
+
+    def test_iter_messages_round_trips(self):
+        message = make_message(7, 'proxy', hrefs=['https://t.me/proxy?server=1.1.1.1'])
+        self.store.save_messages([message, make_message(8, 'other', channel='channel2')])
+
+        self.assertEqual(list(self.store.iter_messages('channel1', batch_size=1)), [message])
+        self.assertEqual(len(list(self.store.iter_messages(batch_size=1))), 2)
+
+    @unittest.skipUnless(HAS_FTS5, "SQLite was built without FTS5")
+    def test_full_text_search(self):
+        self.store.save_messages([
+            make_message(1, 'Fresh MTProto proxies for today'),
+            make_message(2, 'socks5 servers'),
+            make_message(3, 'mtproto backup list', channel='channel2'),
+        ])
+
+        self.assertEqual({message['id'] for message in self.store.search('mtproto')}, {'1', '3'})
+        self.assertEqual([message['id'] for message in self.store.search('mtproto', channel='channel2')], ['3'])
+        self.assertEqual({message['id'] for message in self.store.search('socks5 OR today', raw=True)}, {'1', '2'})
+        self.assertEqual(self.store.search('socks5 OR today'), [])
+        self.assertEqual(self.store.search('vpn'), [])
+
+    @unittest.skipUnless(HAS_FTS5, "SQLite was built without FTS5")
+    def test_search_quotes_fts5_syntax(self):
+        self.store.save_messages([
+            make_message(1, 'New link https://t.me/proxy?server=1.1.1.1&port=443'),
+            make_message(2, 'Run your own mtproto-proxy "fast" setup'),
+        ])
+
+        self.assertEqual([message['id'] for message in self.store.search('t.me/proxy')], ['1'])
+        self.assertEqual([message['id'] for message in self.store.search('server=1')], ['1'])
+        self.assertEqual([message['id'] for message in self.store.search('mtproto-proxy')], ['2'])
+        self.assertEqual([message['id'] for message in self.store.search('"fast"')], ['2'])
+        with self.assertRaises(sqlite3.OperationalError):
+            self.store.search('t.me/proxy', raw=True)
+
+    def test_search_without_fts5(self):
+        with patch.object(src.message_store, 'HAS_FTS5', False):
+            store = MessageStore(os.path.join(self.temp_dir.name, 'plain.db'))
+            store.save_messages([make_message(1, 'Fresh MTProto proxies'), make_message(2, 'socks5 servers')])
+
+            self.assertEqual([message['id'] for message in store.search('mtproto')], ['1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import sys
+import os
+from dataclasses import FrozenInstanceError
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.models import ScrapedChat, ScrapedMessage
+
+
+class TestModels(unittest.TestCase):
+    
+    def setUp(self):
+        self.chat = ScrapedChat(username='test_channel')
+        self.message = ScrapedMessage(
+            id='42',
+            date=datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc),
+            message='proxy text',
+            html='<div>proxy text</div>',
+            hrefs=('https://t.me/proxy?server=1.1.1.1&port=443&secret=ee',),
+            chat=self.chat,
+            forwarded_from=''
+        )
+    
+    def test_message_is_frozen(self):
+        with self.assertRaises(FrozenInstanceError):
+            self.message.id = '43'
+    
+    def test_message_has_no_instance_dict(self):
+        self.assertFalse(hasattr(self.message, '__dict__'))
+        self.assertFalse(hasattr(self.chat, '__dict__'))
+    
+    def test_text_alias(self):
+        self.assertEqual(self.message.text, 'proxy text')
+    
+    def test_equality(self):
+        same = ScrapedMessage(
+            id='42', date=self.message.date, message='proxy text', html='<div>proxy text</div>',
+            hrefs=self.message.hrefs, chat=ScrapedChat(username='test_channel'), forwarded_from=''
+        )
+        self.assertEqual(self.message, same)
+        self.assertEqual(hash(self.message), hash(same))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import tempfile
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.page_archive import PageArchive, page_cursor, HAS_ZSTD
+
+
+class TestPageArchive(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive = PageArchive(self.temp_dir.name)
+        self.now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        self.body = b'<div class="tgme_widget_message" data-post="channel1/10"></div>' * 50
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_page_cursor(self):
+        self.assertIsNone(page_cursor('https://t.me/s/channel1'))
+        self.assertEqual(page_cursor('https://t.me/s/channel1?before=120'), 120)
+        self.assertIsNone(page_cursor('https://t.me/s/channel1?before=abc'))
+    
+    def test_store_and_load_roundtrip(self):
+        content_hash = self.archive.store('channel1', 'https://t.me/s/channel1?before=120', self.body, fetched_at=self.now)
+        
+        page = self.archive.find_page('channel1', cursor=120)
+        self.assertEqual(page['content_hash'], content_hash)
+        self.assertEqual(page['fetched_at'], self.now)
+        self.assertEqual(self.archive.load(content_hash), self.body)
+        self.assertIsNone(self.archive.find_page('channel1'))
+    
+    def test_identical_pages_are_stored_once(self):
+        self.archive.store('channel1', 'https://t.me/s/channel1', self.body, fetched_at=self.now)
+        self.archive.store('channel1', 'https://t.me/s/channel1', self.body, fetched_at=self.now + timedelta(hours=1))
+        self.archive.store('channel2', 'https://t.me/s/channel2', b'<html>other</html>', fetched_at=self.now)
+        
+        stats = self.archive.get_stats()
+        self.assertEqual(stats['pages'], 3)
+        self.assertEqual(stats['channels'], 2)
+        self.assertEqual(stats['unique_pages'], 2)
+        self.assertLess(stats['compressed_bytes'], stats['bytes'])
+        self.assertEqual(len(list(self.archive.iter_unique_bodies())), 2)
+    
+    def test_prune_drops_old_fetches_and_orphaned_blobs(self):
+        old_hash = self.archive.store('channel1', 'https://t.me/s/channel1', b'old', fetched_at=self.now)
+        shared_hash = self.archive.store('channel1', 'https://t.me/s/channel1?before=5', self.body, fetched_at=self.now)
+        self.archive.store('channel1', 'https://t.me/s/channel1?before=5', self.body,
+                           fetched_at=self.now + timedelta(days=2))
+        
+        self.assertEqual(self.archive.prune(self.now + timedelta(days=1)), 2)
+        
+        self.assertEqual(self.archive.get_stats()['pages'], 1)
+        self.assertEqual(self.archive.load(shared_hash), self.body)
+        with self.assertRaises(KeyError):
+            self.archive.load(old_hash)
+        self.assertFalse(self.archive._blob_file(old_hash, self.archive.codec).exists())
+    
+    def test_find_page_returns_latest_fetch(self):
+        self.archive.store('channel1', 'https://t.me/s/channel1', b'old', fetched_at=self.now)
+        self.archive.store('channel1', 'https://t.me/s/channel1', b'new', fetched_at=self.now + timedelta(hours=1))
+        
+        latest = self.archive.find_page('channel1')
+        self.assertEqual(self.archive.load(latest['content_hash']), b'new')
+        
+        earlier = self.archive.find_page('channel1', before=self.now + timedelta(minutes=30))
+        self.assertEqual(self.archive.load(earlier['content_hash']), b'old')
+    
+    def test_iter_pages_and_channels(self):
+        self.archive.store('channel2', 'https://t.me/s/channel2', b'b', fetched_at=self.now + timedelta(hours=1))
+        self.archive.store('channel1', 'https://t.me/s/channel1', b'a', fetched_at=self.now)
+        
+        self.assertEqual(self.archive.list_channels(), ['channel1', 'channel2'])
+        self.assertEqual([page['channel'] for page in self.archive.iter_pages()], ['channel1', 'channel2'])
+        self.assertEqual(len(list(self.archive.iter_pages('channel2'))), 1)
+    
+    def test_validation_outcomes_roundtrip(self):
+        self.assertIsNone(self.archive.latest_fetch_time())
+        self.archive.store('channel1', 'https://t.me/s/channel1', b'a', fetched_at=self.now)
+        self.archive.record_validations({'1.1.1.1:443': (True, 0.05), '2.2.2.2:443': (False, float('inf'))})
+        self.archive.record_validations({'1.1.1.1:443': (True, 0.08)})
+        
+        self.assertEqual(self.archive.load_validations(), {
+            '1.1.1.1:443': (True, 0.08),
+            '2.2.2.2:443': (False, float('inf')),
+        })
+        self.assertEqual(self.archive.latest_fetch_time(), self.now)
+    
+    def test_zlib_codec(self):
+        archive = PageArchive(os.path.join(self.temp_dir.name, 'zlib'), compression='zlib')
+        content_hash = archive.store('channel1', 'https://t.me/s/channel1', self.body)
+        
+        self.assertEqual(archive.codec, 'zlib')
+        self.assertEqual(archive.load(content_hash), self.body)
+    
+    @unittest.skipUnless(HAS_ZSTD, "zstandard is not installed")
+    def test_zstd_codec(self):
+        archive = PageArchive(os.path.join(self.temp_dir.name, 'zstd'), compression='zstd')
+        content_hash = archive.store('channel1', 'https://t.me/s/channel1', self.body)
+        
+        self.assertEqual(archive.load(content_hash), self.body)
+    
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            PageArchive(os.path.join(self.temp_dir.name, 'bad'), compression='lzma')
+
+
+if __name__ == '__main__':
+    unittest.main()
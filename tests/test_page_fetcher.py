@@ -0,0 +1,154 @@
+import unittest
+import asyncio
+import gzip
+import sys
+import os
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.page_fetcher import PageFetcher, PageResponse
+from src.exceptions import PageFetchError, FetchBudgetExceeded
+
+
+class TestPageFetcher(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def page(request):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.05)
+            self.in_flight -= 1
+            return web.Response(text=f"page {request.match_info['name']}")
+
+        async def compressed(request):
+            body = gzip.compress(b'<div class="tgme_widget_message"></div>')
+            return web.Response(body=body, headers={'Content-Encoding': 'gzip', 'Content-Type': 'text/html'})
+
+        async def large(request):
+            return web.Response(body=b'x' * 200000)
+
+        async def remote(request):
+            return web.Response(text=request.remote)
+
+        async def missing(request):
+            return web.Response(status=404, text='not found')
+
+        app = web.Application()
+        app.router.add_get('/s/{name}', page)
+        app.router.add_get('/gzip', compressed)
+        app.router.add_get('/missing', missing)
+        app.router.add_get('/large', large)
+        app.router.add_get('/remote', remote)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def test_fetch_returns_body(self):
+        fetcher = PageFetcher()
+        try:
+            response = await fetcher.fetch(f"{self.base_url}/s/channel1")
+        finally:
+            await fetcher.close()
+
+        self.assertIsInstance(response, PageResponse)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.text, 'page channel1')
+        self.assertEqual(fetcher.fetch_count, 1)
+
+    async def test_fetch_decodes_gzip(self):
+        fetcher = PageFetcher()
+        try:
+            response = await fetcher.fetch(f"{self.base_url}/gzip")
+        finally:
+            await fetcher.close()
+
+        self.assertIn(b'tgme_widget_message', response.body)
+
+    async def test_concurrency_per_host_is_bounded(self):
+        fetcher = PageFetcher(concurrency_per_host=2)
+        try:
+            responses = await asyncio.gather(
+                *(fetcher.fetch(f"{self.base_url}/s/channel{i}") for i in range(6))
+            )
+        finally:
+            await fetcher.close()
+
+        self.assertEqual(len(responses), 6)
+        self.assertLessEqual(self.max_in_flight, 2)
+        self.assertGreater(self.max_in_flight, 1)
+
+    async def test_fetch_budget(self):
+        fetcher = PageFetcher(budget=2)
+        try:
+            await fetcher.fetch(f"{self.base_url}/s/a")
+            await fetcher.fetch(f"{self.base_url}/s/b")
+            with self.assertRaises(FetchBudgetExceeded):
+                await fetcher.fetch(f"{self.base_url}/s/c")
+
+            fetcher.reset_budget()
+            self.assertEqual(fetcher.remaining_budget, 2)
+            await fetcher.fetch(f"{self.base_url}/s/c")
+        finally:
+            await fetcher.close()
+
+    async def test_fetch_streams_chunks(self):
+        fetcher = PageFetcher()
+        chunks = []
+        try:
+            response = await fetcher.fetch(f"{self.base_url}/large", on_chunk=chunks.append)
+        finally:
+            await fetcher.close()
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(response.body, b''.join(chunks))
+        self.assertEqual(len(response.body), 200000)
+
+    async def test_fetch_through_http_proxy(self):
+        fetcher = PageFetcher()
+        try:
+            # The host does not resolve, so only the proxy (the test server itself) can answer
+            response = await fetcher.fetch("http://proxied.invalid/s/channel1", proxy=self.base_url)
+        finally:
+            await fetcher.close()
+
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.text, "page channel1")
+
+    async def test_fetch_from_egress_address(self):
+        fetcher = PageFetcher()
+        try:
+            default = await fetcher.fetch(f"{self.base_url}/remote")
+            bound = await fetcher.fetch(f"{self.base_url}/remote", egress='127.0.0.2')
+        finally:
+            await fetcher.close()
+
+        self.assertEqual(default.text, '127.0.0.1')
+        self.assertEqual(bound.text, '127.0.0.2')
+        self.assertEqual(fetcher.egress_sessions, {})
+
+    async def test_raise_for_status(self):
+        fetcher = PageFetcher()
+        try:
+            response = await fetcher.fetch(f"{self.base_url}/missing")
+        finally:
+            await fetcher.close()
+
+        self.assertEqual(response.status, 404)
+        with self.assertRaises(PageFetchError) as context:
+            response.raise_for_status()
+        self.assertEqual(context.exception.status, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import asyncio
+import pickle
+import sys
+import os
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.parse_pool import ParsePool
+from src.html_parser import get_message_parser
+from src.telegram_client import TelegramClient
+from tests.test_html_parser import SAMPLE_PAGE
+
+
+class TestParsePool(unittest.TestCase):
+
+    def test_scraped_messages_survive_pickling(self):
+        messages = get_message_parser().parse_messages(SAMPLE_PAGE, 'test_channel')
+
+        self.assertEqual(pickle.loads(pickle.dumps(messages)), messages)
+
+    def test_pages_are_parsed_in_batches(self):
+        expected = get_message_parser().parse_messages(SAMPLE_PAGE, 'test_channel')
+        pool = ParsePool(workers=2, batch_size=3)
+
+        async def run_test():
+            return await asyncio.gather(*(
+                pool.parse_messages(SAMPLE_PAGE, 'test_channel', min_post_id) for min_post_id in (None,) * 4 + (101,)
+            ))
+
+        try:
+            results = asyncio.run(run_test())
+        finally:
+            pool.close()
+
+        self.assertEqual(results[:4], [expected] * 4)
+        self.assertEqual([message.id for message in results[4]], ['102'])
+        # Three pages filled a batch, the remaining two went out together
+        self.assertEqual(pool.stats, {'batches': 2, 'pages': 5})
+
+    def test_client_falls_back_to_in_process_parsing(self):
+        client = TelegramClient(offline=True)
+        client.parse_pool = ParsePool(workers=1)
+
+        async def run_test():
+            with patch.object(client.parse_pool, 'parse_messages', side_effect=BrokenProcessPool("worker died")):
+                return await client._parse_page(SAMPLE_PAGE, 'test_channel')
+
+        messages = asyncio.run(run_test())
+
+        self.assertEqual([message.id for message in messages], ['101', '102'])
+        self.assertIsNone(client.parse_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+import asyncio
+import tempfile
+import sys
+import os
+from unittest.mock import Mock
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.pipeline import ProxyPipeline
+from src.proxy_extractor import ProxyExtractor
+from src.proxy_validator import ProxyValidator
+from src.channel_stats import ChannelYieldTracker
+from src.repost_filter import RepostFilter
+
+
+def make_message(channel, post_id, servers, day=1):
+    return {
+        'id': str(post_id),
+        'date': datetime(2024, 5, day, tzinfo=timezone.utc),
+        'channel': channel,
+        'text': '',
+        'hrefs': [f'https://t.me/proxy?server={server}&port=443&secret=ee00' for server in servers],
+    }
+
+
+class FakeScraper:
+    """Delivers one batch of messages per channel, recording the order of events"""
+
+    def __init__(self, batches, events, error=None):
+        self.batches = batches
+        self.events = events
+        self.error = error
+
+    async def scrape_all_channels(self, channels, on_messages=None):
+        for channel in channels:
+            self.events.append(f'scraped {channel}')
+            await on_messages(self.batches[channel])
+            await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return [message for channel in channels for message in self.batches[channel]]
+
+
+class FakeValidator(ProxyValidator):
+
+    def __init__(self, events, working_servers):
+        super().__init__()
+        self.events = events
+        self.working_servers = working_servers
+
+    async def validate_single_proxy(self, proxy):
+        self.events.append(f'validated {proxy.server}')
+        return proxy.server in self.working_servers
+
+
+class TestProxyPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.yield_tracker = ChannelYieldTracker(os.path.join(self.temp_dir.name, 'state.db'))
+        self.storage = Mock()
+        self.events = []
+        self.batches = {
+            'channel1': [make_message('channel1', 1, ['1.1.1.1', '2.2.2.2'])],
+            'channel2': [make_message('channel2', 7, ['2.2.2.2', '3.3.3.3'])],
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _pipeline(self, scraper, store_batch_size=20, repost_filter=None):
+        validator = FakeValidator(self.events, {'1.1.1.1', '3.3.3.3'})
+        return ProxyPipeline(scraper, ProxyExtractor(), validator, self.storage, self.yield_tracker,
+                             queue_size=2, validation_workers=2, store_batch_size=store_batch_size,
+                             repost_filter=repost_filter)
+
+    def test_run_messages_skips_scraping(self):
+        pipeline = self._pipeline(None)
+
+        result = asyncio.run(pipeline.run_messages([self.batches['channel1'], [], self.batches['channel2']]))
+
+        self.assertEqual(result.messages, 2)
+        self.assertEqual(sorted(proxy.server for proxy in result.working_proxies), ['1.1.1.1', '3.3.3.3'])
+
+    def test_run_dedupes_validates_and_stores(self):
+        pipeline = self._pipeline(FakeScraper(self.batches, self.events), store_batch_size=1)
+
+        result = asyncio.run(pipeline.run(['channel1', 'channel2']))
+
+        self.assertEqual(result.messages, 2)
+        self.assertEqual(result.extracted, 4)
+        self.assertEqual([proxy.server for proxy in result.unique_proxies], ['1.1.1.1', '2.2.2.2', '3.3.3.3'])
+        self.assertEqual(sorted(proxy.server for proxy in result.working_proxies), ['1.1.1.1', '3.3.3.3'])
+        self.assertEqual(self.storage.save_proxies_to_database.call_count, 2)
+        self.assertEqual(self.yield_tracker.pending_working, {
+            'mtproto:1.1.1.1:443:ee00', 'mtproto:3.3.3.3:443:ee00'
+        })
+        self.assertEqual(self.yield_tracker.pending_sources['mtproto:2.2.2.2:443:ee00'][0], 'channel1')
+
+    def test_reposts_skip_extraction_but_keep_lineage(self):
+        # channel2 reposts channel1's message; the repost is scraped first but was posted later
+        self.batches = {
+            'channel2': [make_message('channel2', 9, ['1.1.1.1'], day=3)],
+            'channel1': [make_message('channel1', 4, ['1.1.1.1'], day=2)],
+        }
+        repost_filter = RepostFilter()
+        repost_filter.begin_cycle()
+        pipeline = self._pipeline(FakeScraper(self.batches, self.events), repost_filter=repost_filter)
+
+        result = asyncio.run(pipeline.run(['channel2', 'channel1']))
+
+        self.assertEqual((result.messages, result.reposts, result.extracted), (2, 1, 1))
+        self.assertEqual(self.yield_tracker.pending_sources['mtproto:1.1.1.1:443:ee00'][:2], ('channel1', '4'))
+        self.assertEqual(repost_filter.get_duplicate_ratios(), {'channel2': 0.0, 'channel1': 1.0})
+
+    def test_validation_overlaps_scraping(self):
+        pipeline = self._pipeline(FakeScraper(self.batches, self.events))
+
+        asyncio.run(pipeline.run(['channel1', 'channel2']))
+
+        # The first channel's proxies are validated before the second channel is scraped
+        self.assertLess(self.events.index('validated 1.1.1.1'), self.events.index('scraped channel2'))
+
+    def test_stage_failure_aborts_the_run(self):
+        pipeline = self._pipeline(FakeScraper(self.batches, self.events, error=RuntimeError("boom")))
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(pipeline.run(['channel1', 'channel2']))
+
+    def test_downstream_failure_with_full_queues_aborts_the_run(self):
+        channel_messages = [[make_message(f'channel{i}', i, ['1.1.1.1'])] for i in range(5)]
+        extractor = Mock(spec=ProxyExtractor)
+        extractor.extract_all_proxies.side_effect = RuntimeError("boom")
+        # The feed stage fills the one-slot queue while the extract stage fails
+        pipeline = ProxyPipeline(None, extractor, Mock(), self.storage, self.yield_tracker, queue_size=1)
+
+        async def run_test():
+            await asyncio.wait_for(pipeline.run_messages(channel_messages), timeout=5)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(run_test())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.proxy_router import ProxyRouter
+
+
+class TestProxyRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+
+    def make_router(self, proxies, **kwargs):
+        return ProxyRouter(proxies, cooldown=60, max_cooldown=300, clock=lambda: self.now, **kwargs)
+
+    def test_routes_come_from_configured_proxies(self):
+        proxies = ['socks5://1.1.1.1:1080', 'http://2.2.2.2:8080', 'http://2.2.2.2:8080']
+
+        with patch('src.proxy_router.HAS_AIOHTTP_SOCKS', True):
+            router = ProxyRouter(proxies, include_direct=False)
+        self.assertEqual(list(router.routes), ['socks5://1.1.1.1:1080', 'http://2.2.2.2:8080'])
+
+        with patch('src.proxy_router.HAS_AIOHTTP_SOCKS', False):
+            router = ProxyRouter(proxies)
+        self.assertEqual(list(router.routes), [None, 'http://2.2.2.2:8080'])
+
+        # Without any proxy the direct connection stays the only route
+        self.assertEqual(list(ProxyRouter([], include_direct=False).routes), [None])
+
+    def test_failing_route_cools_down_with_backoff(self):
+        router = self.make_router(['http://10.0.0.1:3128'], rotation=1)
+        direct, proxy = router.routes.values()
+
+        router.record_failure(direct)
+        self.assertEqual(router.ranked_routes(), [proxy, direct])
+
+        router.record_failure(direct)
+        self.now += 100
+        # The second failure doubled the rest to 120 seconds
+        self.assertEqual(router.ranked_routes()[-1], direct)
+        self.now += 30
+        router.record_success(direct, 0.2)
+        self.assertEqual(direct.consecutive_failures, 0)
+        self.assertEqual(router.ranked_routes()[0], proxy)
+
+    def test_requests_rotate_over_the_best_routes(self):
+        router = self.make_router(['http://10.0.0.1:3128', 'http://10.0.0.2:3128'], rotation=2)
+        direct, first, second = router.routes.values()
+        router.record_success(first, 0.1)
+        router.record_success(second, 0.3)
+
+        picks = [router.ranked_routes()[0] for _ in range(4)]
+
+        self.assertEqual(picks, [first, second, first, second])
+        self.assertNotIn(direct, picks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import asyncio
+import sys
+import os
+from unittest.mock import patch
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.rate_limiter import TokenBucket, HostRateLimiter, parse_retry_after
+
+
+class FakeClock:
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter(unittest.TestCase):
+    
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = HostRateLimiter(initial_rate=2, max_rate=3, min_rate=0.5, burst=2,
+                                       increase_step=0.5, default_retry_after=5,
+                                       max_retry_after=60, clock=self.clock)
+    
+    def test_parse_retry_after(self):
+        now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+        self.assertEqual(parse_retry_after('30'), 30.0)
+        self.assertEqual(parse_retry_after('Wed, 01 May 2024 12:00:45 GMT', now=now), 45.0)
+        self.assertEqual(parse_retry_after('Wed, 01 May 2024 11:00:00 GMT', now=now), 0.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+    
+    def test_token_bucket_delay(self):
+        bucket = TokenBucket(rate=2, capacity=2, clock=self.clock)
+        bucket.tokens -= 2
+        self.assertAlmostEqual(bucket.delay(), 0.5)
+        
+        self.clock.now += 0.5
+        self.assertEqual(bucket.delay(), 0.0)
+        
+        bucket.pause(10)
+        self.assertAlmostEqual(bucket.delay(), 10.0)
+    
+    def test_success_raises_rate_up_to_max(self):
+        url = 'https://t.me/s/channel1'
+        for _ in range(5):
+            self.assertIsNone(self.limiter.record_response(url, 200))
+        self.assertEqual(self.limiter.get_rate(url), 3)
+    
+    def test_429_halves_rate_and_honors_retry_after(self):
+        url = 'https://t.me/s/channel1'
+        backoff = self.limiter.record_response(url, 429, {'Retry-After': '20'})
+        
+        self.assertEqual(backoff, 20)
+        self.assertEqual(self.limiter.get_rate(url), 1)
+        self.assertAlmostEqual(self.limiter.bucket(url).delay(), 20)
+        # The pause is shared by every channel on the host, but not by other hosts
+        self.assertAlmostEqual(self.limiter.bucket('https://t.me/s/channel2').delay(), 20)
+        self.assertEqual(self.limiter.bucket('https://telegram.me/s/channel1').delay(), 0)
+    
+    def test_429_without_retry_after_backs_off_exponentially(self):
+        url = 'https://t.me/s/channel1'
+        self.assertEqual(self.limiter.record_response(url, 429), 5)
+        self.assertEqual(self.limiter.record_response(url, 429), 10)
+        self.assertEqual(self.limiter.get_rate(url), 0.5)
+        self.assertEqual(self.limiter.record_response(url, 429, {'Retry-After': '600'}), 60)
+        
+        self.limiter.record_response(url, 200)
+        self.assertEqual(self.limiter.record_response(url, 429), 5)
+    
+    def test_acquire_waits_for_tokens(self):
+        sleeps = []
+        
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            self.clock.now += seconds
+        
+        async def run_test():
+            with patch('src.rate_limiter.asyncio.sleep', side_effect=fake_sleep):
+                for _ in range(3):
+                    await self.limiter.acquire('https://t.me/s/channel1')
+        
+        asyncio.run(run_test())
+        # Two requests fit in the burst, the third waits for a token at 2 requests/s
+        self.assertEqual(len(sleeps), 1)
+        self.assertAlmostEqual(sleeps[0], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import tempfile
+import sys
+import os
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.message_store import MessageStore
+from src.proxy_storage import ProxyStorage
+from src.proxy_extractor import ProxyData
+from src.reextract import Reextractor
+
+SECRET = 'ee' + '0' * 32
+
+
+def make_message(post_id, server):
+    return {
+        'id': str(post_id),
+        'date': datetime(2024, 5, 1, tzinfo=timezone.utc),
+        'text': 'fresh proxy',
+        'hrefs': [f'https://t.me/proxy?server={server}&port=443&secret={SECRET}'],
+        'channel': 'channel1',
+        'forwarded_from': ''
+    }
+
+
+class TestReextractor(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.temp_dir.name, 'proxies.db')
+        self.message_store = MessageStore(db_path)
+        self.proxy_storage = ProxyStorage(db_path=db_path, storage_path=os.path.join(self.temp_dir.name, 'proxies.json'))
+
+        self.message_store.save_messages([make_message(post_id, f'10.0.0.{post_id % 3}') for post_id in range(1, 8)])
+        self.proxy_storage.save_proxies_to_database([ProxyData('mtproto', '10.0.0.1', '443', secret=SECRET)])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assert_new_proxies_stored(self, result):
+        self.assertEqual(result.messages, 7)
+        self.assertEqual(sorted(proxy.server for proxy in result.new_proxies), ['10.0.0.0', '10.0.0.2'])
+        # New proxies wait for validation; the known one keeps its status
+        working = self.proxy_storage.load_proxies_from_database(working_only=True)
+        self.assertEqual([proxy.server for proxy in working], ['10.0.0.1'])
+        self.assertEqual(len(self.proxy_storage.load_proxies_from_database(working_only=False)), 3)
+
+    def test_reextraction_in_process(self):
+        result = Reextractor(self.message_store, self.proxy_storage, workers=0, chunk_size=3).run()
+
+        self.assert_new_proxies_stored(result)
+        self.assertEqual(result.extracted, 7)
+
+    def test_reextraction_in_worker_pool(self):
+        result = Reextractor(self.message_store, self.proxy_storage, workers=1, chunk_size=2).run()
+
+        self.assert_new_proxies_stored(result)
+        self.assertGreater(result.messages_per_second, 0)
+
+    def test_second_run_finds_nothing_new(self):
+        Reextractor(self.message_store, self.proxy_storage, workers=0).run()
+
+        result = Reextractor(self.message_store, self.proxy_storage, workers=0).run()
+
+        self.assertEqual(result.new_proxies, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import asyncio
+import tempfile
+import json
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.page_archive import PageArchive
+from src.proxy_extractor import ProxyData
+from src.replay import ArchiveFetcher, RecordedValidator, build_replay_scheduler
+
+
+class TestReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.archive_path = os.path.join(self.temp_dir.name, 'archive')
+        self.work_dir = os.path.join(self.temp_dir.name, 'work')
+        self.archive = PageArchive(self.archive_path)
+        self.now = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _make_page(self, channel, post_ids, server_prefix='10.0.0'):
+        containers = ''.join(
+            f'''<div class="tgme_widget_message" data-post="{channel}/{post_id}">
+                <div class="tgme_widget_message_text"><a href="https://t.me/proxy?server={server_prefix}.{post_id}&amp;port=443&amp;secret=ee00{post_id}">Proxy</a></div>
+                <a class="tgme_widget_message_date"><time datetime="{(self.now - timedelta(hours=post_id)).isoformat()}"></time></a>
+            </div>'''
+            for post_id in post_ids
+        )
+        return f'<html><body>{containers}</body></html>'.encode('utf-8')
+
+    def test_archive_fetcher_serves_pages(self):
+        self.archive.store('channel1', 'https://t.me/s/channel1', b'old', fetched_at=self.now - timedelta(hours=2))
+        self.archive.store('channel1', 'https://t.me/s/channel1', b'new', fetched_at=self.now)
+
+        async def run_test():
+            fetcher = ArchiveFetcher(self.archive, reference_time=self.now - timedelta(hours=1))
+            first = await fetcher.fetch('https://t.me/s/channel1')
+            missing_cursor = await fetcher.fetch('https://t.me/s/channel1?before=5')
+            missing_channel = await fetcher.fetch('https://t.me/s/channel2')
+
+            self.assertEqual((first.status, first.body), (200, b'old'))
+            self.assertEqual((missing_cursor.status, missing_cursor.body), (200, b''))
+            self.assertEqual(missing_channel.status, 404)
+            self.assertEqual(fetcher.fetch_count, 3)
+
+        asyncio.run(run_test())
+
+    def test_recorded_validator(self):
+        validator = RecordedValidator({'1.1.1.1:443': (True, 0.05), '2.2.2.2:443': (False, float('inf'))})
+        proxies = [
+            ProxyData(proxy_type='mtproto', server=server, port='443', secret='ee00')
+            for server in ('2.2.2.2', '1.1.1.1', '3.3.3.3')
+        ]
+
+        working = asyncio.run(validator.validate_all_proxies(proxies))
+
+        self.assertEqual([proxy.server for proxy in working], ['1.1.1.1'])
+        self.assertEqual(validator.get_proxy_ping(working[0]), 0.05)
+        self.assertEqual(validator.unknown_count, 1)
+
+    def test_replay_cycle_from_archive(self):
+        self.archive.store('channel1', 'https://t.me/s/channel1', self._make_page('channel1', [21, 22]), fetched_at=self.now)
+        self.archive.store('channel1', 'https://t.me/s/channel1?before=21', self._make_page('channel1', [20]), fetched_at=self.now)
+        self.archive.store('channel2', 'https://t.me/s/channel2', self._make_page('channel2', [5], '10.0.1'), fetched_at=self.now)
+        self.archive.record_validations({
+            '10.0.0.22:443': (True, 0.02),
+            '10.0.0.20:443': (True, 0.01),
+            '10.0.0.21:443': (False, float('inf')),
+        })
+
+        scheduler = build_replay_scheduler(self.archive_path, self.work_dir)
+        asyncio.run(scheduler.run_hourly_cycle())
+
+        # channel1: first page, ?before=21 and the missing ?before=20; channel2: first page and ?before=5
+        self.assertEqual(scheduler.telegram_client.fetcher.fetch_count, 5)
+        with open(os.path.join(self.work_dir, 'proxies.json'), encoding='utf-8') as f:
+            saved = json.load(f)
+        self.assertEqual([proxy['server'] for proxy in saved['proxies']], ['10.0.0.20', '10.0.0.22'])
+        # Replays never write into the archive they read
+        self.assertEqual(self.archive.get_stats()['pages'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
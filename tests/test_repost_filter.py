@@ -0,0 +1,67 @@
+import unittest
+import tempfile
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.repost_filter import RepostFilter, message_fingerprint
+
+
+def make_message(channel, text, hrefs):
+    return {'channel': channel, 'text': text, 'hrefs': hrefs}
+
+
+class TestRepostFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'proxies.db')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_fingerprint_normalizes_text_and_link_order(self):
+        original = make_message('a', 'New  Proxy\nlist', ['https://t.me/proxy?server=1', 'https://t.me/proxy?server=2'])
+        repost = make_message('b', 'new proxy list ', ['https://t.me/proxy?server=2', 'https://t.me/proxy?server=1'])
+        edited = make_message('c', 'new proxy list', ['https://t.me/proxy?server=3'])
+
+        self.assertEqual(message_fingerprint(original), message_fingerprint(repost))
+        self.assertNotEqual(message_fingerprint(original), message_fingerprint(edited))
+
+    def test_reposts_within_a_cycle(self):
+        repost_filter = RepostFilter()
+        repost_filter.begin_cycle()
+
+        fingerprint, known = repost_filter.check(make_message('a', 'list', ['x']))
+        self.assertIsNone(known)
+        repost_filter.add(fingerprint, 'a', ['mtproto:1.1.1.1:443:ee'])
+
+        self.assertEqual(repost_filter.check(make_message('b', 'list', ['x']))[1], ('mtproto:1.1.1.1:443:ee',))
+        repost_filter.check(make_message('b', 'other', ['y']))
+        self.assertEqual(repost_filter.get_duplicate_ratios(), {'a': 0.0, 'b': 0.5})
+
+        # Without persistence a new cycle starts from scratch
+        repost_filter.commit()
+        repost_filter.begin_cycle()
+        self.assertIsNone(repost_filter.check(make_message('b', 'list', ['x']))[1])
+
+    def test_persisted_fingerprints_expire(self):
+        now = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        repost_filter = RepostFilter(self.db_path, ttl_hours=24)
+        repost_filter.begin_cycle(now)
+        fingerprint, _ = repost_filter.check(make_message('a', 'list', ['x']))
+        repost_filter.add(fingerprint, 'a', ['mtproto:1.1.1.1:443:ee'])
+        repost_filter.commit(now)
+
+        reloaded = RepostFilter(self.db_path, ttl_hours=24)
+        reloaded.begin_cycle(now + timedelta(hours=1))
+        self.assertEqual(reloaded.check(make_message('b', 'list', ['x']))[1], ())
+
+        reloaded.begin_cycle(now + timedelta(hours=25))
+        self.assertIsNone(reloaded.check(make_message('b', 'list', ['x']))[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
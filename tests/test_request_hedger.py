@@ -0,0 +1,195 @@
+import unittest
+import asyncio
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.request_hedger import RequestHedger
+from src.page_fetcher import PageResponse
+
+
+def answer(url, status=200):
+    return PageResponse(url=url, status=status, body=b'')
+
+
+class TestRequestHedger(unittest.TestCase):
+
+    def make_hedger(self, **kwargs):
+        return RequestHedger(mirrors=['t.me', 'telegram.me'], initial_delay=0.05, min_delay=0.01, **kwargs)
+
+    def test_mirror_url(self):
+        hedger = self.make_hedger()
+
+        self.assertEqual(hedger.mirror_url('https://t.me/s/channel?before=10'), 'https://telegram.me/s/channel?before=10')
+        self.assertEqual(hedger.mirror_url('https://telegram.me/s/channel'), 'https://t.me/s/channel')
+        self.assertIsNone(hedger.mirror_url('https://example.com/s/channel'))
+
+    def test_hedge_delay_follows_latency_percentile(self):
+        hedger = self.make_hedger(percentile=90, min_samples=10)
+        self.assertEqual(hedger.hedge_delay(), 0.05)
+
+        for latency in range(1, 11):
+            hedger.record_latency(latency / 10)
+
+        self.assertAlmostEqual(hedger.hedge_delay(), 0.9)
+
+    def test_fast_request_is_not_hedged(self):
+        hedger = self.make_hedger()
+        requested = []
+
+        async def fetch_from(url, claim):
+            requested.append(url)
+            return answer(url)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual(result.url, 'https://t.me/s/channel')
+        self.assertEqual(requested, ['https://t.me/s/channel'])
+        self.assertEqual(hedger.stats['hedged'], 0)
+        self.assertEqual(len(hedger.latencies), 1)
+
+    def test_slow_request_loses_to_the_mirror(self):
+        hedger = self.make_hedger()
+        cancelled = []
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                return answer(url)
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual(result.url, 'https://telegram.me/s/channel')
+        self.assertEqual(cancelled, ['https://t.me/s/channel'])
+        self.assertEqual(hedger.stats, {'hedged': 1, 'mirror_wins': 1})
+
+    def test_failed_request_waits_for_the_other(self):
+        hedger = self.make_hedger()
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                raise ConnectionError("mirror down")
+            await asyncio.sleep(0.1)
+            return answer(url)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual(result.url, 'https://t.me/s/channel')
+        self.assertEqual(hedger.stats, {'hedged': 1, 'mirror_wins': 0})
+
+    def test_first_streamed_chunk_claims_the_page(self):
+        hedger = self.make_hedger()
+        fed = []
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                # The mirror starts streaming first and keeps the page
+                if claim():
+                    fed.append(url)
+                await asyncio.sleep(0.05)
+                return answer(url)
+            await asyncio.sleep(0.08)
+            if claim():
+                fed.append(url)
+            return answer(url)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual(result.url, 'https://telegram.me/s/channel')
+        self.assertEqual(fed, ['https://telegram.me/s/channel'])
+
+    def test_streaming_request_is_not_hedged(self):
+        hedger = self.make_hedger()
+        requested = []
+
+        async def fetch_from(url, claim):
+            requested.append(url)
+            if 'telegram.me' in url:
+                return answer(url)
+            # Streaming starts right away, but the rest of the page is slow
+            claim()
+            await asyncio.sleep(0.1)
+            return answer(url)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual(result.url, 'https://t.me/s/channel')
+        self.assertEqual(requested, ['https://t.me/s/channel'])
+        self.assertEqual(hedger.stats, {'hedged': 0, 'mirror_wins': 0})
+
+    def test_claim_after_the_hedge_keeps_the_owner(self):
+        hedger = self.make_hedger()
+        cancelled = []
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                try:
+                    await asyncio.sleep(0.03)
+                except asyncio.CancelledError:
+                    cancelled.append(url)
+                    raise
+                return answer(url)
+            # The original starts streaming after the hedge was sent and finishes after the mirror would have
+            await asyncio.sleep(0.07)
+            claim()
+            await asyncio.sleep(0.05)
+            return answer(url)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual(result.url, 'https://t.me/s/channel')
+        self.assertEqual(cancelled, ['https://telegram.me/s/channel'])
+        self.assertEqual(hedger.stats, {'hedged': 1, 'mirror_wins': 0})
+
+    def test_error_response_does_not_win(self):
+        hedger = self.make_hedger()
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                return answer(url, status=429)
+            await asyncio.sleep(0.1)
+            return answer(url)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual((result.url, result.status), ('https://t.me/s/channel', 200))
+        self.assertEqual(hedger.stats, {'hedged': 1, 'mirror_wins': 0})
+
+    def test_error_responses_on_both_fronts_return_the_original(self):
+        hedger = self.make_hedger()
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                return answer(url, status=503)
+            await asyncio.sleep(0.1)
+            return answer(url, status=429)
+
+        result = asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        self.assertEqual((result.url, result.status), ('https://t.me/s/channel', 429))
+
+    def test_latencies_of_losers_are_recorded(self):
+        now = [0.0]
+        hedger = self.make_hedger(clock=lambda: now[0])
+
+        async def fetch_from(url, claim):
+            if 'telegram.me' in url:
+                now[0] += 0.5
+                return answer(url)
+            # The original is still running when the mirror answers
+            await asyncio.sleep(0.1)
+            now[0] += 10
+            return answer(url)
+
+        asyncio.run(hedger.fetch('https://t.me/s/channel', fetch_from))
+
+        # The mirror's latency and the time the cancelled original ran
+        self.assertEqual(sorted(hedger.latencies), [0.5, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import tempfile
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, 'cache.json')
+        self.cache = ResponseCache(self.cache_path)
+        self.url = 'https://t.me/s/test_channel'
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_empty_cache(self):
+        self.assertEqual(self.cache.conditional_headers(self.url), {})
+        self.assertFalse(self.cache.is_unchanged(self.url, 'hash'))
+    
+    def test_hash_message_list(self):
+        self.assertEqual(
+            ResponseCache.hash_message_list([1, 2, 3]),
+            ResponseCache.hash_message_list([1, 2, 3])
+        )
+        self.assertNotEqual(
+            ResponseCache.hash_message_list([1, 2, 3]),
+            ResponseCache.hash_message_list([1, 2, 4])
+        )
+    
+    def test_staged_entries_apply_after_commit(self):
+        headers = {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+        self.cache.stage(self.url, headers, 'hash1')
+        
+        self.assertFalse(self.cache.is_unchanged(self.url, 'hash1'))
+        self.cache.commit()
+        
+        self.assertTrue(self.cache.is_unchanged(self.url, 'hash1'))
+        self.assertEqual(self.cache.conditional_headers(self.url), {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+        })
+    
+    def test_commit_persists_to_disk(self):
+        self.cache.stage(self.url, {}, 'hash1')
+        self.cache.commit()
+        
+        reloaded = ResponseCache(self.cache_path)
+        self.assertTrue(reloaded.is_unchanged(self.url, 'hash1'))
+    
+    def test_discard(self):
+        self.cache.stage(self.url, {}, 'hash1')
+        self.cache.discard()
+        self.cache.commit()
+        
+        self.assertIsNone(self.cache.get(self.url))
+        self.assertFalse(os.path.exists(self.cache_path))
+    
+    def test_unreadable_cache_file_is_ignored(self):
+        with open(self.cache_path, 'w') as f:
+            f.write('not json')
+        
+        cache = ResponseCache(self.cache_path)
+        self.assertEqual(cache.entries, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
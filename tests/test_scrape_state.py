@@ -0,0 +1,44 @@
+import unittest
+import tempfile
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.scrape_state import ScrapeStateStore
+
+
+class TestScrapeStateStore(unittest.TestCase):
+    
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ScrapeStateStore(os.path.join(self.temp_dir.name, 'test.db'))
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_missing_watermark(self):
+        self.assertIsNone(self.store.get_watermark('unknown_channel'))
+    
+    def test_save_and_load_watermarks(self):
+        self.store.save_watermarks({'channel1': 100, 'channel2': 250})
+        
+        self.assertEqual(self.store.get_watermark('channel1'), 100)
+        self.assertEqual(self.store.get_all_watermarks(), {'channel1': 100, 'channel2': 250})
+    
+    def test_watermark_never_moves_backwards(self):
+        self.store.save_watermarks({'channel1': 100})
+        self.store.save_watermarks({'channel1': 90})
+        self.assertEqual(self.store.get_watermark('channel1'), 100)
+        
+        self.store.save_watermarks({'channel1': 110})
+        self.assertEqual(self.store.get_watermark('channel1'), 110)
+    
+    def test_clear_watermarks(self):
+        self.store.save_watermarks({'channel1': 100})
+        self.store.clear_watermarks()
+        self.assertEqual(self.store.get_all_watermarks(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,20 +3,34 @@ import asyncio
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 import sys
 import os
-import requests
+import tempfile
+from datetime import datetime, timedelta, timezone
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from src.telegram_client import TelegramClient
+from src.page_fetcher import PageResponse
+from src.response_cache import ResponseCache
+from src.page_archive import PageArchive
+from src.rate_limiter import HostRateLimiter
+from src.proxy_router import ProxyRouter
+from src.request_hedger import RequestHedger
+from src.html_parser import HAS_LXML
+from src.models import ScrapedChat, ScrapedMessage
+from src.exceptions import PageFetchError, ChannelUnavailableError, RateLimitedError
 
 
 class TestTelegramClient(unittest.TestCase):
     
     def setUp(self):
+        # Pages fetched by the tests are not archived under data/
+        self.archive_patcher = patch('src.telegram_client.PAGE_ARCHIVE_ENABLED', False)
+        self.archive_patcher.start()
         self.client = TelegramClient()
     
     def tearDown(self):
         self.client = None
+        self.archive_patcher.stop()
     
     @patch('src.telegram_client.Bot')
     def test_init_with_bot_token(self, mock_bot):
@@ -68,30 +82,398 @@ class TestTelegramClient(unittest.TestCase):
         
         asyncio.run(run_test())
     
-    @patch('requests.Session.get')
-    def test_get_channel_messages(self, mock_get):
+    def test_get_channel_messages(self):
         # Create a mock response with HTML content
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.text = '''
+        body = '''
         <div class="tgme_widget_message" data-post="channel/123">
             <div class="tgme_widget_message_text">Test message</div>
             <span class="tgme_widget_message_date"><time datetime="2023-01-01T12:00:00+00:00"></time></span>
         </div>
-        '''
-        mock_get.return_value = mock_response
+        '''.encode('utf-8')
+        mock_response = PageResponse(url='https://t.me/s/test_channel', status=200, body=body)
         
         client = TelegramClient()
         client.is_connected = True
+        client.fetcher.fetch = AsyncMock(return_value=mock_response)
         
         async def run_test():
             messages = await client.get_channel_messages('test_channel')
             self.assertEqual(len(messages), 1)
-            self.assertEqual(messages[0]['text'], 'Test message')
-            mock_get.assert_called_once_with('https://t.me/s/test_channel')
+            self.assertEqual(messages[0].message, 'Test message')
+            client.fetcher.fetch.assert_called_once()
+            self.assertEqual(client.fetcher.fetch.call_args.args, ('https://t.me/s/test_channel',))
+        
+        asyncio.run(run_test())
+    
+    def test_get_channel_messages_http_error(self):
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(
+            return_value=PageResponse(url='https://t.me/s/test_channel', status=500, body=b'')
+        )
+        
+        async def run_test():
+            with self.assertRaises(PageFetchError) as context:
+                await client.get_channel_messages('test_channel')
+            self.assertEqual(context.exception.status, 500)
+        
+        asyncio.run(run_test())
+    
+    def test_get_channel_messages_unavailable_channel(self):
+        client = TelegramClient()
+        client.is_connected = True
+        # t.me serves the plain channel card instead of /s/ when there is no public history
+        client.fetcher.fetch = AsyncMock(return_value=PageResponse(
+            url='https://t.me/s/private_channel', status=200, body=b'<html></html>',
+            final_url='https://t.me/private_channel'
+        ))
+        
+        async def run_test():
+            with self.assertRaises(ChannelUnavailableError):
+                await client.get_channel_messages('private_channel')
+        
+        asyncio.run(run_test())
+    
+    @staticmethod
+    def _make_page(post_ids, date):
+        containers = ''.join(
+            f'''<div class="tgme_widget_message" data-post="test_channel/{post_id}">
+                <div class="tgme_widget_message_text">Post {post_id}</div>
+                <a class="tgme_widget_message_date"><time datetime="{date.isoformat()}"></time></a>
+            </div>'''
+            for post_id in post_ids
+        )
+        return f'<html><body>{containers}</body></html>'.encode('utf-8')
+    
+    def test_get_channel_messages_follows_before_cursor(self):
+        now = datetime.now(timezone.utc)
+        pages = {
+            'https://t.me/s/test_channel': self._make_page([298, 299, 300], now - timedelta(days=1)),
+            'https://t.me/s/test_channel?before=298': self._make_page([295, 296, 297], now - timedelta(days=5)),
+            'https://t.me/s/test_channel?before=295': self._make_page([292, 293, 294], now - timedelta(days=40)),
+        }
+        
+        async def fake_fetch(url, **options):
+            return PageResponse(url=url, status=200, body=pages[url])
+        
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        
+        async def run_test():
+            messages = await client.get_channel_messages(
+                'test_channel', since=now - timedelta(days=30)
+            )
+            # Crawling stops at the first page that crosses the cutoff
+            self.assertEqual(client.fetcher.fetch.call_count, 3)
+            self.assertEqual(len(messages), 9)
+            self.assertEqual(client.crawl_stats['test_channel']['pages'], 3)
+            self.assertEqual(
+                client.crawl_stats['test_channel']['bytes'],
+                sum(len(body) for body in pages.values())
+            )
+        
+        asyncio.run(run_test())
+    
+    def test_get_channel_messages_archives_pages(self):
+        now = datetime.now(timezone.utc)
+        pages = {
+            'https://t.me/s/test_channel': self._make_page([298, 299, 300], now - timedelta(days=1)),
+            'https://t.me/s/test_channel?before=298': self._make_page([295, 296, 297], now - timedelta(days=40)),
+        }
+        
+        async def fake_fetch(url, **options):
+            return PageResponse(url=url, status=200, body=pages[url])
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client = TelegramClient()
+            client.is_connected = True
+            client.page_archive = PageArchive(temp_dir)
+            client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+            
+            asyncio.run(client.get_channel_messages('test_channel', since=now - timedelta(days=30)))
+            
+            first_page = client.page_archive.find_page('test_channel')
+            second_page = client.page_archive.find_page('test_channel', cursor=298)
+            self.assertEqual(client.page_archive.load(first_page['content_hash']), pages['https://t.me/s/test_channel'])
+            self.assertEqual(second_page['url'], 'https://t.me/s/test_channel?before=298')
+    
+    def _client_with_fake_clock(self):
+        """Client whose rate limiter runs on a fake clock advanced by the (patched) sleeps"""
+        clock = {'now': 0.0}
+        sleeps = []
+        
+        async def fake_sleep(seconds):
+            sleeps.append(seconds)
+            clock['now'] += seconds
+        
+        client = TelegramClient()
+        client.rate_limiter = HostRateLimiter(clock=lambda: clock['now'])
+        return client, fake_sleep, sleeps
+    
+    def test_fetch_page_retries_after_429(self):
+        responses = [
+            PageResponse(url='https://t.me/s/test_channel', status=429, body=b'', headers={'Retry-After': '7'}),
+            PageResponse(url='https://t.me/s/test_channel', status=200, body=b'ok'),
+        ]
+        client, fake_sleep, sleeps = self._client_with_fake_clock()
+        client.fetcher.fetch = AsyncMock(side_effect=responses)
+        
+        async def run_test():
+            with patch('src.rate_limiter.asyncio.sleep', side_effect=fake_sleep):
+                response = await client._fetch_page('https://t.me/s/test_channel')
+            
+            self.assertEqual(response.body, b'ok')
+            self.assertEqual(client.fetcher.fetch.call_count, 2)
+            self.assertEqual(sleeps, [7])
+        
+        asyncio.run(run_test())
+    
+    def test_fetch_page_raises_when_still_rate_limited(self):
+        client, fake_sleep, _ = self._client_with_fake_clock()
+        client.fetcher.fetch = AsyncMock(return_value=PageResponse(
+            url='https://t.me/s/test_channel', status=429, body=b'', headers={'Retry-After': '1'}
+        ))
+        
+        async def run_test():
+            with patch('src.rate_limiter.asyncio.sleep', side_effect=fake_sleep):
+                with patch('src.telegram_client.RATE_LIMIT_MAX_RETRIES', 2):
+                    with self.assertRaises(RateLimitedError) as context:
+                        await client._fetch_page('https://t.me/s/test_channel')
+            
+            self.assertEqual(context.exception.status, 429)
+            self.assertEqual(client.fetcher.fetch.call_count, 3)
+        
+        asyncio.run(run_test())
+    
+    def test_channels_are_sharded_across_egress_addresses(self):
+        with patch('src.telegram_client.EGRESS_ADDRESSES', ['10.0.0.1', '10.0.0.2']):
+            client = TelegramClient()
+        
+        shards = {client.egress_for(f'channel{i}') for i in range(20)}
+        
+        self.assertEqual(shards, {'10.0.0.1', '10.0.0.2'})
+        self.assertEqual(client.egress_for('Channel7'), client.egress_for('channel7'))
+        self.assertIsNot(client.egress_rate_limiters['10.0.0.1'], client.egress_rate_limiters['10.0.0.2'])
+        self.assertEqual(TelegramClient(offline=True).egress_for('channel1'), None)
+    
+    def test_fetch_page_uses_the_egress_rate_limiter(self):
+        client, fake_sleep, _ = self._client_with_fake_clock()
+        client.egress_rate_limiters = {'10.0.0.1': HostRateLimiter(clock=client.rate_limiter.clock)}
+        client.fetcher.fetch = AsyncMock(side_effect=[
+            PageResponse(url='https://t.me/s/test_channel', status=429, body=b'', headers={'Retry-After': '7'}),
+            PageResponse(url='https://t.me/s/test_channel', status=200, body=b'ok'),
+        ])
+        
+        async def run_test():
+            with patch('src.rate_limiter.asyncio.sleep', side_effect=fake_sleep):
+                return await client._fetch_page('https://t.me/s/test_channel', egress='10.0.0.1')
+        
+        response = asyncio.run(run_test())
+        
+        self.assertEqual(response.body, b'ok')
+        self.assertEqual(client.fetcher.fetch.call_args.kwargs['egress'], '10.0.0.1')
+        # Only the egress address was slowed down by the 429
+        self.assertLess(client.egress_rate_limiters['10.0.0.1'].get_rate('https://t.me/s/test_channel'),
+                        client.rate_limiter.get_rate('https://t.me/s/test_channel'))
+    
+    def test_fetch_page_fails_over_to_next_route(self):
+        import aiohttp
+        
+        async def fake_fetch(url, proxy=None, **options):
+            if proxy is None:
+                raise aiohttp.ClientConnectionError("connection reset")
+            return PageResponse(url=url, status=200, body=b'ok')
+        
+        client = TelegramClient(offline=True)
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        client.proxy_router = ProxyRouter(['http://10.0.0.1:3128'], rotation=1)
+        
+        response = asyncio.run(client._fetch_page('https://t.me/s/test_channel'))
+        
+        self.assertEqual(response.body, b'ok')
+        self.assertEqual(client.proxy_router.get_stats(), {'direct': (0, 1), '10.0.0.1:3128': (1, 0)})
+        # The failed direct route rests, so the next request goes straight through the proxy
+        asyncio.run(client._fetch_page('https://t.me/s/test_channel'))
+        self.assertEqual(client.fetcher.fetch.call_count, 3)
+    
+    def test_fetch_page_keeps_the_mirror_answer_of_a_hedge(self):
+        async def fake_fetch(url, **options):
+            if url.startswith('https://t.me/'):
+                await asyncio.sleep(5)
+            return PageResponse(url=url, status=200, body=b'mirror')
+        
+        client = TelegramClient(offline=True)
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        client.request_hedger = RequestHedger(mirrors=['t.me', 'telegram.me'], initial_delay=0.01)
+        
+        response = asyncio.run(client._fetch_page('https://t.me/s/test_channel'))
+        
+        self.assertEqual(response.body, b'mirror')
+        # Cached and archived under the requested URL
+        self.assertEqual(response.url, 'https://t.me/s/test_channel')
+        self.assertEqual(client.request_hedger.stats['mirror_wins'], 1)
+    
+    @unittest.skipUnless(HAS_LXML, "streaming parsing requires lxml")
+    def test_get_channel_messages_parses_while_streaming(self):
+        now = datetime.now(timezone.utc)
+        page = self._make_page([298, 299, 300], now)
+        completed_during_download = []
+        
+        async def fake_fetch(url, on_chunk=None):
+            for offset in range(0, len(page), 100):
+                completed_during_download.extend(on_chunk(page[offset:offset + 100]))
+            return PageResponse(url=url, status=200, body=page)
+        
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        
+        async def run_test():
+            with patch.object(client, '_parse_message_page') as mock_parse:
+                messages = await client.get_channel_messages('test_channel')
+                mock_parse.assert_not_called()
+            self.assertEqual([m.id for m in messages], ['298', '299', '300'])
+            # Every post but the last one was complete before the download finished
+            self.assertEqual([m.id for m in completed_during_download[:2]], ['298', '299'])
+        
+        asyncio.run(run_test())
+    
+    @unittest.skipUnless(HAS_LXML, "streaming parsing requires lxml")
+    def test_hedged_streaming_page_is_parsed_whole(self):
+        now = datetime.now(timezone.utc)
+        page = self._make_page(range(281, 301), now)
+        half = len(page) // 2
+        
+        async def fake_fetch(url, on_chunk=None, **options):
+            if url.startswith('https://telegram.me/'):
+                await asyncio.sleep(0.02)
+            else:
+                # The original streams the first half at once and the second half slowly
+                on_chunk(page[:half])
+                await asyncio.sleep(0.2)
+                on_chunk(page[half:])
+            return PageResponse(url=url, status=200, body=page)
+        
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        client.request_hedger = RequestHedger(mirrors=['t.me', 'telegram.me'], initial_delay=0.05)
+        
+        messages = asyncio.run(client.get_channel_messages('test_channel'))
+        
+        self.assertEqual([m.id for m in messages], [str(post_id) for post_id in range(281, 301)])
+        self.assertEqual(client.request_hedger.stats['mirror_wins'], 0)
+    
+    def test_get_channel_messages_respects_max_pages(self):
+        now = datetime.now(timezone.utc)
+        
+        async def fake_fetch(url, **options):
+            before = int(url.split('before=')[1]) if 'before=' in url else 1000
+            return PageResponse(url=url, status=200,
+                                body=self._make_page(range(before - 20, before), now))
+        
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        
+        async def run_test():
+            messages = await client.get_channel_messages(
+                'test_channel', since=now - timedelta(days=30), max_pages=2
+            )
+            self.assertEqual(client.fetcher.fetch.call_count, 2)
+            self.assertEqual(len(messages), 40)
         
         asyncio.run(run_test())
     
+    def test_get_channel_messages_skips_posts_below_watermark(self):
+        now = datetime.now(timezone.utc)
+        pages = {
+            'https://t.me/s/test_channel': self._make_page([298, 299, 300], now),
+            'https://t.me/s/test_channel?before=298': self._make_page([295, 296, 297], now),
+        }
+        
+        async def fake_fetch(url, headers=None):
+            return PageResponse(url=url, status=200, body=pages[url])
+        
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(side_effect=fake_fetch)
+        
+        async def run_test():
+            messages = await client.get_channel_messages(
+                'test_channel', since=now - timedelta(days=30), min_post_id=296
+            )
+            self.assertEqual(client.fetcher.fetch.call_count, 2)
+            self.assertEqual(sorted(int(m.id) for m in messages), [297, 298, 299, 300])
+        
+        asyncio.run(run_test())
+    
+    def test_get_channel_messages_nothing_new(self):
+        now = datetime.now(timezone.utc)
+        client = TelegramClient()
+        client.is_connected = True
+        client.fetcher.fetch = AsyncMock(return_value=PageResponse(
+            url='https://t.me/s/test_channel', status=200, body=self._make_page([298, 299, 300], now)
+        ))
+        
+        async def run_test():
+            with patch.object(client, '_parse_message_page') as mock_parse:
+                messages = await client.get_channel_messages(
+                    'test_channel', since=now - timedelta(days=30), min_post_id=300
+                )
+                self.assertEqual(messages, [])
+                mock_parse.assert_not_called()
+            self.assertEqual(client.fetcher.fetch.call_count, 1)
+        
+        asyncio.run(run_test())
+    
+    def test_get_channel_messages_revalidates_with_response_cache(self):
+        now = datetime.now(timezone.utc)
+        url = 'https://t.me/s/test_channel'
+        body = self._make_page([298, 299, 300], now)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            client = TelegramClient()
+            client.is_connected = True
+            client.response_cache = ResponseCache(os.path.join(temp_dir, 'cache.json'))
+            client.fetcher.fetch = AsyncMock(return_value=PageResponse(
+                url=url, status=200, body=body, headers={'ETag': '"abc"'}
+            ))
+            
+            async def run_test():
+                first = await client.get_channel_messages('test_channel', since=now - timedelta(days=1), min_post_id=299)
+                self.assertEqual([m.id for m in first], ['300'])
+                client.commit_response_cache()
+                
+                # Same message list again: sent as a conditional request and not parsed
+                with patch.object(client, '_parse_message_page') as mock_parse:
+                    second = await client.get_channel_messages('test_channel', since=now - timedelta(days=1), min_post_id=299)
+                    mock_parse.assert_not_called()
+                self.assertEqual(second, [])
+                self.assertEqual(client.crawl_stats['test_channel']['unchanged'], 1)
+                self.assertEqual(client.fetcher.fetch.call_args.args, (url,))
+                self.assertEqual(client.fetcher.fetch.call_args.kwargs['headers'], {'If-None-Match': '"abc"'})
+                
+                # 304 Not Modified stops the crawl before any scanning
+                client.fetcher.fetch.return_value = PageResponse(url=url, status=304, body=b'')
+                third = await client.get_channel_messages('test_channel', since=now - timedelta(days=1), min_post_id=299)
+                self.assertEqual(third, [])
+                
+                # Only the first, changed fetch was archived
+                self.assertEqual(client.page_archive.get_stats()['pages'], 1)
+            
+            client.page_archive = PageArchive(os.path.join(temp_dir, 'archive'))
+            asyncio.run(run_test())
+    
+    def test_reset_fetch_budget(self):
+        client = TelegramClient()
+        client.fetcher.fetch_count = 10
+        
+        client.reset_fetch_budget()
+        
+        self.assertEqual(client.fetcher.fetch_count, 0)
+    
     @patch('src.telegram_client.Bot')
     def test_send_message(self, mock_bot):
         mock_bot_instance = AsyncMock()
@@ -151,13 +533,17 @@ class TestTelegramClient(unittest.TestCase):
     
     @patch('src.telegram_client.TelegramClient.get_channel_messages')
     def test_fetch_channel_messages(self, mock_get_messages):
+        chat = ScrapedChat(username='test_channel')
         mock_get_messages.return_value = [
-            {
-                'id': '123',
-                'channel_name': 'test_channel',
-                'date': '2023-01-01 12:00:00',
-                'text': 'Test message'
-            }
+            ScrapedMessage(
+                id='123',
+                date=datetime(2023, 1, 1, 12, 0, tzinfo=timezone.utc),
+                message='Test message',
+                html='',
+                hrefs=(),
+                chat=chat,
+                forwarded_from=''
+            )
         ]
         
         client = TelegramClient()
@@ -169,9 +555,10 @@ class TestTelegramClient(unittest.TestCase):
             self.assertEqual(len(messages), 1)
             self.assertEqual(messages[0].id, '123')
             self.assertEqual(messages[0].message, 'Test message')
+            self.assertEqual(messages[0].chat.username, 'test_channel')
+            self.assertIsNotNone(messages[0].date.tzinfo)
         
         asyncio.run(run_test())
 
-
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file